@@ -0,0 +1,195 @@
+"""
+Alert Rules
+Declarative alerts over the daily prediction table. A rule is a name and a
+condition made of comparisons joined by `and` / `or` (`and` binds tighter):
+
+    "oversold_bounce": "change_pct > 2 and rsi < 30"
+    "big_move":        "change_pct > 3 or change_pct < -3"
+
+Fields are the numeric columns of the predictions (change_pct, current_price,
+predicted_price, lower_bound, upper_bound, rsi, ...). Every rule is evaluated
+for all tickers at once as NumPy boolean arrays, and a comparison shared by
+several rules is computed once.
+
+Subscribers opt into rules by name. Their subscriptions are held as an
+inverted index (rule -> subscriber ids, one sorted id array per rule), so
+routing one evaluation pass touches only the subscribers of rules that
+fired. Subscribers with the same set of fired rules form one group and get
+the same email, which is rendered once per group.
+
+Files:
+    alert_rules.json          {"rules": {name: condition}}
+    alert_subscriptions.json  {email: [rule name, ...]}
+"""
+
+import os
+import re
+import json
+import operator
+
+import numpy as np
+
+ALERT_RULES_FILE = os.getenv("ALERT_RULES_FILE", "alert_rules.json")
+ALERT_SUBSCRIPTIONS_FILE = os.getenv("ALERT_SUBSCRIPTIONS_FILE", "alert_subscriptions.json")
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+             "==": operator.eq, "!=": operator.ne}
+
+_COMPARISON = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*(>=|<=|==|!=|>|<)\s*(-?\d+(?:\.\d*)?(?:[eE]-?\d+)?)\s*$")
+
+
+def parse_condition(text):
+    """
+    Parse a condition into OR-of-AND form: [[(field, op, value), ...], ...].
+    Raises ValueError on anything else.
+    """
+    clauses = []
+    for clause in re.split(r"\s+or\s+", text.strip(), flags=re.IGNORECASE):
+        terms = []
+        for term in re.split(r"\s+and\s+", clause, flags=re.IGNORECASE):
+            match = _COMPARISON.match(term)
+            if match is None:
+                raise ValueError(f"Cannot parse {term.strip()!r} in rule {text!r} (expected e.g. 'rsi < 30')")
+            field, op, value = match.groups()
+            terms.append((field, op, float(value)))
+        clauses.append(terms)
+    return clauses
+
+
+def prediction_table(predictions):
+    """(tickers, {field: float array}) from prediction dicts; non-numeric fields are skipped"""
+    predictions = [p for p in predictions if p is not None]
+    tickers = np.array([p["ticker"] for p in predictions])
+    fields = {}
+    for name in dict.fromkeys(k for p in predictions for k in p):
+        values = [p.get(name) for p in predictions]
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            fields[name] = np.array(values, dtype=np.float64)
+    return tickers, fields
+
+
+class RuleSet:
+    """Named conditions evaluated together over a prediction table"""
+
+    def __init__(self, rules):
+        self.names = list(rules)
+        self.conditions = dict(rules)
+        self.parsed = [parse_condition(rules[name]) for name in self.names]
+        self.position = {name: i for i, name in enumerate(self.names)}
+
+    @property
+    def fields(self):
+        return sorted({field for clauses in self.parsed for terms in clauses for field, _, _ in terms})
+
+    def evaluate(self, table):
+        """
+        (rules x tickers) boolean matrix for {field: array}. Unknown fields
+        raise KeyError; NaN never matches.
+        """
+        missing = set(self.fields) - set(table)
+        if missing:
+            raise KeyError(f"Alert rules use fields missing from the predictions: {sorted(missing)}")
+
+        n = len(next(iter(table.values()))) if table else 0
+        comparisons = {}
+        result = np.zeros((len(self.names), n), dtype=bool)
+        for i, clauses in enumerate(self.parsed):
+            for terms in clauses:
+                hit = np.ones(n, dtype=bool)
+                for term in terms:
+                    if term not in comparisons:
+                        field, op, value = term
+                        comparisons[term] = OPERATORS[op](table[field], value)
+                    hit &= comparisons[term]
+                result[i] |= hit
+        return result
+
+    @classmethod
+    def load(cls, path=ALERT_RULES_FILE):
+        with open(path, "r") as f:
+            return cls(json.load(f)["rules"])
+
+
+class SubscriptionIndex:
+    """Inverted index from rule to subscriber ids, built from {email: [rule names]}"""
+
+    def __init__(self, subscriptions, rule_names):
+        position = {name: i for i, name in enumerate(rule_names)}
+        self.emails = np.array(list(subscriptions), dtype=object)
+
+        unknown = {r for rules in subscriptions.values() for r in rules} - set(position)
+        if unknown:
+            print(f"Ignoring subscriptions to unknown alert rules: {sorted(unknown)}")
+
+        # Flatten (subscriber, rule) pairs, then group them by rule with one stable sort
+        counts = np.fromiter((sum(r in position for r in rules) for rules in subscriptions.values()),
+                             dtype=np.int64, count=len(subscriptions))
+        rules = np.fromiter((position[r] for rules in subscriptions.values() for r in rules if r in position),
+                            dtype=np.int32, count=int(counts.sum()))
+        subscribers = np.repeat(np.arange(len(subscriptions), dtype=np.int32), counts)
+        order = np.argsort(rules, kind="stable")
+        self._subscribers = subscribers[order]
+        self._offsets = np.searchsorted(rules[order], np.arange(len(rule_names) + 1))
+        self.pairs = len(rules)
+
+    def subscribers(self, rule):
+        """Sorted subscriber ids of one rule (by position)"""
+        return self._subscribers[self._offsets[rule]:self._offsets[rule + 1]]
+
+    def route(self, fired):
+        """
+        Group the subscribers of the `fired` rule positions by which of them
+        they follow. Returns [(rule positions, subscriber ids)], one entry per
+        distinct combination.
+        """
+        fired = list(fired)
+        if not fired:
+            return []
+
+        # One bit per fired rule, packed into 64-bit words, per subscriber
+        words = np.zeros((len(self.emails), (len(fired) + 63) // 64), dtype=np.uint64)
+        for j, rule in enumerate(fired):
+            words[self.subscribers(rule), j // 64] |= np.uint64(1 << (j % 64))
+
+        touched = np.flatnonzero(words.any(axis=1))
+        if words.shape[1] == 1:
+            # The common case: a 1-D sort instead of a row-wise one
+            keys, group_of = np.unique(words[touched, 0], return_inverse=True)
+            keys = keys[:, None]
+        else:
+            keys, group_of = np.unique(words[touched], axis=0, return_inverse=True)
+        group_of = group_of.ravel()
+        order = np.argsort(group_of, kind="stable")
+        bounds = np.searchsorted(group_of[order], np.arange(len(keys) + 1))
+
+        groups = []
+        for g, key in enumerate(keys):
+            followed = [r for j, r in enumerate(fired) if int(key[j // 64]) >> (j % 64) & 1]
+            groups.append((followed, touched[order[bounds[g]:bounds[g + 1]]]))
+        return groups
+
+    @classmethod
+    def load(cls, rule_names, path=ALERT_SUBSCRIPTIONS_FILE):
+        if not os.path.exists(path):
+            return cls({}, rule_names)
+        with open(path, "r") as f:
+            return cls(json.load(f), rule_names)
+
+
+def evaluate_alerts(predictions, rule_set, index):
+    """
+    One pass over the prediction table. Returns a list of alert groups:
+    {"rules": [names], "tickers": {name: [tickers]}, "recipients": [emails]}.
+    """
+    tickers, table = prediction_table(predictions)
+    matches = rule_set.evaluate(table)
+    fired = np.flatnonzero(matches.any(axis=1))
+
+    groups = []
+    for rules, subscribers in index.route(fired):
+        groups.append({
+            "rules": [rule_set.names[r] for r in rules],
+            "tickers": {rule_set.names[r]: tickers[matches[r]].tolist() for r in rules},
+            "recipients": index.emails[subscribers].tolist(),
+        })
+    return groups
@@ -1,14 +1,35 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
 import numpy as np
 import yfinance as yf
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
-from sklearn.linear_model import Ridge
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+import io
+import os
+import time
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from artifact_cache import ArtifactCache, artifact_key
+from cache_warmer import CacheWarmer
+from feature_spec import load_feature_spec, model_feature_columns
+from history_store import HistoryStore, feature_layout
+from indicator_kernels import build_feature_frame, column_block
+from market_calendar import NYSE, RECHECK_INTERVAL
+from model_selection import RidgeStatistics, refit_model, select_model
+from panel_features import add_panel_features, ticker_panel, universe_panel
+from portfolio import DEFAULT_RISK_AVERSION, PORTFOLIO_WINDOW, portfolio_analytics
+from prediction_intervals import INTERVAL_LEVEL, prediction_interval, relative_residuals
+from prediction_log import DEFAULT_ROLLING_WINDOW, shared_log
+from prediction_pipeline import DEFAULT_START_DATE, FEATURE_DTYPE
+from single_flight import SINGLE_FLIGHT
+from price_history import PriceHistory
+from stock_universe import ALL_STOCKS, MARKET_PROXY, POPULAR_STOCKS, SECTOR_OF
 
 warnings.filterwarnings("ignore")
 plt.style.use("seaborn-v0_8-darkgrid")
@@ -65,26 +86,31 @@ st.markdown("""
 # ==================================================================================
 # STOCK SELECTION DATA
 # ==================================================================================
-POPULAR_STOCKS = {
-    "Technology": ["AAPL", "MSFT", "GOOGL", "META", "NVDA", "TSLA", "AMD", "INTC", "CRM", "ORCL"],
-    "Finance": ["JPM", "BAC", "WFC", "GS", "MS", "C", "BLK", "AXP", "SCHW", "USB"],
-    "Healthcare": ["JNJ", "UNH", "PFE", "ABBV", "TMO", "MRK", "ABT", "DHR", "LLY", "AMGN"],
-    "Consumer": ["AMZN", "WMT", "HD", "MCD", "NKE", "SBUX", "TGT", "LOW", "COST", "DG"],
-    "Energy": ["XOM", "CVX", "COP", "SLB", "EOG", "MPC", "PSX", "VLO", "OXY", "HAL"],
-    "Industrial": ["BA", "CAT", "GE", "HON", "UPS", "LMT", "MMM", "DE", "RTX", "EMR"],
-}
-
-ALL_STOCKS = []
-for category in POPULAR_STOCKS.values():
-    ALL_STOCKS.extend(category)
+# Stocks analyzed in parallel (fetch + train run on a thread pool)
+MAX_WORKERS = 8
+
+# Model input set; its version is part of every feature/model cache key
+FEATURE_SPEC = load_feature_spec()
+FEATURE_SPEC_VERSION = FEATURE_SPEC["version"]
+
+# Spill feature matrices to memory-mapped files when set (see history_store.py)
+HISTORY_STORE_DIR = os.getenv("HISTORY_STORE_DIR")
+
+# Each ticker's history is fetched once from here; the sidebar start date only slices it
+HISTORY_START = DEFAULT_START_DATE
+
+# Refresh the universe in the background after each session close (see cache_warmer.py)
+WARM_CACHE = os.getenv("WARM_CACHE", "0") == "1"
+
+# Add sector- and market-relative features (fetches the sector peers and MARKET_PROXY)
+USE_PANEL_FEATURES = os.getenv("PANEL_FEATURES", "0") == "1"
 
 # ==================================================================================
 # CACHED FUNCTIONS - PREVENT RECOMPUTATION
 # ==================================================================================
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
 def fetch_stock_data(ticker, start_date):
-    """Fetch stock data from Yahoo Finance - CACHED"""
+    """Fetch stock data from Yahoo Finance"""
     df_raw = yf.download(
         ticker,
         start=start_date,
@@ -98,102 +124,177 @@ def fetch_stock_data(ticker, start_date):
     
     return df_raw
 
-@st.cache_data
-def engineer_features(df_raw):
-    """Engineer technical indicators and features - CACHED"""
-    df = df_raw.copy()
-    
-    # Moving Averages
-    df["MA_5"] = df["Close"].rolling(5).mean()
-    df["MA_10"] = df["Close"].rolling(10).mean()
-    df["MA_20"] = df["Close"].rolling(20).mean()
-    df["MA_50"] = df["Close"].rolling(50).mean()
-    
-    # Exponential Moving Averages
-    df["EMA_12"] = df["Close"].ewm(span=12, adjust=False).mean()
-    df["EMA_26"] = df["Close"].ewm(span=26, adjust=False).mean()
-    
-    # MACD
-    df["MACD"] = df["EMA_12"] - df["EMA_26"]
-    df["MACD_Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-    
-    # RSI
-    delta = df["Close"].diff()
-    gain = delta.where(delta > 0, 0).rolling(14).mean()
-    loss = -delta.where(delta < 0, 0).rolling(14).mean()
-    rs = gain / loss
-    df["RSI"] = 100 - (100 / (1 + rs))
-    
-    # Bollinger Bands
-    df["BB_Middle"] = df["Close"].rolling(20).mean()
-    bb_std = df["Close"].rolling(20).std()
-    df["BB_Upper"] = df["BB_Middle"] + (2 * bb_std)
-    df["BB_Lower"] = df["BB_Middle"] - (2 * bb_std)
-    df["BB_Width"] = df["BB_Upper"] - df["BB_Lower"]
-    
-    # Price Changes
-    df["Daily_Return"] = df["Close"].pct_change()
-    df["Price_Change"] = df["Close"].diff()
-    df["Log_Return"] = np.log(df["Close"] / df["Close"].shift(1))
-    
-    # Volume Metrics
-    df["Volume_MA_10"] = df["Volume"].rolling(10).mean()
-    df["Volume_Ratio"] = df["Volume"] / df["Volume_MA_10"]
-    
-    # Volatility
-    df["Volatility_10"] = df["Daily_Return"].rolling(10).std()
-    df["Volatility_30"] = df["Daily_Return"].rolling(30).std()
-    
-    # Momentum
-    df["Momentum_5"] = df["Close"] - df["Close"].shift(5)
-    df["Momentum_10"] = df["Close"] - df["Close"].shift(10)
-    df["Momentum_20"] = df["Close"] - df["Close"].shift(20)
-    
-    # Rate of Change
-    df["ROC_5"] = ((df["Close"] - df["Close"].shift(5)) / df["Close"].shift(5)) * 100
-    df["ROC_10"] = ((df["Close"] - df["Close"].shift(10)) / df["Close"].shift(10)) * 100
-    
-    # High-Low Range
-    df["HL_Range"] = df["High"] - df["Low"]
-    df["HL_Pct"] = (df["HL_Range"] / df["Close"]) * 100
-    
-    # Target
-    df["Target"] = df["Close"].shift(-1)
-    
-    # Clean data
-    df = df.replace([np.inf, -np.inf], np.nan).dropna()
-    
-    return df
-
-@st.cache_resource  # Cache the trained model
-def train_model(_df):
-    """Train Ridge Regression model - CACHED"""
-    exclude = ["Open", "High", "Low", "Close", "Volume", "Adj Close", "Target"]
-    feature_cols = [c for c in _df.columns if c not in exclude]
-    
-    X = _df[feature_cols]
-    y = _df["Target"]
-    
-    # Train-test split
-    split = int(len(X) * 0.8)
-    X_train, X_test = X.iloc[:split], X.iloc[split:]
-    y_train, y_test = y.iloc[:split], y.iloc[split:]
-    
-    # Scale
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+def get_stock_data(ticker):
+    """
+    Full raw history since HISTORY_START - CACHED until the next bar is due on
+    the market clock. Date ranges are slices of it, so changing the start
+    date never downloads anything.
+    """
+    cache = get_artifact_cache()
+    key = ("raw", ticker.upper())
+    
+    held = cache.get(key)
+    if held is not None:
+        return held
+    
+    def fetch():
+        # With the history store, only new bars (plus a small overlap) are downloaded
+        history = get_price_history()
+        df_raw = history.get(ticker) if history is not None else fetch_stock_data(ticker, HISTORY_START)
+        if len(df_raw) == 0:
+            return df_raw
+        
+        last_bar = df_raw.index[-1]
+        cache.put(key, df_raw, NYSE.cache_expiry(last_bar))
+        
+        # A new bar landed: everything derived from older bars is stale
+        cache.invalidate_ticker(ticker, kinds=("features", "selection", "model"), older_than=pd.Timestamp(last_bar))
+        return df_raw
+    
+    # Sessions asking for the same ticker at once share one download
+    return SINGLE_FLIGHT.do(key, fetch)
+
+@st.cache_resource
+def get_history_store():
+    """Shared memory-mapped history store, None when HISTORY_STORE_DIR is unset"""
+    return HistoryStore(HISTORY_STORE_DIR) if HISTORY_STORE_DIR else None
+
+def drop_adjusted_artifacts(ticker, event):
+    """A split or dividend re-adjusted the ticker's prices: drop everything derived from them"""
+    get_artifact_cache().invalidate_ticker(ticker)
+    get_history_store().delete(ticker, "features")
+
+@st.cache_resource
+def get_price_history():
+    """Incrementally refreshed raw bars in the history store, None when it is disabled"""
+    store = get_history_store()
+    if store is None:
+        return None
+    return PriceHistory(store, fetch_stock_data, HISTORY_START, on_adjust=drop_adjusted_artifacts)
+
+@st.cache_resource
+def get_prediction_log():
+    """Append-only log of the predictions shown, settled by settle_prediction_log"""
+    return shared_log()
+
+def settle_prediction_log():
+    """
+    Join the app's logged predictions with their realized closes, at most
+    once per RECHECK_INTERVAL (concurrent sessions share one run). Closes
+    come only from raw histories already in the cache, so settling never
+    downloads anything on the script thread; predictions for other tickers
+    wait for a run after they are viewed or warmed.
+    """
+    session = NYSE.latest_completed_session()
+    cache = get_artifact_cache()
+    
+    def closes(ticker, start, end):
+        df_raw = cache.get(("raw", ticker.upper()))
+        return df_raw["Close"].loc[start:end] if df_raw is not None else pd.Series(dtype=np.float64)
+    
+    return cache.get_or_compute(("settle", "", session), lambda: get_prediction_log().settle(closes, session),
+                                pd.Timestamp.now(tz="UTC") + RECHECK_INTERVAL)
+
+@st.cache_resource
+def get_artifact_cache():
+    """Process-wide cache of features and models keyed by ticker/start/last bar/spec"""
+    return ArtifactCache()
+
+def sector_panel_features(ticker):
+    """The ticker's panel features, computed over its sector peers in one pass"""
+    peers = POPULAR_STOCKS.get(SECTOR_OF.get(ticker), [ticker])
+    raw_frames = {t: get_stock_data(t) for t in peers}
+    raw_frames = {t: df for t, df in raw_frames.items() if len(df)}
+    panel = universe_panel(raw_frames, get_stock_data(MARKET_PROXY))
+    return ticker_panel(panel, ticker)
+
+def build_features(ticker, df_raw):
+    """Engineer features over the full history, memory-mapped when the history store is enabled"""
+    df = build_feature_frame(df_raw, FEATURE_SPEC["features"], FEATURE_DTYPE)
+    if USE_PANEL_FEATURES:
+        df = add_panel_features(df, sector_panel_features(ticker))
+    store = get_history_store()
+    if store is None:
+        return df
+    
+    feature_cols = model_feature_columns(df, FEATURE_SPEC["features"])
+    store.save(ticker, "features", df, feature_layout(df.columns, feature_cols), FEATURE_DTYPE)
+    del df
+    
+    return store.load(ticker, "features").to_frame()
+
+def load_features(ticker, df_raw):
+    """Engineered features over the full history - CACHED by (ticker, last bar, spec)"""
+    last_bar = df_raw.index[-1]
+    key = artifact_key("features", ticker, HISTORY_START, last_bar, FEATURE_SPEC_VERSION)
+    return get_artifact_cache().get_or_compute(key, lambda: build_features(ticker, df_raw),
+                                               NYSE.cache_expiry(last_bar))
+
+def load_model_family(ticker, last_bar, history):
+    """
+    Model family chosen once per ticker on the full history, plus the Ridge
+    sufficient statistics - CACHED by (ticker, last bar, spec)
+    """
+    def build():
+        feature_cols = model_feature_columns(history, FEATURE_SPEC["features"])
+        X = column_block(history, feature_cols)
+        y = history["Target"].to_numpy()
+        split = int(len(X) * 0.8)
+        
+        scaler = StandardScaler()
+        _, selection = select_model(scaler.fit_transform(X[:split]), y[:split], feature_cols, scaler)
+        return {"selection": selection, "statistics": RidgeStatistics(X, y)}
+    
+    key = artifact_key("selection", ticker, HISTORY_START, last_bar, FEATURE_SPEC_VERSION)
+    return get_artifact_cache().get_or_compute(key, build, NYSE.cache_expiry(last_bar))
+
+def load_model(ticker, start_date, last_bar, history):
+    """Model for one date range - CACHED by (ticker, start, last bar, spec)"""
+    key = artifact_key("model", ticker, start_date, last_bar, FEATURE_SPEC_VERSION)
+    return get_artifact_cache().get_or_compute(
+        key, lambda: train_model(history, start_date, load_model_family(ticker, last_bar, history)),
+        NYSE.cache_expiry(last_bar))
+
+def train_model(history, start_date, family):
+    """
+    Fit the ticker's chosen model family on the rows from `start_date`
+    (80/20 train/test split). Ridge is solved from the cached sufficient
+    statistics; other families are refit on the window without re-scoring.
+    """
+    feature_cols = model_feature_columns(history, FEATURE_SPEC["features"])
+    selection = family["selection"]
+    
+    # Views into the feature matrix (no copy when the columns are adjacent)
+    X = column_block(history, feature_cols)
+    y = history["Target"].to_numpy()
+    
+    # Train-test split of the window
+    lo = history.index.searchsorted(pd.Timestamp(start_date))
+    split = lo + int((len(X) - lo) * 0.8)
+    X_test, y_test = X[split:], y[split:]
     
     # Train
-    model = Ridge(alpha=1.0, random_state=42)
-    model.fit(X_train_scaled, y_train)
+    started = time.thread_time()
+    if selection["model"] == "Ridge":
+        model, scaler = family["statistics"].fit_ridge(X, y, lo, split)
+    else:
+        scaler = StandardScaler()
+        model = refit_model(selection["model"], scaler.fit_transform(X[lo:split]), y[lo:split],
+                            feature_cols, scaler)
+    train_ms = (time.thread_time() - started) * 1000
     
     # Evaluate
-    test_pred = model.predict(X_test_scaled)
+    test_pred = model.predict(scaler.transform(X_test))
     metrics = {
         "rmse": np.sqrt(mean_squared_error(y_test, test_pred)),
         "mae": mean_absolute_error(y_test, test_pred),
-        "r2": r2_score(y_test, test_pred)
+        "r2": r2_score(y_test, test_pred),
+        # Out-of-sample residuals used for the prediction interval
+        "residuals": relative_residuals(y_test, test_pred),
+        "model": selection["model"],
+        "budget_exceeded": selection["budget_exceeded"],
+        "train_ms": train_ms,
+        "predict_ms": selection["predict_ms"]
     }
     
     return model, scaler, feature_cols, metrics
@@ -201,19 +302,13 @@ def train_model(_df):
 # ==================================================================================
 # PREDICTION FUNCTION
 # ==================================================================================
-def get_next_trading_day(last_date):
-    """Calculate the next trading day (skip weekends)"""
-    next_day = last_date + timedelta(days=1)
-    
-    # Skip weekends (Saturday=5, Sunday=6)
-    while next_day.weekday() >= 5:
-        next_day = next_day + timedelta(days=1)
-    
-    return next_day
+def get_next_trading_day(last_date, n=1):
+    """Calculate the n-th trading day after last_date (NYSE calendar, skips holidays)"""
+    return NYSE.next_session(last_date, n)
 
-def make_prediction(df, model, scaler, feature_cols):
-    """Make next day prediction"""
-    latest = df.iloc[-1:][feature_cols]
+def make_prediction(df, model, scaler, feature_cols, residuals=None):
+    """Make next day prediction (with an interval when residuals are given)"""
+    latest = column_block(df, feature_cols)[-1:]
     latest_scaled = scaler.transform(latest)
     next_day_prediction = model.predict(latest_scaled)[0]
     
@@ -233,7 +328,7 @@ def make_prediction(df, model, scaler, feature_cols):
         # Data is old, next date is after the last date we have
         next_date = get_next_trading_day(last_date)
     
-    return {
+    prediction = {
         "predicted_price": next_day_prediction,
         "current_price": current_price,
         "change": change,
@@ -242,6 +337,16 @@ def make_prediction(df, model, scaler, feature_cols):
         "next_date": next_date,
         "trend": "BULLISH 📈" if change > 0 else "BEARISH 📉"
     }
+    
+    if residuals is not None and len(residuals) > 0:
+        lower, upper = prediction_interval(residuals, next_day_prediction)
+        prediction.update({
+            "lower_bound": float(lower),
+            "upper_bound": float(upper),
+            "interval_level": INTERVAL_LEVEL
+        })
+    
+    return prediction
 
 # ==================================================================================
 # VISUALIZATION FUNCTION
@@ -251,7 +356,7 @@ def create_visualization(df, model, scaler, feature_cols, prediction_data, lookb
     recent_df = df.tail(lookback_days + 1).copy()
     
     # Generate predictions
-    X_recent = recent_df[feature_cols]
+    X_recent = column_block(recent_df, feature_cols)
     X_recent_scaled = scaler.transform(X_recent)
     recent_pred = model.predict(X_recent_scaled)
     
@@ -278,6 +383,16 @@ def create_visualization(df, model, scaler, feature_cols, prediction_data, lookb
              linewidth=3.5, color='#F18F01', marker='*', markersize=18,
              label='Next Day Forecast', zorder=5)
     
+    if "lower_bound" in prediction_data:
+        lower, upper = prediction_data["lower_bound"], prediction_data["upper_bound"]
+        ax1.fill_between([dates[-1], next_date], [predicted[-1], lower], [predicted[-1], upper],
+                         color='#F18F01', alpha=0.25,
+                         label=f'{prediction_data["interval_level"]:.0%} Prediction Interval')
+        ax1.errorbar([next_date], [prediction_data["predicted_price"]],
+                     yerr=[[prediction_data["predicted_price"] - lower],
+                           [upper - prediction_data["predicted_price"]]],
+                     color='#F18F01', capsize=8, linewidth=2, zorder=4)
+    
     ax1.annotate(f'${prediction_data["predicted_price"]:.2f}',
                 xy=(next_date, prediction_data["predicted_price"]),
                 xytext=(15, 15), textcoords='offset points',
@@ -343,6 +458,9 @@ def generate_trading_guide(prediction_data, df):
     # Main recommendation
     guide.append(f"**🎯 PREDICTION: {prediction_data['trend']}**")
     guide.append(f"- Expected Change: **{change_pct:+.2f}%** (${prediction_data['change']:+.2f})")
+    if "lower_bound" in prediction_data:
+        lower, upper = prediction_data["lower_bound"], prediction_data["upper_bound"]
+        guide.append(f"- {prediction_data['interval_level']:.0%} Range: ${lower:.2f} - ${upper:.2f}")
     guide.append("")
     
     # Action recommendation
@@ -373,6 +491,11 @@ def generate_trading_guide(prediction_data, df):
         guide.append("- Minimal price movement expected")
         guide.append("- Wait for clearer signals")
     
+    # Interval straddles today's close: direction is not distinguishable from noise
+    if "lower_bound" in prediction_data and \
+            prediction_data["lower_bound"] < current_price < prediction_data["upper_bound"]:
+        guide.append("- ⚠️ Low confidence: the prediction range includes today's close")
+    
     guide.append("")
     
     # RSI analysis
@@ -412,6 +535,225 @@ def display_last_5_days(df):
     
     return last_5
 
+# ==================================================================================
+# STOCK SECTION - INDEPENDENTLY CACHED PIECES
+# ==================================================================================
+def analyze_stock(ticker, start_date):
+    """
+    Everything a stock section shows except the chart - CACHED per
+    (ticker, start, last bar, spec). None when there is not enough data.
+    """
+    df_raw = get_stock_data(ticker)
+    if len(df_raw.loc[start_date:]) < 100:
+        return None
+    
+    last_bar = df_raw.index[-1]
+    key = artifact_key("analysis", ticker, start_date, last_bar, FEATURE_SPEC_VERSION)
+    
+    def build():
+        # The date range is a slice of the full-history features
+        history = load_features(ticker, df_raw)
+        df = history.loc[start_date:]
+        model, scaler, feature_cols, metrics = load_model(ticker, start_date, last_bar, history)
+        prediction_data = make_prediction(df, model, scaler, feature_cols, metrics["residuals"])
+        get_prediction_log().record(dict(prediction_data, ticker=ticker), "app")
+        return {
+            "key": key,
+            "df": df,
+            "model": model,
+            "scaler": scaler,
+            "feature_cols": feature_cols,
+            "metrics": metrics,
+            "prediction": prediction_data,
+            "last_5_days": display_last_5_days(df),
+            "trading_guide": generate_trading_guide(prediction_data, df)
+        }
+    
+    return get_artifact_cache().get_or_compute(key, build, NYSE.cache_expiry(last_bar))
+
+def render_chart_png(analysis, lookback_days):
+    """Rendered chart for one visualization window - CACHED as PNG bytes"""
+    def build():
+        fig = create_visualization(analysis["df"], analysis["model"], analysis["scaler"],
+                                   analysis["feature_cols"], analysis["prediction"], lookback_days)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+        plt.close(fig)
+        return buffer.getvalue()
+    
+    key = ("chart",) + analysis["key"][1:] + (lookback_days,)
+    last_bar = analysis["key"][3]
+    return get_artifact_cache().get_or_compute(key, build, NYSE.cache_expiry(last_bar))
+
+def default_start_date():
+    """The sidebar's default start date (two years back)"""
+    return (datetime.now() - timedelta(days=365*2)).date()
+
+def warm_ticker(ticker):
+    """Cache what a default stock section needs (charts are rendered on demand)"""
+    analyze_stock(ticker, default_start_date().strftime("%Y-%m-%d"))
+
+@st.cache_resource
+def get_cache_warmer():
+    """Background warmer shared by all sessions, None unless WARM_CACHE=1"""
+    return CacheWarmer(warm_ticker, ALL_STOCKS).start() if WARM_CACHE else None
+
+@st.fragment
+def chart_fragment(ticker, start_date):
+    """Chart with its own window slider; moving it reruns only this fragment"""
+    lookback_days = st.slider("Visualization Window (days)", 30, 120, 60, key=f"lookback_{ticker}")
+    
+    analysis = analyze_stock(ticker, start_date)
+    st.subheader(f"📈 {lookback_days}-Day Analysis & Forecast")
+    st.image(render_chart_png(analysis, lookback_days))
+
+def analyze_many(tickers, start_date):
+    """analyze_stock for several tickers on the thread pool; {ticker: analysis or None}"""
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(tickers)),
+                            initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as pool:
+        futures = {ticker: pool.submit(analyze_stock, ticker, start_date) for ticker in tickers}
+    
+    analyses = {}
+    for ticker, future in futures.items():
+        try:
+            analyses[ticker] = future.result()
+        except Exception:
+            analyses[ticker] = None
+    return analyses
+
+@st.fragment
+def portfolio_fragment(tickers, start_date):
+    """Portfolio of the analyzed stocks; its controls rerun only this fragment"""
+    st.markdown("## 💼 Portfolio View")
+    col1, col2, col3 = st.columns([2, 1, 2])
+    with col1:
+        use_universe = st.checkbox(f"Use the full universe ({len(ALL_STOCKS)} stocks)", key="portfolio_universe")
+    with col2:
+        long_only = st.checkbox("Long only", value=True, key="portfolio_long_only")
+    with col3:
+        risk_aversion = st.slider("Risk aversion (mean-variance)", 10, 1000, DEFAULT_RISK_AVERSION, step=10,
+                                  key="portfolio_risk_aversion")
+    
+    if use_universe:
+        tickers = ALL_STOCKS
+    with st.spinner(f"Analyzing {len(tickers)} stocks..."):
+        analyses = {t: a for t, a in analyze_many(tickers, start_date).items() if a is not None}
+    if len(analyses) < 2:
+        st.info("ℹ️ The portfolio view needs at least two stocks with enough history")
+        return
+    
+    closes = {t: a["df"]["Close"] for t, a in analyses.items()}
+    predicted = {t: a["prediction"]["change_pct"] / 100 for t, a in analyses.items()}
+    result = portfolio_analytics(closes, predicted, risk_aversion, long_only)
+    if result is None:
+        st.info(f"ℹ️ The portfolio view needs at least two stocks with most of the last {PORTFOLIO_WINDOW} "
+                "sessions of history - try an earlier start date or other stocks")
+        return
+    
+    cols = st.columns(len(result["summary"]))
+    for col, (name, summary) in zip(cols, result["summary"].items()):
+        with col:
+            st.metric(f"{name}: expected move", f"{summary['expected_move_pct']:+.2f}%",
+                      f"{summary['daily_vol_pct']:.2f}% daily vol", delta_color="off")
+            st.caption(f"{summary['positions']} positions")
+    
+    st.dataframe(result["table"].sort_values("Mean-variance Weight %", ascending=False).style.format("{:.2f}"),
+                 use_container_width=True)
+    st.caption(f"Covariance: Ledoit-Wolf over the last {PORTFOLIO_WINDOW} sessions "
+               f"(shrinkage {result['shrinkage']:.2f}). Risk % is each stock's share of portfolio variance."
+               + (f" Left out (too little history): {', '.join(result['excluded'])}" if result["excluded"] else ""))
+
+def render_stock_section(ticker, start_date, analysis):
+    """Draw one stock section from its cached analysis"""
+    prediction_data = analysis["prediction"]
+    metrics = analysis["metrics"]
+    
+    # Display prediction card
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric(
+            "Current Close",
+            f"${prediction_data['current_price']:.2f}",
+            help="Latest closing price"
+        )
+    
+    with col2:
+        st.metric(
+            "Predicted Next Close",
+            f"${prediction_data['predicted_price']:.2f}",
+            f"{prediction_data['change_pct']:+.2f}%",
+            delta_color="normal" if prediction_data['change_pct'] > 0 else "inverse",
+            help=(f"{prediction_data['interval_level']:.0%} range: "
+                  f"${prediction_data['lower_bound']:.2f} - ${prediction_data['upper_bound']:.2f}"
+                  if "lower_bound" in prediction_data else None)
+        )
+    
+    with col3:
+        st.metric(
+            "Last Data Date",
+            prediction_data['last_date'].strftime('%Y-%m-%d')
+        )
+    
+    with col4:
+        st.metric(
+            "Next Trading Day",
+            prediction_data['next_date'].strftime('%Y-%m-%d')
+        )
+    
+    # Last 5 days trading data
+    st.subheader("📅 Last 5 Days Trading Summary")
+    st.dataframe(analysis["last_5_days"], use_container_width=True)
+    
+    # Model performance
+    with st.expander("🎯 Model Performance Metrics"):
+        met_col1, met_col2, met_col3 = st.columns(3)
+        with met_col1:
+            st.metric("RMSE", f"${metrics['rmse']:.2f}")
+        with met_col2:
+            st.metric("MAE", f"${metrics['mae']:.2f}")
+        with met_col3:
+            st.metric("R² Score", f"{metrics['r2']:.4f}")
+        
+        mod_col1, mod_col2, mod_col3 = st.columns(3)
+        with mod_col1:
+            st.metric("Model", metrics["model"],
+                      help="CPU budget exceeded - fell back to Ridge" if metrics["budget_exceeded"] else None)
+        with mod_col2:
+            st.metric("Train Time", f"{metrics['train_ms']:.0f} ms")
+        with mod_col3:
+            st.metric("Predict Time", f"{metrics['predict_ms']:.2f} ms")
+    
+    # Realized accuracy of past predictions (running sums, no log scan)
+    with st.expander("📏 Track Record"):
+        settle_prediction_log()
+        record = get_prediction_log().track_record(ticker, DEFAULT_ROLLING_WINDOW)
+        if record is None:
+            st.caption("No settled predictions yet - outcomes are recorded once the predicted session closes.")
+        else:
+            st.caption(f"Rolling {DEFAULT_ROLLING_WINDOW} settled predictions, "
+                       f"{int(record['Predictions'].iloc[-1])} in the latest window")
+            rec_col1, rec_col2, rec_col3 = st.columns(3)
+            with rec_col1:
+                st.metric("Hit Rate", f"{record['Hit Rate %'].iloc[-1]:.0f}%",
+                          help="Share of predictions that got the direction of the move right")
+            with rec_col2:
+                st.metric("MAE", f"{record['MAE %'].iloc[-1]:.2f}%", help="Mean absolute error, % of the close")
+            with rec_col3:
+                in_range = record["In Range %"].iloc[-1]
+                st.metric("In Range", f"{in_range:.0f}%" if pd.notna(in_range) else "N/A",
+                          help="Closes inside the predicted range")
+            st.line_chart(record[["Hit Rate %", "In Range %"]])
+            st.line_chart(record[["MAE %", "RMSE %"]])
+    
+    # Visualization (fragment: reruns alone when its slider moves)
+    chart_fragment(ticker, start_date)
+    
+    # Trading guide
+    st.subheader("🎯 AI Trading Recommendations")
+    st.markdown(f'<div class="trading-guide">{analysis["trading_guide"]}</div>', unsafe_allow_html=True)
+
 # ==================================================================================
 # MAIN APP
 # ==================================================================================
@@ -432,8 +774,7 @@ def main():
             selected_stocks = st.multiselect(
                 "Choose stocks to analyze:",
                 options=ALL_STOCKS,
-                default=["AAPL"],
-                max_selections=3  # Limit to prevent overload
+                default=["AAPL"]
             )
         else:
             selected_stock = st.selectbox("Choose a stock:", ALL_STOCKS, index=0)
@@ -443,13 +784,11 @@ def main():
         st.subheader("📅 Date Range")
         start_date = st.date_input(
             "Start Date",
-            value=datetime.now() - timedelta(days=365*2),
+            value=default_start_date(),
+            min_value=pd.Timestamp(HISTORY_START).date(),
             max_value=datetime.now()
         )
         
-        # Lookback days for visualization
-        lookback_days = st.slider("Visualization Window (days)", 30, 120, 60)
-        
         st.markdown("---")
         st.markdown("**💡 How it works:**")
         st.markdown("""
@@ -460,97 +799,72 @@ def main():
         5. Trading recommendations provided
         """)
         
-        st.info("💾 Data is cached for 1 hour to improve performance")
+        st.info("💾 Data is cached until the next market close is available; "
+                "changing the start date reuses it without downloading")
+        
+        with st.expander("⚙️ Shared computations"):
+            st.caption("Work shared across all sessions of this server: concurrent requests for the "
+                       "same data, features or model wait for one computation.")
+            flights = SINGLE_FLIGHT.stats()
+            if flights:
+                st.dataframe(pd.DataFrame(flights).T.rename_axis("Stage")[["computed", "coalesced"]],
+                             use_container_width=True)
+                st.caption(f"Duplicate computations avoided: {SINGLE_FLIGHT.coalesced()}")
+            
+            warmer = get_cache_warmer()
+            if warmer is not None and warmer.last_run:
+                run = warmer.stats()
+                st.caption(f"Background warm-up after the {run['last_session']:%b %d} close: "
+                           f"{run['warmed']} tickers in {run['seconds']:.0f}s, {run['skipped']} over the CPU budget")
     
     # Main content
     if not selected_stocks:
         st.warning("⚠️ Please select at least one stock from the sidebar")
         return
     
-    # Process each stock
+    # Popular tickers are warmed first after the next close
+    if warmer is not None:
+        for ticker in selected_stocks:
+            warmer.record_request(ticker)
+    
+    # Process all stocks concurrently; each section fills in as soon as its result is ready
+    start_str = start_date.strftime("%Y-%m-%d")
+    placeholders = {}
     for idx, ticker in enumerate(selected_stocks):
         if idx > 0:
             st.markdown('<div class="stock-divider"></div>', unsafe_allow_html=True)
         
-        st.markdown(f"## 📊 {ticker} - Stock Analysis")
+        section = st.container()
+        section.markdown(f"## 📊 {ticker} - Stock Analysis")
+        placeholders[ticker] = (section, section.info(f"🔄 Fetching and analyzing {ticker} data..."))
+    
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(selected_stocks)),
+                            initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as pool:
+        futures = {pool.submit(analyze_stock, ticker, start_str): ticker for ticker in selected_stocks}
         
-        with st.spinner(f"🔄 Fetching and analyzing {ticker} data..."):
+        for future in as_completed(futures):
+            ticker = futures[future]
+            section, status = placeholders[ticker]
+            status.empty()
+            
             try:
-                # Fetch data (CACHED)
-                df_raw = fetch_stock_data(ticker, start_date.strftime("%Y-%m-%d"))
-                
-                if len(df_raw) < 100:
-                    st.error(f"❌ Insufficient data for {ticker}. Need at least 100 days.")
-                    continue
-                
-                # Engineer features (CACHED)
-                df = engineer_features(df_raw)
-                
-                # Train model (CACHED)
-                model, scaler, feature_cols, metrics = train_model(df)
-                
-                # Make prediction
-                prediction_data = make_prediction(df, model, scaler, feature_cols)
-                
-                # Display prediction card
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric(
-                        "Current Close",
-                        f"${prediction_data['current_price']:.2f}",
-                        help="Latest closing price"
-                    )
-                
-                with col2:
-                    st.metric(
-                        "Predicted Next Close",
-                        f"${prediction_data['predicted_price']:.2f}",
-                        f"{prediction_data['change_pct']:+.2f}%",
-                        delta_color="normal" if prediction_data['change_pct'] > 0 else "inverse"
-                    )
-                
-                with col3:
-                    st.metric(
-                        "Last Data Date",
-                        prediction_data['last_date'].strftime('%Y-%m-%d')
-                    )
-                
-                with col4:
-                    st.metric(
-                        "Next Trading Day",
-                        prediction_data['next_date'].strftime('%Y-%m-%d')
-                    )
-                
-                # Last 5 days trading data
-                st.subheader("📅 Last 5 Days Trading Summary")
-                last_5_days = display_last_5_days(df)
-                st.dataframe(last_5_days, use_container_width=True)
-                
-                # Model performance
-                with st.expander("🎯 Model Performance Metrics"):
-                    met_col1, met_col2, met_col3 = st.columns(3)
-                    with met_col1:
-                        st.metric("RMSE", f"${metrics['rmse']:.2f}")
-                    with met_col2:
-                        st.metric("MAE", f"${metrics['mae']:.2f}")
-                    with met_col3:
-                        st.metric("R² Score", f"{metrics['r2']:.4f}")
-                
-                # Visualization
-                st.subheader(f"📈 {lookback_days}-Day Analysis & Forecast")
-                fig = create_visualization(df, model, scaler, feature_cols, prediction_data, lookback_days)
-                st.pyplot(fig)
-                plt.close()
-                
-                # Trading guide
-                st.subheader("🎯 AI Trading Recommendations")
-                trading_guide = generate_trading_guide(prediction_data, df)
-                st.markdown(f'<div class="trading-guide">{trading_guide}</div>', unsafe_allow_html=True)
-                
+                analysis = future.result()
             except Exception as e:
-                st.error(f"❌ Error processing {ticker}: {str(e)}")
+                section.error(f"❌ Error processing {ticker}: {str(e)}")
+                continue
+            
+            if analysis is None:
+                section.error(f"❌ Insufficient data for {ticker}. Need at least 100 days.")
                 continue
+            
+            with section:
+                render_stock_section(ticker, start_str, analysis)
+    
+    # Portfolio across the selection (or the universe) in multi-stock mode
+    if selection_mode == "Multiple Stocks":
+        st.markdown('<div class="stock-divider"></div>', unsafe_allow_html=True)
+        portfolio_fragment(selected_stocks, start_str)
     
     # Footer
     st.markdown("---")
@@ -0,0 +1,133 @@
+"""
+Artifact Cache
+Process-wide cache for derived per-ticker artifacts (features, models).
+Entries are keyed explicitly by what they depend on, so lookups are a plain
+dict access and never hash a DataFrame:
+
+    (kind, ticker, start_date, last_bar, spec_version)
+
+A new bar or a new feature spec simply produces a new key. Entries can also
+carry an expiry time (e.g. when the next daily bar is due, see
+market_calendar.cache_expiry); expired entries read as misses. Artifacts built
+on an older bar are dropped per ticker with `invalidate_ticker`.
+
+Misses in `get_or_compute` go through the process-wide single-flight layer
+(single_flight.py): concurrent callers of one key share one computation.
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from single_flight import SINGLE_FLIGHT
+
+_MISSING = object()
+
+
+def artifact_key(kind, ticker, start_date, last_bar, spec_version):
+    """Build the cache key for one artifact"""
+    return (kind, ticker.upper(), str(start_date), pd.Timestamp(last_bar), spec_version)
+
+
+class ArtifactCache:
+    """Thread-safe LRU dict with per-ticker invalidation"""
+
+    def __init__(self, max_entries=512, flight=SINGLE_FLIGHT):
+        self.max_entries = max_entries
+        self.flight = flight
+        self._entries = OrderedDict()
+        self._expiry = {}
+        self._by_ticker = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        self._expiry.pop(key, None)
+        self._by_ticker.get(key[1], set()).discard(key)
+
+    def _lookup(self, key):
+        # Caller holds the lock
+        value = self._entries.get(key, _MISSING)
+        expires_at = self._expiry.get(key)
+        if value is not _MISSING and expires_at is not None and pd.Timestamp.now(tz="UTC") >= expires_at:
+            self._drop(key)
+            value = _MISSING
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, expires_at=None):
+        """Store a value; `expires_at` is a tz-aware Timestamp or None (no expiry)"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._by_ticker.setdefault(key[1], set()).add(key)
+            if expires_at is not None:
+                self._expiry[key] = expires_at
+            else:
+                self._expiry.pop(key, None)
+
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_compute(self, key, compute, expires_at=None):
+        """
+        Return the cached value for `key`, computing and storing it on a miss.
+        Concurrent misses on the same key wait for a single computation.
+        `expires_at` may also be a function of the computed value.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        def run():
+            # A computation that just finished may have stored it already
+            with self._lock:
+                value = self._lookup(key)
+            if value is _MISSING:
+                value = compute()
+                self.put(key, value, expires_at(value) if callable(expires_at) else expires_at)
+            return value
+
+        if self.flight is None:
+            return run()
+        return self.flight.do((id(self), key), run, kind=key[0])
+
+    def invalidate_ticker(self, ticker, kinds=None, older_than=None):
+        """
+        Drop entries of a ticker, optionally only some kinds and only artifacts
+        built on a bar before `older_than`. Returns the number dropped.
+        """
+        with self._lock:
+            keys = [k for k in self._by_ticker.get(ticker.upper(), set())
+                    if (kinds is None or k[0] in kinds)
+                    and (older_than is None or (len(k) > 3 and k[3] < older_than))]
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self._by_ticker.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,178 @@
+"""
+Batch Prediction CLI
+Runs fetch -> features -> train -> predict for many tickers with a worker
+pool and writes predictions, model metrics and latest feature snapshots as
+Parquet, CSV or JSON lines, without the Streamlit UI or the mailer.
+
+Usage:
+    python batch_predict.py AAPL MSFT NVDA --workers 4
+    python batch_predict.py --tickers-file tickers.txt --format parquet --output-dir out
+    python batch_predict.py --all --as-of 2024-06-28
+    python batch_predict.py --all --panel-features
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from panel_features import ticker_panel
+from prediction_log import BACKTEST_SOURCE, PREDICTION_LOG_DIR, PredictionLog
+from prediction_pipeline import DEFAULT_START_DATE, fetch_panel, run_pipeline
+from stock_universe import ALL_STOCKS
+
+# Same universe as the dashboard
+UNIVERSE = ALL_STOCKS
+
+FORMATS = {"parquet": ".parquet", "csv": ".csv", "jsonl": ".jsonl"}
+
+
+def read_tickers_file(path):
+    """One ticker per line (commas also accepted); '#' starts a comment"""
+    tickers = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            tickers.extend(t.strip().upper() for t in line.split(",") if t.strip())
+    return tickers
+
+
+def _run_one(ticker, start_date, as_of, df_raw=None, panel=None):
+    """Worker entry point; returns (ticker, result, error, seconds)"""
+    started = time.perf_counter()
+    try:
+        result = run_pipeline(ticker, start_date, as_of, df_raw, panel)
+        error = None if result else "insufficient data"
+    except Exception as e:
+        result, error = None, str(e)
+    return ticker, result, error, time.perf_counter() - started
+
+
+def run_batch(tickers, workers=4, start_date=DEFAULT_START_DATE, as_of=None, executor="process",
+              panel_features=False):
+    """
+    Run the pipeline for every ticker on a worker pool. With `panel_features`
+    all histories are fetched first and the sector/market features are
+    computed once for the whole panel before training.
+    Returns (predictions, metrics, features, errors) as DataFrames.
+    """
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    predictions, metrics, features, errors = [], [], [], []
+
+    raw_frames, panel = {}, None
+    if panel_features:
+        started = time.perf_counter()
+        raw_frames, panel = fetch_panel(tickers, start_date, as_of, workers)
+        print(f"  Panel features for {len(raw_frames)} tickers in {time.perf_counter() - started:.1f}s")
+
+    def job(ticker):
+        if ticker not in raw_frames:
+            return (ticker, start_date, as_of)
+        return (ticker, start_date, as_of, raw_frames[ticker], ticker_panel(panel, ticker))
+
+    with pool_cls(max_workers=workers) as pool:
+        futures = [pool.submit(_run_one, *job(t)) for t in tickers]
+        for future in as_completed(futures):
+            ticker, result, error, seconds = future.result()
+            if error:
+                errors.append({"ticker": ticker, "error": error})
+                print(f"  ✗ {ticker}: {error}")
+                continue
+            predictions.append(result["prediction"])
+            metrics.append(dict(result["metrics"], seconds=seconds))
+            features.append(result["features"])
+            print(f"  ✓ {ticker}: ${result['prediction']['current_price']:.2f} → "
+                  f"${result['prediction']['predicted_price']:.2f} ({seconds:.1f}s)")
+
+    predictions = pd.DataFrame(predictions)
+    metrics = pd.DataFrame(metrics)
+    features = pd.DataFrame(features).rename_axis("ticker").reset_index() if features else pd.DataFrame()
+    if len(predictions):
+        predictions["as_of"] = as_of or predictions["last_date"].max()
+        predictions = predictions.sort_values("ticker").reset_index(drop=True)
+    return predictions, metrics, features, pd.DataFrame(errors)
+
+
+def write_table(df, path, fmt):
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_json(path, orient="records", lines=True, date_format="iso")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch stock predictions")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols")
+    parser.add_argument("--tickers-file", help="File with one ticker per line")
+    parser.add_argument("--all", action="store_true", help="Run the full dashboard universe")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker count")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    parser.add_argument("--start-date", default=DEFAULT_START_DATE, help="First date of history")
+    parser.add_argument("--as-of", help="Predict as of this date (uses bars up to and including it)")
+    parser.add_argument("--panel-features", action="store_true",
+                        help="Add sector- and market-relative features computed across the tickers")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--output-dir", default="predictions_out")
+    parser.add_argument("--prediction-log",
+                        help=f"Append the predictions to this prediction log ('' to skip; default {PREDICTION_LOG_DIR}, "
+                             "or none with --as-of so backtests stay out of the live log)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    tickers = [t.upper() for t in args.tickers]
+    if args.tickers_file:
+        tickers.extend(read_tickers_file(args.tickers_file))
+    if args.all:
+        tickers.extend(UNIVERSE)
+    tickers = list(dict.fromkeys(tickers))
+
+    if not tickers:
+        print("No tickers given (pass symbols, --tickers-file or --all)")
+        return 2
+
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Parquet output needs pyarrow (pip install pyarrow) - or use --format csv/jsonl")
+            return 2
+
+    print(f"Running {len(tickers)} tickers on {args.workers} {args.executor} workers"
+          + (f" as of {args.as_of}" if args.as_of else ""))
+    started = time.perf_counter()
+    predictions, metrics, features, errors = run_batch(
+        tickers, args.workers, args.start_date, args.as_of, args.executor, args.panel_features
+    )
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    ext = FORMATS[args.format]
+    for name, table in [("predictions", predictions), ("metrics", metrics),
+                        ("features", features), ("errors", errors)]:
+        if len(table):
+            path = os.path.join(args.output_dir, name + ext)
+            write_table(table, path, args.format)
+            print(f"Wrote {len(table)} rows to {path}")
+    log_dir = args.prediction_log
+    if log_dir is None:
+        log_dir = None if args.as_of else PREDICTION_LOG_DIR
+    if log_dir and len(predictions):
+        # Backtests go to a log only when one is named, tagged so settle leaves them out
+        PredictionLog(log_dir).append(predictions.to_dict("records"), BACKTEST_SOURCE if args.as_of else "batch")
+        print(f"Appended {len(predictions)} predictions to {log_dir}")
+    elif args.as_of and len(predictions):
+        print("Backtest: predictions not logged (pass --prediction-log DIR to keep them)")
+
+    print(f"\nDone: {len(predictions)}/{len(tickers)} tickers in {time.perf_counter() - started:.1f}s")
+    return 0 if len(predictions) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Alert Rules Benchmark
+Times alert_rules over a large synthetic universe and subscriber base: rule
+evaluation on the prediction table, building the subscription index, and
+routing one day's fired rules to subscriber groups. Results are checked
+against a plain per-subscriber, per-ticker loop on a sample.
+
+Run: python benchmark_alerts.py [subscribers]
+"""
+
+import sys
+import time
+import json
+
+import numpy as np
+
+from alert_rules import RuleSet, SubscriptionIndex, evaluate_alerts, parse_condition, prediction_table
+from benchmark_email import synthetic_predictions
+
+with open("alert_rules.json", "r") as f:
+    RULES = json.load(f)["rules"]
+
+
+def synthetic_subscriptions(count, rule_names, seed=7):
+    """{email: [1-3 rule names]}"""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 4, count)
+    return {f"user{i}@example.com": list(rng.choice(rule_names, size, replace=False))
+            for i, size in enumerate(sizes)}
+
+
+def matches_naive(condition, prediction):
+    ops = {">": lambda a, b: a > b, ">=": lambda a, b: a >= b, "<": lambda a, b: a < b,
+           "<=": lambda a, b: a <= b, "==": lambda a, b: a == b, "!=": lambda a, b: a != b}
+    return any(all(ops[op](prediction[field], value) for field, op, value in terms)
+               for terms in parse_condition(condition))
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print("=" * 60)
+    print("🔔 Alert rules benchmark")
+    print("=" * 60)
+
+    rng = np.random.default_rng(3)
+    predictions = synthetic_predictions(5000)
+    for p in predictions:
+        p["change_pct"] *= 2
+        p["rsi"] = float(rng.uniform(10, 90))
+    rule_set = RuleSet(RULES)
+    tickers, table = prediction_table(predictions)
+
+    evaluate_seconds = min(timed(lambda: rule_set.evaluate(table))[1] for _ in range(20))
+    matches = rule_set.evaluate(table)
+    print(f"\nEvaluate {len(rule_set.names)} rules x {len(tickers)} tickers: {evaluate_seconds * 1000:.2f} ms")
+    for name, row in zip(rule_set.names, matches):
+        print(f"  {name:<18}{int(row.sum()):>6} tickers")
+
+    subscriptions = synthetic_subscriptions(subscribers, rule_set.names)
+    index, build_seconds = timed(lambda: SubscriptionIndex(subscriptions, rule_set.names))
+    print(f"\nIndex {len(subscriptions):,} subscribers ({index.pairs:,} subscriptions): {build_seconds:.2f}s")
+
+    groups, route_seconds = timed(lambda: evaluate_alerts(predictions, rule_set, index))
+    print(f"Evaluate + route: {route_seconds:.2f}s -> {len(groups)} groups, "
+          f"{sum(len(g['recipients']) for g in groups):,} recipients (one render per group)")
+
+    # Check a sample against a plain loop
+    ok = True
+    group_of = {email: g for g in groups for email in g["recipients"]}
+    for email in list(subscriptions)[::max(1, subscribers // 500)]:
+        fired = [r for r in subscriptions[email] if any(matches_naive(RULES[r], p) for p in predictions)]
+        group = group_of.get(email)
+        ok &= sorted(fired) == sorted(group["rules"] if group else [])
+        for rule in fired:
+            expected = [p["ticker"] for p in predictions if matches_naive(RULES[rule], p)]
+            ok &= group["tickers"][rule] == expected
+
+    print("✅ Routing matches the per-subscriber loop" if ok else "❌ Routing differs from the per-subscriber loop")
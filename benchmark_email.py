@@ -0,0 +1,84 @@
+"""
+Email Render Benchmark
+Times email_template.render_email for reports with hundreds of ticker cards
+and checks that the HTML part stays under Gmail's clipping limit (no network
+or SMTP needed).
+
+Run: python benchmark_email.py
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+from email_template import EMAIL_SIZE_BUDGET, GMAIL_CLIP_BYTES, render_email
+
+URL = "https://your-app.streamlit.app"
+
+
+def synthetic_predictions(count, seed=42):
+    """Prediction dicts shaped like prediction_pipeline.run_pipeline output"""
+    rng = np.random.default_rng(seed)
+    predictions = []
+    for i in range(count):
+        current = float(rng.uniform(10, 900))
+        predicted = current * (1 + rng.normal(0, 0.01))
+        predictions.append({
+            "ticker": f"T{i:04d}",
+            "current_price": current,
+            "predicted_price": predicted,
+            "change": predicted - current,
+            "change_pct": (predicted - current) / current * 100,
+            "lower_bound": predicted * 0.98,
+            "upper_bound": predicted * 1.02,
+            "last_date": "2024-06-27",
+            "next_date": "2024-06-28",
+        })
+    return predictions
+
+
+def best_of(func, repeats=20):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("📧 Email render benchmark")
+    print("=" * 60)
+    generated = datetime(2024, 6, 27, 16, 45)
+    ok = True
+
+    print(f"\n{'Cards':>6}{'Render ms':>11}{'HTML KB':>9}{'Shown':>7}{'Text KB':>9}{'Full KB':>9}")
+    for count in (10, 100, 300, 1000):
+        predictions = synthetic_predictions(count)
+        report = render_email(predictions, URL, generated)
+        full = render_email(predictions, URL, generated, budget=None)
+        seconds = best_of(lambda: render_email(predictions, URL, generated))
+
+        print(f"{count:>6}{seconds * 1000:>11.2f}{report['bytes'] / 1024:>9.1f}{report['shown']:>7}"
+              f"{len(report['text'].encode()) / 1024:>9.1f}{full['bytes'] / 1024:>9.1f}")
+
+        ok &= report["bytes"] <= EMAIL_SIZE_BUDGET < GMAIL_CLIP_BYTES
+        ok &= report["shown"] + report["omitted"] == count
+        ok &= report["html"].endswith("</html>") and "Unsubscribe" in report["html"]
+
+    # Every interpolated field is HTML-escaped, including the dashboard URL
+    hostile = dict(synthetic_predictions(1)[0], ticker='<b>"X')
+    report = render_email([hostile], URL + '/"><script>x()</script>', generated, intro="<i>alert</i>")
+    escaped = not any(raw in report["html"] for raw in ("<script>", '<b>"X', "<i>alert"))
+    ok &= escaped
+    print("\nHostile ticker, URL and intro:", "escaped" if escaped else "NOT ESCAPED")
+
+    index = dict(synthetic_predictions(1)[0], ticker="^GSPC")
+    encoded = "?stock=%5EGSPC" in render_email([index], URL, generated)["html"]
+    ok &= encoded
+    print("Index symbol in the card link:", "URL-encoded" if encoded else "NOT ENCODED")
+
+    print(f"\nBudget: {EMAIL_SIZE_BUDGET / 1024:.0f} KB (Gmail clips at {GMAIL_CLIP_BYTES / 1024:.0f} KB)")
+    print("✅ Every report fits the size budget" if ok else "❌ Size budget check failed")
@@ -0,0 +1,183 @@
+"""
+Indicator Kernel Benchmark
+Checks that indicator_kernels reproduces the pandas feature path and times
+both on long synthetic histories, then compares the peak memory of building
+and scaling one ticker's feature matrix with the pandas path versus the
+preallocated build (float64 and float32). No network needed.
+
+Run: python benchmark_indicators.py
+"""
+
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+import indicator_kernels as kernels
+from feature_spec import model_feature_columns
+from prediction_pipeline import engineer_features
+
+# Relative tolerance for the equivalence check
+RTOL = 1e-8
+
+
+def synthetic_history(rows, seed=42):
+    """Random-walk OHLCV bars on business days"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2024-12-31", periods=rows)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, rows)))
+    open_ = close * (1 + rng.normal(0, 0.003, rows))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, rows))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, rows))
+    volume = rng.integers(1_000_000, 50_000_000, rows).astype(float)
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+                        index=index)
+
+
+def best_of(func, repeats=5):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def check_equivalence(df_raw):
+    """Compare every column of the kernel frame with the pandas frame"""
+    expected = engineer_features(df_raw)
+    actual = kernels.engineer_features_fast(df_raw)
+
+    print(f"Rows: pandas {len(expected)}, kernels {len(actual)}")
+    ok = list(expected.columns) == list(actual.columns) and expected.index.equals(actual.index)
+    if not ok:
+        print("   ❌ Columns or rows differ")
+        return False
+
+    for col in expected.columns:
+        a, b = expected[col].to_numpy(), actual[col].to_numpy()
+        err = np.max(np.abs(a - b) / np.maximum(np.abs(a), 1e-12))
+        passed = np.allclose(a, b, rtol=RTOL, atol=1e-10)
+        ok &= passed
+        if not passed:
+            print(f"   ❌ {col}: max relative error {err:.2e}")
+
+    print("   ✅ All columns match" if ok else "   ❌ Mismatch")
+    return ok
+
+
+def check_kernels(x):
+    """Each primitive against its pandas counterpart"""
+    s = pd.Series(x)
+    checks = {
+        "rolling_mean": (kernels.rolling_mean(x, 20), s.rolling(20).mean()),
+        "rolling_std": (kernels.rolling_std(x, 30), s.rolling(30).std()),
+        "ema": (kernels.ema(x, 26), s.ewm(span=26, adjust=False).mean()),
+    }
+    ok = True
+    for name, (a, b) in checks.items():
+        passed = np.allclose(a, b.to_numpy(), rtol=RTOL, atol=1e-10, equal_nan=True)
+        ok &= passed
+        print(f"   {'✅' if passed else '❌'} {name}")
+    return ok
+
+
+def benchmark(rows_list=(1_000, 7_500, 30_000)):
+    print(f"\n{'Rows':>8}{'pandas ms':>12}{'kernels ms':>12}{'speedup':>10}")
+    for rows in rows_list:
+        df_raw = synthetic_history(rows)
+        t_pandas = best_of(lambda: engineer_features(df_raw))
+        t_kernels = best_of(lambda: kernels.engineer_features_fast(df_raw))
+        print(f"{rows:>8}{t_pandas * 1000:>12.2f}{t_kernels * 1000:>12.2f}{t_pandas / t_kernels:>9.1f}x")
+
+    x = synthetic_history(30_000)["Close"].to_numpy()
+    s = pd.Series(x)
+    print(f"\nMulti-window rolling std (5 windows, 30k rows):")
+    windows = (5, 10, 20, 30, 50)
+    t_pandas = best_of(lambda: [s.rolling(w).std() for w in windows])
+    t_kernels = best_of(lambda: kernels.rolling_std(x, windows))
+    print(f"   pandas {t_pandas * 1000:.2f} ms, kernels {t_kernels * 1000:.2f} ms "
+          f"({t_pandas / t_kernels:.1f}x)")
+
+
+def check_matrix_build(df_raw, features=None):
+    """build_feature_frame against the pandas path, in float64 and float32"""
+    expected = engineer_features(df_raw, features)
+    ok = True
+    for dtype, rtol in ((np.float64, RTOL), (np.float32, 1e-5)):
+        actual = kernels.build_feature_frame(df_raw, features, dtype)
+        passed = (list(expected.columns) == list(actual.columns) and expected.index.equals(actual.index)
+                  and np.allclose(expected.to_numpy(), actual.to_numpy(), rtol=rtol, atol=1e-6))
+        ok &= passed
+        print(f"   {'✅' if passed else '❌'} {np.dtype(dtype).name}" + (" (pruned spec)" if features else ""))
+    return ok
+
+
+def pandas_training_matrix(df_raw):
+    """Feature frame -> model inputs -> scaled train/test, as train_model did before"""
+    df = engineer_features(df_raw)
+    X = df[model_feature_columns(df)].to_numpy()
+    split = int(len(X) * 0.8)
+    scaler = StandardScaler()
+    return scaler.fit_transform(X[:split]), scaler.transform(X[split:])
+
+
+def preallocated_training_matrix(df_raw, dtype=np.float64):
+    df = kernels.build_feature_frame(df_raw, dtype=dtype)
+    X = kernels.column_block(df, model_feature_columns(df))
+    split = int(len(X) * 0.8)
+    scaler = StandardScaler()
+    return scaler.fit_transform(X[:split]), scaler.transform(X[split:])
+
+
+def peak_bytes(func):
+    """Peak traced allocation (NumPy buffers included) while func runs"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def memory_benchmark(rows_list=(7_500, 30_000)):
+    print(f"\n{'Rows':>8}{'pandas MB':>12}{'prealloc MB':>13}{'float32 MB':>12}{'ratio':>8}")
+    ok = True
+    for rows in rows_list:
+        df_raw = synthetic_history(rows)
+        raw_mb = df_raw.memory_usage().sum() / 1e6
+        pandas_mb = peak_bytes(lambda: pandas_training_matrix(df_raw)) / 1e6
+        prealloc_mb = peak_bytes(lambda: preallocated_training_matrix(df_raw)) / 1e6
+        float32_mb = peak_bytes(lambda: preallocated_training_matrix(df_raw, np.float32)) / 1e6
+        print(f"{rows:>8}{pandas_mb:>12.1f}{prealloc_mb:>13.1f}{float32_mb:>12.1f}"
+              f"{prealloc_mb / pandas_mb:>8.2f}   (raw bars {raw_mb:.1f} MB)")
+        ok &= prealloc_mb <= 0.6 * pandas_mb and float32_mb < prealloc_mb
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Indicator kernels vs pandas" + (" (numba JIT)" if kernels.HAVE_NUMBA else ""))
+    print("=" * 60)
+
+    print("\n1️⃣ Primitive kernels")
+    kernels_ok = check_kernels(synthetic_history(5_000)["Close"].to_numpy())
+
+    print("\n2️⃣ Full feature frame (30 years of bars)")
+    frame_ok = check_equivalence(synthetic_history(7_500))
+
+    print("\n3️⃣ Preallocated feature matrix")
+    history = synthetic_history(7_500)
+    matrix_ok = check_matrix_build(history) and check_matrix_build(history, ["RSI", "MACD", "Volatility_30"])
+
+    print("\n4️⃣ Timings")
+    benchmark()
+
+    print("\n5️⃣ Peak memory: features -> model inputs -> scaled train/test")
+    memory_ok = memory_benchmark()
+
+    print()
+    print("✅ Kernels match the pandas path" if kernels_ok and frame_ok and matrix_ok else "❌ Equivalence check failed")
+    print("✅ Preallocated build at most 60% of the pandas peak" if memory_ok else "❌ Memory target missed")
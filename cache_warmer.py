@@ -0,0 +1,128 @@
+"""
+Cache Warmer
+Optional background job for the Streamlit server process. Once a session's
+daily bar is due (checked every few minutes with `schedule`), it refreshes
+data, features, models and predictions for the universe so that the first
+visitor after the close hits a warm cache instead of paying for the fetch
+and training.
+
+Tickers are warmed most-requested first, then the rest of the universe. The
+work runs on one background thread and is bounded twice:
+
+  - WARM_CPU_BUDGET: CPU seconds per cycle; tickers left over wait for the
+    next cycle (or for a visitor)
+  - WARM_CPU_SHARE:  fraction of a core the thread may use; it sleeps after
+    each ticker in proportion to the CPU it just spent
+
+Enable in the app with WARM_CACHE=1.
+"""
+
+import os
+import time
+import threading
+from collections import Counter
+
+import schedule
+
+from market_calendar import NYSE
+
+# CPU seconds one warm-up cycle may spend
+WARM_CPU_BUDGET = float(os.getenv("WARM_CPU_BUDGET", "300"))
+
+# Fraction of one core the warmer may use while running
+WARM_CPU_SHARE = float(os.getenv("WARM_CPU_SHARE", "0.5"))
+
+# How many of the most-requested tickers go first
+WARM_TOP_REQUESTED = int(os.getenv("WARM_TOP_REQUESTED", "20"))
+
+# How often the scheduler checks whether a new session has closed
+WARM_CHECK_MINUTES = 5
+
+
+class CacheWarmer:
+    """Refreshes `warm_one(ticker)` for the universe after each session close"""
+
+    def __init__(self, warm_one, universe, cpu_budget=WARM_CPU_BUDGET, cpu_share=WARM_CPU_SHARE,
+                 top_requested=WARM_TOP_REQUESTED):
+        self.warm_one = warm_one
+        self.universe = list(universe)
+        self.cpu_budget = cpu_budget
+        self.cpu_share = cpu_share
+        self.top_requested = top_requested
+        self.requests = Counter()
+        self.scheduler = schedule.Scheduler()
+        self.last_session = None
+        self.last_run = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def record_request(self, ticker):
+        """Count an interactive request so popular tickers are warmed first"""
+        with self._lock:
+            self.requests[ticker.upper()] += 1
+
+    def targets(self):
+        """Most-requested tickers first, then the rest of the universe"""
+        with self._lock:
+            popular = [t for t, _ in self.requests.most_common(self.top_requested)]
+        return list(dict.fromkeys(popular + self.universe))
+
+    def run_once(self):
+        """Warm every target until the CPU budget is spent; returns the cycle's stats"""
+        started_cpu = time.thread_time()
+        started = time.perf_counter()
+        warmed, failed = [], {}
+        targets = self.targets()
+
+        for ticker in targets:
+            if self._stop.is_set() or time.thread_time() - started_cpu >= self.cpu_budget:
+                break
+            ticker_cpu = time.thread_time()
+            try:
+                self.warm_one(ticker)
+                warmed.append(ticker)
+            except Exception as e:
+                failed[ticker] = str(e)
+
+            # Throttle to cpu_share of a core: sleep in proportion to the CPU just used
+            spent = time.thread_time() - ticker_cpu
+            if 0 < self.cpu_share < 1:
+                self._stop.wait(spent * (1 / self.cpu_share - 1))
+
+        self.last_run = {
+            "warmed": len(warmed),
+            "failed": failed,
+            "skipped": len(targets) - len(warmed) - len(failed),
+            "cpu_seconds": time.thread_time() - started_cpu,
+            "seconds": time.perf_counter() - started,
+        }
+        print(f"Cache warmer: {len(warmed)}/{len(targets)} tickers in {self.last_run['seconds']:.0f}s "
+              f"({self.last_run['cpu_seconds']:.0f} CPU s, {len(failed)} failed, "
+              f"{self.last_run['skipped']} over budget)")
+        return self.last_run
+
+    def check(self):
+        """Scheduled job: warm once per newly completed session"""
+        session = NYSE.latest_completed_session()
+        if session != self.last_session:
+            self.last_session = session
+            self.run_once()
+
+    def start(self):
+        """Run the scheduler on a daemon thread (first check immediately); returns self"""
+        self.scheduler.every(WARM_CHECK_MINUTES).minutes.do(self.check)
+
+        def loop():
+            self.check()
+            while not self._stop.is_set():
+                self.scheduler.run_pending()
+                self._stop.wait(30)
+
+        threading.Thread(target=loop, daemon=True, name="cache-warmer").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return dict(self.last_run, last_session=self.last_session, tracked_tickers=len(self.requests))
@@ -1,17 +1,25 @@
 import os
+import sys
 import json
+import time
+import hashlib
+import argparse
 import smtplib
+import threading
+from email.policy import compat32
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
 import pandas as pd
-import numpy as np
-import yfinance as yf
-from sklearn.linear_model import Ridge
-from sklearn.preprocessing import StandardScaler
-import warnings
 
-warnings.filterwarnings("ignore")
+from alert_rules import ALERT_RULES_FILE, ALERT_SUBSCRIPTIONS_FILE, RuleSet, SubscriptionIndex, evaluate_alerts
+from email_template import render_email
+from market_calendar import EXCHANGE_TZ, NYSE
+from prediction_log import PredictionLog
+from prediction_pipeline import train_and_predict
+from send_log import FAILED, SEND_LOG_DIR, SENT, SendLog
 
 # ==================================================================================
 # CONFIGURATION
@@ -21,330 +29,70 @@ SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SENDER_EMAIL = os.getenv("SENDER_EMAIL")
 SENDER_PASSWORD = os.getenv("SENDER_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+SUBSCRIBERS_FILE = os.getenv("SUBSCRIBERS_FILE", "subscribers.json")
 
-# Stocks to analyze
-STOCKS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "META", "NVDA", "JPM", "BAC", "JNJ"]
+# Parallel SMTP sessions and messages sent per session before reconnecting
+SMTP_WORKERS = int(os.getenv("SMTP_WORKERS", "4"))
+MESSAGES_PER_CONNECTION = int(os.getenv("MESSAGES_PER_CONNECTION", "100"))
 
-# ==================================================================================
-# FEATURE ENGINEERING
-# ==================================================================================
-def engineer_features(df_raw):
-    """Engineer technical indicators"""
-    df = df_raw.copy()
-    
-    # Moving Averages
-    df["MA_5"] = df["Close"].rolling(5).mean()
-    df["MA_10"] = df["Close"].rolling(10).mean()
-    df["MA_20"] = df["Close"].rolling(20).mean()
-    df["MA_50"] = df["Close"].rolling(50).mean()
-    
-    # Exponential Moving Averages
-    df["EMA_12"] = df["Close"].ewm(span=12, adjust=False).mean()
-    df["EMA_26"] = df["Close"].ewm(span=26, adjust=False).mean()
-    
-    # MACD
-    df["MACD"] = df["EMA_12"] - df["EMA_26"]
-    df["MACD_Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
-    
-    # RSI
-    delta = df["Close"].diff()
-    gain = delta.where(delta > 0, 0).rolling(14).mean()
-    loss = -delta.where(delta < 0, 0).rolling(14).mean()
-    rs = gain / loss
-    df["RSI"] = 100 - (100 / (1 + rs))
-    
-    # Bollinger Bands
-    df["BB_Middle"] = df["Close"].rolling(20).mean()
-    bb_std = df["Close"].rolling(20).std()
-    df["BB_Upper"] = df["BB_Middle"] + (2 * bb_std)
-    df["BB_Lower"] = df["BB_Middle"] - (2 * bb_std)
-    df["BB_Width"] = df["BB_Upper"] - df["BB_Lower"]
-    
-    # Price Changes
-    df["Daily_Return"] = df["Close"].pct_change()
-    df["Price_Change"] = df["Close"].diff()
-    df["Log_Return"] = np.log(df["Close"] / df["Close"].shift(1))
-    
-    # Volume Metrics
-    df["Volume_MA_10"] = df["Volume"].rolling(10).mean()
-    df["Volume_Ratio"] = df["Volume"] / df["Volume_MA_10"]
-    
-    # Volatility
-    df["Volatility_10"] = df["Daily_Return"].rolling(10).std()
-    df["Volatility_30"] = df["Daily_Return"].rolling(30).std()
-    
-    # Momentum
-    df["Momentum_5"] = df["Close"] - df["Close"].shift(5)
-    df["Momentum_10"] = df["Close"] - df["Close"].shift(10)
-    df["Momentum_20"] = df["Close"] - df["Close"].shift(20)
-    
-    # Rate of Change
-    df["ROC_5"] = ((df["Close"] - df["Close"].shift(5)) / df["Close"].shift(5)) * 100
-    df["ROC_10"] = ((df["Close"] - df["Close"].shift(10)) / df["Close"].shift(10)) * 100
-    
-    # High-Low Range
-    df["HL_Range"] = df["High"] - df["Low"]
-    df["HL_Pct"] = (df["HL_Range"] / df["Close"]) * 100
-    
-    # Target
-    df["Target"] = df["Close"].shift(-1)
-    
-    # Clean
-    df = df.replace([np.inf, -np.inf], np.nan).dropna()
-    
-    return df
+# Retry rounds for transient failures; the wait doubles each round
+SEND_RETRIES = int(os.getenv("SEND_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "2.0"))
 
-# ==================================================================================
-# TRAIN AND PREDICT
-# ==================================================================================
-def train_and_predict(ticker, start_date="2015-01-01"):
-    """Train model and make prediction for a stock"""
-    try:
-        # Fetch data
-        df_raw = yf.download(
-            ticker,
-            start=start_date,
-            end=datetime.now().strftime("%Y-%m-%d"),
-            progress=False
-        )
-        
-        if isinstance(df_raw.columns, pd.MultiIndex):
-            df_raw.columns = df_raw.columns.get_level_values(0)
-        
-        if len(df_raw) < 100:
-            return None
-        
-        # Engineer features
-        df = engineer_features(df_raw)
-        
-        # Prepare data
-        exclude = ["Open", "High", "Low", "Close", "Volume", "Adj Close", "Target"]
-        feature_cols = [c for c in df.columns if c not in exclude]
-        
-        X = df[feature_cols]
-        y = df["Target"]
-        
-        # Train
-        split = int(len(X) * 0.8)
-        X_train = X.iloc[:split]
-        y_train = y.iloc[:split]
-        
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        
-        model = Ridge(alpha=1.0, random_state=42)
-        model.fit(X_train_scaled, y_train)
-        
-        # Predict
-        latest = df.iloc[-1:][feature_cols]
-        latest_scaled = scaler.transform(latest)
-        next_day_prediction = model.predict(latest_scaled)[0]
-        
-        current_price = df["Close"].iloc[-1]
-        change = next_day_prediction - current_price
-        change_pct = (change / current_price) * 100
-        
-        last_date = df.index[-1]
-        next_date = last_date + timedelta(days=1)
-        
-        return {
-            "ticker": ticker,
-            "current_price": current_price,
-            "predicted_price": next_day_prediction,
-            "change": change,
-            "change_pct": change_pct,
-            "last_date": last_date.strftime("%Y-%m-%d"),
-            "next_date": next_date.strftime("%Y-%m-%d")
-        }
-    
-    except Exception as e:
-        print(f"Error processing {ticker}: {e}")
-        return None
+# Report date override (YYYY-MM-DD) for manual re-runs; defaults to the latest completed session
+REPORT_DATE = os.getenv("REPORT_DATE")
+
+# Stocks to analyze
+STOCKS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "META", "NVDA", "JPM", "BAC", "JNJ"]
 
 # ==================================================================================
 # EMAIL GENERATION
 # ==================================================================================
+def generate_email(predictions, generated_at=None):
+    """Render the HTML and plain-text parts within the size budget"""
+    report = render_email(predictions, STREAMLIT_APP_URL, generated_at)
+    if report["omitted"]:
+        print(f"Email size budget reached: {report['omitted']} predictions linked instead of shown")
+    return report
+
 def generate_email_html(predictions):
     """Generate HTML email content"""
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 800px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                text-align: center;
-                border-radius: 10px;
-                margin-bottom: 30px;
-            }}
-            .header h1 {{
-                margin: 0;
-                font-size: 28px;
-            }}
-            .date {{
-                color: #f0f0f0;
-                margin-top: 10px;
-            }}
-            .stock-card {{
-                background: #f8f9fa;
-                border-left: 5px solid #667eea;
-                padding: 20px;
-                margin-bottom: 20px;
-                border-radius: 5px;
-            }}
-            .stock-header {{
-                font-size: 24px;
-                font-weight: bold;
-                color: #667eea;
-                margin-bottom: 15px;
-            }}
-            .metrics {{
-                display: grid;
-                grid-template-columns: repeat(2, 1fr);
-                gap: 15px;
-                margin-top: 15px;
-            }}
-            .metric {{
-                background: white;
-                padding: 15px;
-                border-radius: 5px;
-                border: 1px solid #ddd;
-            }}
-            .metric-label {{
-                font-size: 12px;
-                color: #666;
-                text-transform: uppercase;
-            }}
-            .metric-value {{
-                font-size: 20px;
-                font-weight: bold;
-                margin-top: 5px;
-            }}
-            .positive {{
-                color: #28a745;
-            }}
-            .negative {{
-                color: #dc3545;
-            }}
-            .cta-button {{
-                display: inline-block;
-                background: #667eea;
-                color: white;
-                padding: 15px 30px;
-                text-decoration: none;
-                border-radius: 5px;
-                margin-top: 15px;
-                font-weight: bold;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 40px;
-                padding-top: 20px;
-                border-top: 2px solid #ddd;
-                color: #666;
-                font-size: 12px;
-            }}
-            .disclaimer {{
-                background: #fff3cd;
-                border: 1px solid #ffc107;
-                padding: 15px;
-                border-radius: 5px;
-                margin-top: 30px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>📈 Daily Stock Market Predictions</h1>
-            <p class="date">Report Generated: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}</p>
-        </div>
-    """
-    
-    for pred in predictions:
-        if pred is None:
-            continue
-        
-        change_class = "positive" if pred["change_pct"] >= 0 else "negative"
-        change_arrow = "↑" if pred["change_pct"] >= 0 else "↓"
-        
-        html += f"""
-        <div class="stock-card">
-            <div class="stock-header">{pred['ticker']}</div>
-            <div class="metrics">
-                <div class="metric">
-                    <div class="metric-label">Current Close</div>
-                    <div class="metric-value">${pred['current_price']:.2f}</div>
-                </div>
-                <div class="metric">
-                    <div class="metric-label">Predicted Next Close</div>
-                    <div class="metric-value {change_class}">
-                        ${pred['predicted_price']:.2f} {change_arrow}
-                    </div>
-                </div>
-                <div class="metric">
-                    <div class="metric-label">Expected Change</div>
-                    <div class="metric-value {change_class}">
-                        {pred['change_pct']:+.2f}% (${pred['change']:+.2f})
-                    </div>
-                </div>
-                <div class="metric">
-                    <div class="metric-label">Next Trading Day</div>
-                    <div class="metric-value">{pred['next_date']}</div>
-                </div>
-            </div>
-            <a href="{STREAMLIT_APP_URL}?stock={pred['ticker']}" class="cta-button">
-                View Full Analysis →
-            </a>
-        </div>
-        """
-    
-    html += f"""
-        <div class="disclaimer">
-            <strong>⚠️ Disclaimer:</strong> These predictions are generated by AI for educational purposes only. 
-            This is not financial advice. Always do your own research and consult with a qualified financial 
-            advisor before making investment decisions. Past performance does not guarantee future results.
-        </div>
-        
-        <div class="footer">
-            <p><strong>AI Stock Market Predictor</strong></p>
-            <p>You're receiving this because you subscribed to daily predictions.</p>
-            <p><a href="{STREAMLIT_APP_URL}">Visit Dashboard</a> | 
-               <a href="{STREAMLIT_APP_URL}">Unsubscribe</a></p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html
+    return generate_email(predictions)["html"]
 
 # ==================================================================================
 # SEND EMAIL
 # ==================================================================================
-def send_email(to_email, subject, html_content):
+def open_connection():
+    """Connected, authenticated SMTP session"""
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    if SMTP_STARTTLS:
+        server.starttls()
+    if SENDER_PASSWORD:
+        server.login(SENDER_EMAIL, SENDER_PASSWORD)
+    return server
+
+def build_message(subject, html_content, text_content=None, to_email=None):
+    """MIME message; without `to_email` the To header is left for the caller to prepend"""
+    msg = MIMEMultipart('alternative')
+    msg['From'] = SENDER_EMAIL
+    if to_email is not None:
+        msg['To'] = to_email
+    msg['Subject'] = subject
+    
+    # Plain text first: clients show the last part they can render
+    if text_content is not None:
+        msg.attach(MIMEText(text_content, 'plain'))
+    html_part = MIMEText(html_content, 'html')
+    msg.attach(html_part)
+    return msg
+
+def send_email(to_email, subject, html_content, text_content=None):
     """Send email via SMTP"""
     try:
-        msg = MIMEMultipart('alternative')
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        html_part = MIMEText(html_content, 'html')
-        msg.attach(html_part)
-        
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
+        msg = build_message(subject, html_content, text_content, to_email)
+        with open_connection() as server:
             server.send_message(msg)
         
         return True
@@ -352,14 +100,108 @@ def send_email(to_email, subject, html_content):
         print(f"Error sending email to {to_email}: {e}")
         return False
 
+def _smtp_error(e):
+    """(transient?, message) for a failed send"""
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        code, text = next(iter(e.recipients.values()))
+    elif isinstance(e, smtplib.SMTPResponseException):
+        code, text = e.smtp_code, e.smtp_error
+    else:
+        # Dropped connection, timeout, ...: worth another try
+        return True, str(e) or type(e).__name__
+    text = text.decode(errors="replace") if isinstance(text, bytes) else str(text)
+    return 400 <= code < 500, f"{code} {text}"
+
+def deliver(recipients, subject, report, workers=None, per_connection=None, log=None, retries=None):
+    """
+    Send the report to every recipient over `workers` persistent SMTP
+    connections (default SMTP_WORKERS), each reused for up to `per_connection`
+    messages (default MESSAGES_PER_CONNECTION). The MIME body is serialized
+    once; only the To header differs per recipient.
+    
+    Transient failures (4xx replies, dropped connections) are retried up to
+    `retries` times (default SEND_RETRIES) with exponential backoff; each
+    outcome is written to `log` (a SendLog) as it happens.
+    Returns {"sent", "failed" (list of (recipient, error)), "retried", "connections", "seconds"}.
+    """
+    workers = workers or SMTP_WORKERS
+    per_connection = per_connection or MESSAGES_PER_CONNECTION
+    retries = SEND_RETRIES if retries is None else retries
+    # sendmail sends bytes as given, so serialize with the CRLF line endings SMTP requires
+    body = build_message(subject, report["html"], report["text"]).as_bytes(policy=compat32.clone(linesep="\r\n"))
+    lock = threading.Lock()
+    stats = {"sent": 0, "failed": [], "retried": 0, "connections": 0}
+    
+    def run(chunk):
+        """Send one worker's share; returns the transient failures"""
+        server, used, sent, transient, permanent, connections = None, 0, 0, [], [], 0
+        for i, email in enumerate(chunk):
+            if server is None or used >= per_connection:
+                if server is not None:
+                    try:
+                        server.quit()
+                    except (smtplib.SMTPException, OSError):
+                        pass
+                try:
+                    server, used = open_connection(), 0
+                    connections += 1
+                except (smtplib.SMTPException, OSError) as e:
+                    # Server unreachable: leave the rest of the share for the next round
+                    transient.extend((r, f"connect failed: {e}") for r in chunk[i:])
+                    server = None
+                    break
+            used += 1
+            try:
+                server.sendmail(SENDER_EMAIL, [email], b"To: " + email.encode() + b"\r\n" + body)
+                sent += 1
+                if log is not None:
+                    log.record(email, SENT)
+            except (smtplib.SMTPException, OSError) as e:
+                retry, error = _smtp_error(e)
+                (transient if retry else permanent).append((email, error))
+                if not isinstance(e, smtplib.SMTPResponseException) or e.smtp_code == 421:
+                    server = None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        with lock:
+            stats["sent"] += sent
+            stats["failed"].extend(permanent)
+            stats["connections"] += connections
+        return transient
+    
+    started = time.perf_counter()
+    pending = list(recipients)
+    transient = []
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = RETRY_BACKOFF * 2 ** (attempt - 1)
+            print(f"Retrying {len(pending)} transient failures in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{retries + 1})")
+            time.sleep(delay)
+            stats["retried"] += len(pending)
+        
+        n = max(1, min(workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            transient = [f for failures in pool.map(run, [pending[i::n] for i in range(n)]) for f in failures]
+        pending = [email for email, _ in transient]
+        if not pending:
+            break
+    
+    stats["failed"].extend(transient)
+    if log is not None:
+        for email, error in stats["failed"]:
+            log.record(email, FAILED, error)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
 # ==================================================================================
 # MAIN FUNCTION
 # ==================================================================================
-def main():
-    """Main execution function"""
-    print(f"Starting daily prediction email task at {datetime.now()}")
-    
-    # Generate predictions for all stocks
+def generate_predictions():
+    """Run the prediction pipeline for every stock in STOCKS"""
     print("Generating predictions...")
     predictions = []
     for ticker in STOCKS:
@@ -370,33 +212,248 @@ def main():
             print(f"    ✓ {ticker}: ${pred['current_price']:.2f} → ${pred['predicted_price']:.2f}")
     
     print(f"\nSuccessfully generated {len(predictions)} predictions")
+    return predictions
+
+def resolve_report_date(report_date=None):
+    """One report per completed session; re-runs of the same day share its log"""
+    return str(report_date or REPORT_DATE or NYSE.latest_completed_session().date())
+
+def prepare_predictions(log, predictions=None):
+    """
+    (predictions, generated_at) for the log's report date: the persisted
+    artifact when it exists, otherwise computed (or taken from `predictions`)
+    and persisted. None on exchange holidays.
+    """
+    stored = log.load_predictions()
+    if stored is not None:
+        print(f"Using persisted predictions for {log.report_date} ({len(stored[0])} tickers)")
+        return stored
+    
+    if predictions is None:
+        # The cron runs every weekday; on exchange holidays there is no new bar to report
+        if not NYSE.is_session(datetime.now(EXCHANGE_TZ)):
+            print("Market closed today (NYSE holiday) - nothing to send")
+            return None
+        
+        # Generate predictions for all stocks (and keep them for the accuracy record)
+        predictions = generate_predictions()
+        PredictionLog().append(predictions, "email")
+    generated_at = datetime.now()
+    log.save_predictions(predictions, generated_at)
+    return predictions, generated_at
+
+def shard_of(email, shard_count):
+    """Stable shard of a subscriber (same in every process and on every runner)"""
+    digest = hashlib.sha1(email.strip().lower().encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+def main(predictions=None, subscribers_file=SUBSCRIBERS_FILE, report_date=None, shard_index=0, shard_count=1):
+    """
+    Main execution function. Safe to re-run: predictions are persisted in the
+    send log on the first run of a report date and reloaded afterwards, and
+    recipients that already got the report are skipped. Passing `predictions`
+    skips the holiday check and the prediction stage (used by the load test).
+    
+    With `shard_count` > 1 only subscribers hashed to `shard_index` are mailed,
+    and the predictions must already exist (run the `predict` command first)
+    so shards never repeat the prediction stage.
+    """
+    print(f"Starting daily prediction email task at {datetime.now()}"
+          + (f" (shard {shard_index + 1}/{shard_count})" if shard_count > 1 else ""))
+    
+    report_date = resolve_report_date(report_date)
+    log = SendLog(report_date, SEND_LOG_DIR, shard_index, shard_count)
+    if shard_count > 1 and predictions is None and log.load_predictions() is None:
+        raise SystemExit(f"No predictions persisted for {report_date}; run `python email_automation.py predict` first")
+    
+    prepared = prepare_predictions(log, predictions)
+    if prepared is None:
+        return
+    predictions, generated_at = prepared
     
     # Load subscribers
-    subscribers_file = "subscribers.json"
     if not os.path.exists(subscribers_file):
         print("No subscribers found")
         return
     
     with open(subscribers_file, 'r') as f:
-        subscribers = json.load(f)
+        subscribers = list(dict.fromkeys(json.load(f)))
+    if shard_count > 1:
+        subscribers = [email for email in subscribers if shard_of(email, shard_count) == shard_index]
+    
+    delivered = log.delivered()
+    pending = [email for email in subscribers if email not in delivered]
+    print(f"Found {len(subscribers)} subscribers ({len(subscribers) - len(pending)} already sent for {report_date})")
+    
+    # Generate email (rendered once for every subscriber)
+    report = generate_email(predictions, generated_at)
+    subject = f"📈 Daily Stock Predictions - {pd.Timestamp(report_date).strftime('%B %d, %Y')}"
+    
+    # Send to the remaining subscribers over a few reused connections
+    try:
+        stats = deliver(pending, subject, report, log=log)
+    finally:
+        log.close()
+    for email, error in stats["failed"][:20]:
+        print(f"  ✗ {email}: {error}")
+    if len(stats["failed"]) > 20:
+        print(f"  ✗ ... and {len(stats['failed']) - 20} more failures")
+    
+    # Shard report: state of the whole shard, not just this attempt
+    outcomes = log.outcomes()
+    log.write_report({
+        "report_date": report_date,
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "subscribers": len(subscribers),
+        "delivered": sum(outcomes.get(email, ("",))[0] == SENT for email in subscribers),
+        "failed": [[email, outcomes[email][1]] for email in subscribers
+                   if outcomes.get(email, ("",))[0] == FAILED],
+        "sent_this_run": stats["sent"],
+        "retried": stats["retried"],
+        "connections": stats["connections"],
+        "seconds": stats["seconds"],
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+    })
+    
+    print(f"\nEmail task completed: {stats['sent']}/{len(pending)} emails sent successfully "
+          f"({stats['retried']} retries, {stats['connections']} connections, {stats['seconds']:.1f}s)")
+    return stats
+
+def predict(report_date=None):
+    """Compute and persist the shared prediction artifact for the shards"""
+    report_date = resolve_report_date(report_date)
+    prepared = prepare_predictions(SendLog(report_date, SEND_LOG_DIR))
+    
+    # Let the workflow's send jobs pick up the date (and skip holidays)
+    if os.getenv("GITHUB_OUTPUT"):
+        with open(os.getenv("GITHUB_OUTPUT"), "a") as f:
+            f.write(f"report_date={report_date if prepared is not None else ''}\n")
+    return prepared
+
+def merge_reports(report_date=None):
+    """Combine the shard reports of a date into summary.json; returns the summary"""
+    report_date = resolve_report_date(report_date)
+    log = SendLog(report_date, SEND_LOG_DIR)
+    reports = [r for r in log.reports() if "shard_index" in r]
+    
+    shard_count = max((r["shard_count"] for r in reports), default=0)
+    reports = [r for r in reports if r["shard_count"] == shard_count]
+    missing = sorted(set(range(shard_count)) - {r["shard_index"] for r in reports})
+    
+    summary = {
+        "report_date": report_date,
+        "shard_count": shard_count,
+        "missing_shards": missing,
+        "subscribers": sum(r["subscribers"] for r in reports),
+        "delivered": sum(r["delivered"] for r in reports),
+        "failed": [f for r in reports for f in r["failed"]],
+        "retried": sum(r["retried"] for r in reports),
+        "connections": sum(r["connections"] for r in reports),
+        "slowest_shard_seconds": max((r["seconds"] for r in reports), default=0.0),
+    }
+    with open(os.path.join(log.directory, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    
+    print(f"Delivery report for {report_date}: {len(reports)}/{shard_count} shards")
+    for r in sorted(reports, key=lambda r: r["shard_index"]):
+        print(f"  Shard {r['shard_index']}: {r['delivered']}/{r['subscribers']} delivered, "
+              f"{len(r['failed'])} failed, {r['seconds']:.1f}s")
+    if missing:
+        print(f"  ✗ Missing shards: {missing}")
+    print(f"Total: {summary['delivered']}/{summary['subscribers']} delivered, {len(summary['failed'])} failed")
+    return summary
+
+def send_alerts(report_date=None, rules_file=ALERT_RULES_FILE, subscriptions_file=ALERT_SUBSCRIPTIONS_FILE):
+    """
+    Evaluate the alert rules over the persisted predictions of a date and
+    mail each subscriber the tickers that tripped the rules they follow.
+    Subscribers with the same fired rules share one rendered email.
+    """
+    report_date = resolve_report_date(report_date)
+    stored = SendLog(report_date, SEND_LOG_DIR).load_predictions()
+    if stored is None:
+        raise SystemExit(f"No predictions persisted for {report_date}; run `python email_automation.py predict` first")
+    predictions, generated_at = stored
     
-    print(f"Found {len(subscribers)} subscribers")
+    rule_set = RuleSet.load(rules_file)
+    index = SubscriptionIndex.load(rule_set.names, subscriptions_file)
+    started = time.perf_counter()
+    groups = evaluate_alerts(predictions, rule_set, index)
+    print(f"Alerts for {report_date}: {len(rule_set.names)} rules over {len(predictions)} tickers, "
+          f"{sum(len(g['recipients']) for g in groups)}/{len(index.emails)} subscribers in {len(groups)} groups "
+          f"({time.perf_counter() - started:.3f}s)")
     
-    # Generate email
-    html_content = generate_email_html(predictions)
-    subject = f"📈 Daily Stock Predictions - {datetime.now().strftime('%B %d, %Y')}"
+    log = SendLog(report_date, os.path.join(SEND_LOG_DIR, "alerts"))
+    delivered = log.delivered()
+    by_ticker = {p["ticker"]: p for p in predictions if p is not None}
+    sent = 0
+    try:
+        for group in groups:
+            pending = [email for email in group["recipients"] if email not in delivered]
+            if not pending:
+                continue
+            tickers = list(dict.fromkeys(t for rule in group["rules"] for t in group["tickers"][rule]))
+            fired = "; ".join(f"{rule}: {', '.join(group['tickers'][rule])}" for rule in group["rules"])
+            report = render_email([by_ticker[t] for t in tickers], STREAMLIT_APP_URL, generated_at,
+                                  title="Stock Alerts", icon="🔔", intro=f"Rules triggered - {fired}")
+            subject = f"🔔 Stock Alerts ({', '.join(group['rules'])}) - {pd.Timestamp(report_date).strftime('%B %d, %Y')}"
+            stats = deliver(pending, subject, report, log=log)
+            sent += stats["sent"]
+            for email, error in stats["failed"][:20]:
+                print(f"  ✗ {email}: {error}")
+    finally:
+        log.close()
+    
+    print(f"Alert emails sent: {sent}")
+    return groups
+
+def _run_shard(shard_index, shard_count, subscribers_file, report_date):
+    main(subscribers_file=subscribers_file, report_date=report_date,
+         shard_index=shard_index, shard_count=shard_count)
+
+def fanout(shard_count, subscribers_file=SUBSCRIBERS_FILE, report_date=None):
+    """Predict once, deliver every shard in its own local process, then merge"""
+    report_date = resolve_report_date(report_date)
+    if predict(report_date) is None:
+        return None
+    with ProcessPoolExecutor(max_workers=shard_count) as pool:
+        futures = [pool.submit(_run_shard, i, shard_count, subscribers_file, report_date)
+                   for i in range(shard_count)]
+        for future in futures:
+            future.result()
+    return merge_reports(report_date)
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Daily prediction email job")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "predict", "send", "merge", "fanout", "alerts"],
+                        help="run: predict + send (default); predict: persist predictions only; "
+                             "send: deliver one shard; merge: combine shard reports; "
+                             "fanout: predict, send all shards as local processes, merge; "
+                             "alerts: mail alert-rule matches to their subscribers")
+    parser.add_argument("--shard-index", type=int, default=int(os.getenv("SHARD_INDEX", "0")))
+    parser.add_argument("--shard-count", type=int, default=int(os.getenv("SHARD_COUNT", "1")))
+    parser.add_argument("--subscribers-file", default=SUBSCRIBERS_FILE)
+    parser.add_argument("--report-date", help="YYYY-MM-DD (default: latest completed session)")
+    args = parser.parse_args(argv)
     
-    # Send to all subscribers
-    success_count = 0
-    for email in subscribers:
-        print(f"Sending to {email}...")
-        if send_email(email, subject, html_content):
-            success_count += 1
-            print(f"  ✓ Sent successfully")
-        else:
-            print(f"  ✗ Failed")
+    if not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be in [0, --shard-count)")
     
-    print(f"\nEmail task completed: {success_count}/{len(subscribers)} emails sent successfully")
+    if args.command == "predict":
+        predict(args.report_date)
+    elif args.command == "merge":
+        summary = merge_reports(args.report_date)
+        return 1 if summary["missing_shards"] else 0
+    elif args.command == "alerts":
+        send_alerts(args.report_date)
+    elif args.command == "fanout":
+        summary = fanout(args.shard_count, args.subscribers_file, args.report_date)
+        return 1 if summary and summary["missing_shards"] else 0
+    else:
+        main(subscribers_file=args.subscribers_file, report_date=args.report_date,
+             shard_index=args.shard_index, shard_count=args.shard_count)
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(cli())
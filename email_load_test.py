@@ -0,0 +1,148 @@
+"""
+Email Delivery Load Test
+Pushes synthetic subscribers through email_automation.main against the local
+SMTP sink (smtp_sink.py) and reports throughput, connection count and how
+injected failures were handled. No network or real mail account needed.
+
+Usage:
+    python email_load_test.py --subscribers 10000
+    python email_load_test.py --subscribers 100000 --workers 16 --per-connection 500
+    python email_load_test.py --subscribers 20000 --starttls --latency 0.002 --failure-rate 0.01 --drop-rate 0.001
+    python email_load_test.py --subscribers 1000 --crash-resume
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+
+import email_automation
+from benchmark_email import synthetic_predictions
+from smtp_sink import SMTPSink
+
+
+def write_subscribers(count, directory):
+    path = os.path.join(directory, "subscribers.json")
+    with open(path, "w") as f:
+        json.dump([f"user{i:06d}@example.com" for i in range(count)], f)
+    return path
+
+
+def _use_sink(sink, starttls=False, workers=4, per_connection=100, backoff=0.1):
+    email_automation.SMTP_SERVER = "127.0.0.1"
+    email_automation.SMTP_PORT = sink.port
+    email_automation.SMTP_STARTTLS = starttls
+    email_automation.SENDER_EMAIL = "predictions@example.com"
+    email_automation.SENDER_PASSWORD = "load-test"
+    email_automation.SMTP_WORKERS = workers
+    email_automation.MESSAGES_PER_CONNECTION = per_connection
+    email_automation.RETRY_BACKOFF = backoff
+
+
+def run(subscribers=10_000, workers=4, per_connection=100, cards=10, starttls=False,
+        latency=0.0, failure_rate=0.0, drop_rate=0.0, backoff=0.1, seed=42):
+    """Run one load test; returns the delivery stats merged with the sink's counters"""
+    sink = SMTPSink("127.0.0.1", 0, starttls=starttls, latency=latency,
+                    failure_rate=failure_rate, drop_rate=drop_rate, seed=seed).start()
+    _use_sink(sink, starttls, workers, per_connection, backoff)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_subscribers(subscribers, directory)
+            email_automation.SEND_LOG_DIR = os.path.join(directory, "send_log")
+            started = time.perf_counter()
+            stats = email_automation.main(synthetic_predictions(cards), path)
+            elapsed = time.perf_counter() - started
+    finally:
+        sink.stop()
+
+    server = sink.stats()
+    failed = len(stats["failed"])
+    print("\n" + "=" * 60)
+    print(f"Subscribers:        {subscribers:,}")
+    print(f"Delivered:          {stats['sent']:,} ({server['messages']:,} accepted by the sink)")
+    print(f"Failed:             {failed:,} after {stats['retried']:,} retries "
+          f"({server['rejected']:,} rejections, {server['dropped']:,} drops injected)")
+    print(f"Throughput:         {stats['sent'] / stats['seconds']:,.0f} msgs/s "
+          f"(end to end {elapsed:.1f}s incl. rendering)")
+    print(f"Connections:        {stats['connections']:,} client / {server['connections']:,} server"
+          + (f", {server['tls_sessions']:,} TLS" if starttls else ""))
+    print(f"Avg message:        {server['bytes'] / max(server['messages'], 1) / 1024:.1f} KB")
+
+    ok = stats["sent"] == server["messages"] and stats["sent"] + failed == subscribers
+    print("✅ Every subscriber accounted for" if ok else "❌ Delivered/failed counts do not add up")
+    # RFC 5321: message lines end in CRLF; strict MTAs reject bare LF
+    ok &= server["bare_lf"] == 0
+    print("✅ CRLF line endings throughout" if server["bare_lf"] == 0
+          else f"❌ {server['bare_lf']:,} lines with a bare LF")
+    return dict(stats, failed=failed, server=server, elapsed=elapsed, ok=ok)
+
+
+def crash_resume(subscribers=1000, workers=4, cards=10):
+    """
+    Deliver to everyone, cut the send log in the middle of its last line (a
+    crash while a line was being written), then resume twice. The resume
+    must mail only the recipient whose line was torn, and the one after it
+    nobody.
+    """
+    sink = SMTPSink("127.0.0.1", 0).start()
+    _use_sink(sink, workers=workers)
+    predictions = synthetic_predictions(cards)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_subscribers(subscribers, directory)
+            email_automation.SEND_LOG_DIR = os.path.join(directory, "send_log")
+            first = email_automation.main(predictions, path)
+
+            sends = glob.glob(os.path.join(email_automation.SEND_LOG_DIR, "*", "sends*.tsv"))[0]
+            with open(sends, "rb") as f:
+                data = f.read()
+            # Keep the last line only up to the middle of its status ("...@example.com\tse")
+            last = data.rfind(b"\n", 0, len(data) - 1) + 1
+            with open(sends, "r+b") as f:
+                f.truncate(data.index(b"\t", last) + 3)
+
+            resumed = email_automation.main(predictions, path)
+            again = email_automation.main(predictions, path)
+    finally:
+        sink.stop()
+
+    print("\n" + "=" * 60)
+    print(f"First run:     {first['sent']:,} sent, log torn mid-line")
+    print(f"Resume:        {resumed['sent']:,} sent (expected 1)")
+    print(f"Second resume: {again['sent']:,} sent (expected 0)")
+    ok = first["sent"] == subscribers and resumed["sent"] == 1 and again["sent"] == 0
+    ok &= sink.stats()["messages"] == subscribers + 1
+    print("✅ Torn log line resumed without duplicates" if ok else "❌ Resume after a torn line resent or skipped mail")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the email job against a local SMTP sink")
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=4, help="Parallel SMTP sessions")
+    parser.add_argument("--per-connection", type=int, default=100, help="Messages per session")
+    parser.add_argument("--cards", type=int, default=10, help="Ticker cards in the report")
+    parser.add_argument("--starttls", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0, help="Sink seconds per message")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--backoff", type=float, default=0.1, help="First retry delay in seconds")
+    parser.add_argument("--crash-resume", action="store_true",
+                        help="Check resuming after a send log line was torn by a crash")
+    args = parser.parse_args(argv)
+
+    if args.crash_resume:
+        return 0 if crash_resume(args.subscribers, args.workers, args.cards) else 1
+
+    result = run(args.subscribers, args.workers, args.per_connection, args.cards, args.starttls,
+                 args.latency, args.failure_rate, args.drop_rate, args.backoff)
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
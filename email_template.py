@@ -0,0 +1,177 @@
+"""
+Email Template
+Compact renderer for the daily prediction email. The markup is minified and
+every template is parsed once at import (no template parsing per card);
+rendering formats each field and HTML-escapes it, and a report is the head,
+the cards and the footer joined in a single `"".join`.
+
+Each report has an HTML part and a plain-text part. The HTML is kept under a
+byte budget (default just below Gmail's 102 KB clipping limit). Cards that do
+not fit are left out and replaced by a "more on the dashboard" line, so the
+footer and unsubscribe link always survive. See benchmark_email.py for render
+timings.
+"""
+
+import os
+import re
+from datetime import datetime
+from html import escape
+from string import Formatter
+from urllib.parse import quote
+
+from prediction_intervals import INTERVAL_LEVEL
+
+# Gmail clips message bodies above 102 KB and hides the rest behind a link
+GMAIL_CLIP_BYTES = 102 * 1024
+
+# Byte budget of the HTML part (room left for MIME headers and encoding)
+EMAIL_SIZE_BUDGET = int(os.getenv("EMAIL_SIZE_BUDGET", str(100 * 1024)))
+
+
+def _minify(markup):
+    """Collapse indentation and whitespace between tags"""
+    return re.sub(r">\s+<", "><", re.sub(r"\s*\n\s*", " ", markup)).strip()
+
+
+def compile_template(template, html=True):
+    """
+    Parse a str.format template once into a function of keyword arguments.
+    With `html` every formatted field is HTML-escaped (quotes included, so
+    fields are safe inside attributes too).
+    """
+    pieces = list(Formatter().parse(template))
+    quote = escape if html else str
+
+    def render(**values):
+        out = []
+        for literal, field, spec, conversion in pieces:
+            out.append(literal)
+            if field is not None:
+                value = values[field]
+                if conversion == "r":
+                    value = repr(value)
+                elif conversion == "s":
+                    value = str(value)
+                out.append(quote(format(value, spec)))
+        return "".join(out)
+
+    return render
+
+
+STYLE = _minify("""
+    body{font-family:Arial,sans-serif;line-height:1.5;color:#333;max-width:800px;margin:0 auto;padding:16px}
+    .h{background:#667eea;color:#fff;padding:24px;text-align:center;border-radius:8px}
+    .h h1{margin:0;font-size:26px}
+    .c{background:#f8f9fa;border-left:5px solid #667eea;padding:14px;margin:14px 0;border-radius:5px}
+    .t{font-size:22px;font-weight:bold;color:#667eea}
+    td{padding:4px 12px 4px 0}
+    .l{font-size:11px;color:#666;text-transform:uppercase}
+    .v{font-size:17px;font-weight:bold}
+    .p{color:#28a745}
+    .n{color:#dc3545}
+    .b{color:#667eea;font-weight:bold}
+    .d{background:#fff3cd;border:1px solid #ffc107;padding:12px;border-radius:5px;margin-top:24px;font-size:13px}
+    .f{text-align:center;margin-top:24px;color:#666;font-size:12px}
+""")
+
+# The stylesheet is part of the repo, not a field: it is inserted as is
+HEAD_START = ('<!DOCTYPE html><html><head><meta charset="utf-8"><style>' + STYLE + '</style></head><body>')
+
+HEAD = compile_template(_minify("""
+    <div class="h"><h1>{icon} {title}</h1>
+    <p>Report Generated: {generated}</p>
+"""))
+
+INTRO = compile_template("<p>{intro}</p>")
+
+HEAD_END = "</div>"
+
+CARD = compile_template(_minify("""
+    <div class="c"><div class="t">{ticker}</div><table><tr>
+    <td><div class="l">Current Close</div><div class="v">${current_price:.2f}</div></td>
+    <td><div class="l">Predicted Next Close</div><div class="v {css}">${predicted_price:.2f} {arrow}</div></td>
+    <td><div class="l">Expected Change</div><div class="v {css}">{change_pct:+.2f}% (${change:+.2f})</div></td>
+    </tr><tr>
+    <td><div class="l">Next Trading Day</div><div class="v">{next_date}</div></td>
+    <td colspan="2"><div class="l">{level} Prediction Range</div>
+    <div class="v">${lower_bound:.2f} - ${upper_bound:.2f}</div></td>
+    </tr></table><a class="b" href="{url}?stock={ticker_query}">View Full Analysis →</a></div>
+"""))
+
+OMITTED = compile_template(_minify("""
+    <div class="c">+ {count} more predictions on the <a class="b" href="{url}">dashboard</a></div>
+"""))
+
+FOOT = compile_template(_minify("""
+    <div class="d"><strong>⚠️ Disclaimer:</strong> These predictions are generated by AI for educational
+    purposes only. This is not financial advice. Always do your own research and consult with a qualified
+    financial advisor before making investment decisions. Past performance does not guarantee future results.</div>
+    <div class="f"><p><strong>AI Stock Market Predictor</strong></p>
+    <p>You're receiving this because you subscribed to daily predictions.</p>
+    <p><a href="{url}">Visit Dashboard</a> | <a href="{url}">Unsubscribe</a></p></div></body></html>
+"""))
+
+TEXT_CARD = compile_template("{ticker}: ${current_price:.2f} -> ${predicted_price:.2f} ({change_pct:+.2f}%) "
+                             "for {next_date}, {level} range ${lower_bound:.2f} - ${upper_bound:.2f}", html=False)
+
+TEXT_FOOT = ("\n\nFull analysis: {url}\n\n"
+             "These predictions are generated by AI for educational purposes only and are not financial advice.\n"
+             "Unsubscribe: {url}\n")
+
+LEVEL = f"{INTERVAL_LEVEL:.0%}"
+
+TITLE = "Daily Stock Market Predictions"
+
+
+def _card_values(pred, url):
+    up = pred["change_pct"] >= 0
+    # The link's query value is URL-encoded (e.g. ^GSPC); the template then HTML-escapes it
+    return {**pred, "ticker": str(pred["ticker"]), "ticker_query": quote(str(pred["ticker"]), safe=""),
+            "css": "p" if up else "n", "arrow": "↑" if up else "↓", "level": LEVEL, "url": url}
+
+
+def render_email(predictions, url, generated_at=None, budget=EMAIL_SIZE_BUDGET, title=TITLE, icon="📈", intro=""):
+    """
+    Render the report. Returns {"html", "text", "shown", "omitted", "bytes"};
+    `budget=None` renders every card. `intro` is a plain-text line shown
+    under the header (e.g. which alert rules fired).
+    """
+    generated_at = generated_at or datetime.now()
+    head = "".join([
+        HEAD_START,
+        HEAD(icon=icon, title=title, generated=generated_at.strftime("%B %d, %Y at %I:%M %p")),
+        INTRO(intro=intro) if intro else "",
+        HEAD_END,
+    ])
+    foot = FOOT(url=url)
+
+    cards = [_card_values(p, url) for p in predictions if p is not None]
+    if budget is None:
+        html_cards = [CARD(**v) for v in cards]
+    else:
+        # Render only what fits, keeping room for the "+ N more" line
+        html_cards = []
+        used = len(head.encode()) + len(foot.encode()) + len(OMITTED(count=len(cards), url=url).encode())
+        for v in cards:
+            card = CARD(**v)
+            used += len(card.encode())
+            if used > budget:
+                break
+            html_cards.append(card)
+
+    shown = len(html_cards)
+    omitted = len(cards) - shown
+    parts = [head, *html_cards]
+    if omitted:
+        parts.append(OMITTED(count=omitted, url=url))
+    parts.append(foot)
+    html = "".join(parts)
+
+    text = "".join([
+        f"{title} - {generated_at.strftime('%B %d, %Y')}\n\n",
+        f"{intro}\n\n" if intro else "",
+        "\n".join(TEXT_CARD(**v) for v in cards),
+        TEXT_FOOT.format(url=url),
+    ])
+
+    return {"html": html, "text": text, "shown": shown, "omitted": omitted, "bytes": len(html.encode())}
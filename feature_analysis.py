@@ -0,0 +1,211 @@
+"""
+Feature Redundancy Analyzer
+Measures how much each engineered feature actually adds and writes a pruned
+feature spec (feature_spec.json) that engineer_features and train_model use.
+
+For a sample of tickers it computes:
+  - exact duplicates (e.g. MA_20 and BB_Middle are the same series)
+  - the pooled correlation matrix and variance inflation factors (VIF)
+  - each feature's contribution to walk-forward error (drop-one delta)
+
+Pruning removes duplicates first, then repeatedly drops the highest-VIF
+feature as long as walk-forward error stays within the tolerance of the
+unpruned error. A before/after accuracy and timing report is printed and stored
+in the spec.
+
+Usage:
+    python feature_analysis.py AAPL MSFT JPM XOM JNJ
+    python feature_analysis.py --all --vif-threshold 10 --tolerance 0.005 --dry-run
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import StandardScaler
+
+from batch_predict import UNIVERSE
+from feature_spec import (ALL_FEATURES, BASE_SPEC_VERSION, FEATURE_SPEC_PATH,
+                          load_feature_spec, save_feature_spec)
+from prediction_pipeline import DEFAULT_START_DATE, engineer_features, fetch_history
+
+
+def walk_forward_error(df, features, n_splits=5, min_train=0.5):
+    """Mean absolute percentage error of Ridge over expanding-window folds"""
+    X = df[features].to_numpy()
+    y = df["Target"].to_numpy()
+
+    start = int(len(X) * min_train)
+    fold = (len(X) - start) // n_splits
+    errors = []
+    for k in range(n_splits):
+        train_end = start + k * fold
+        test = slice(train_end, train_end + fold)
+
+        scaler = StandardScaler()
+        model = Ridge(alpha=1.0, random_state=42)
+        model.fit(scaler.fit_transform(X[:train_end]), y[:train_end])
+        pred = model.predict(scaler.transform(X[test]))
+        errors.append(np.abs((y[test] - pred) / y[test]))
+
+    return float(np.mean(np.concatenate(errors)) * 100)
+
+
+def panel_error(frames, features):
+    """Walk-forward error averaged over tickers"""
+    return float(np.mean([walk_forward_error(df, features) for df in frames]))
+
+
+def exact_duplicates(frames, features):
+    """Features that repeat an earlier feature exactly in every ticker"""
+    duplicates = {}
+    for j, col in enumerate(features):
+        for other in features[:j]:
+            if other in duplicates:
+                continue
+            if all(np.allclose(df[col].to_numpy(), df[other].to_numpy(), rtol=1e-10, atol=1e-12)
+                   for df in frames):
+                duplicates[col] = other
+                break
+    return duplicates
+
+
+def pooled_correlation(frames, features):
+    """Correlation matrix averaged over tickers"""
+    return np.mean([np.corrcoef(df[features].to_numpy(), rowvar=False) for df in frames], axis=0)
+
+
+def variance_inflation(corr):
+    """VIF of every feature: diagonal of the inverse correlation matrix"""
+    return np.diag(np.linalg.pinv(corr))
+
+
+def drop_one_contribution(frames, features, baseline):
+    """Error increase when each feature is removed (negative = the model is better without it)"""
+    return {col: panel_error(frames, [c for c in features if c != col]) - baseline for col in features}
+
+
+def prune(frames, features, vif_threshold=10.0, tolerance=0.005, log=print):
+    """Greedy VIF pruning; walk-forward error may never exceed the starting error by `tolerance`"""
+    duplicates = exact_duplicates(frames, features)
+    for col, other in duplicates.items():
+        log(f"  - {col}: exact duplicate of {other}")
+    kept = [c for c in features if c not in duplicates]
+
+    error = panel_error(frames, kept)
+    budget = error * (1 + tolerance)
+    protected = set()
+    while True:
+        candidates = [c for c in kept if c not in protected]
+        if len(candidates) < 2:
+            break
+        vif = dict(zip(kept, variance_inflation(pooled_correlation(frames, kept))))
+        worst = max(candidates, key=vif.get)
+        if vif[worst] < vif_threshold:
+            break
+
+        trial = [c for c in kept if c != worst]
+        trial_error = panel_error(frames, trial)
+        if trial_error <= budget:
+            log(f"  - {worst}: VIF {vif[worst]:.0f}, error {error:.4f}% → {trial_error:.4f}%")
+            kept, error = trial, trial_error
+        else:
+            protected.add(worst)
+
+    return kept, duplicates
+
+
+def time_pipeline(raws, features, repeats=3):
+    """Median seconds per ticker for engineer_features and for fitting the model"""
+    engineer, train = [], []
+    for df_raw in raws:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            df = engineer_features(df_raw, features)
+            engineer.append(time.perf_counter() - started)
+
+            cols = features or [c for c in ALL_FEATURES if c in df.columns]
+            started = time.perf_counter()
+            Ridge(alpha=1.0).fit(StandardScaler().fit_transform(df[cols]), df["Target"])
+            train.append(time.perf_counter() - started)
+    return float(np.median(engineer)), float(np.median(train))
+
+
+def analyze(tickers, start_date=DEFAULT_START_DATE, vif_threshold=10.0, tolerance=0.005):
+    """Run the full analysis; returns (pruned feature list, report dict)"""
+    raws = [r for r in (fetch_history(t, start_date) for t in tickers) if len(r) >= 300]
+    if not raws:
+        raise ValueError("No ticker has enough history for the analysis")
+    frames = [engineer_features(r) for r in raws]
+    features = list(ALL_FEATURES)
+
+    print(f"Analyzing {len(features)} features on {len(frames)} tickers")
+    baseline = panel_error(frames, features)
+
+    vif = dict(zip(features, variance_inflation(pooled_correlation(frames, features))))
+    contribution = drop_one_contribution(frames, features, baseline)
+
+    print(f"\n{'Feature':<15}{'VIF':>12}{'Δ error %':>12}")
+    for col in sorted(features, key=vif.get, reverse=True):
+        print(f"{col:<15}{min(vif[col], 1e9):>12.1f}{contribution[col]:>+12.4f}")
+
+    print("\nPruning:")
+    kept, duplicates = prune(frames, features, vif_threshold, tolerance)
+
+    # Re-evaluate on frames built from the pruned spec (fewer warm-up rows may be dropped)
+    pruned_frames = [engineer_features(r, kept) for r in raws]
+    pruned_error = panel_error(pruned_frames, kept)
+    full_times = time_pipeline(raws, None)
+    pruned_times = time_pipeline(raws, kept)
+
+    report = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "tickers": len(frames),
+        "features_before": len(features),
+        "features_after": len(kept),
+        "removed": [c for c in features if c not in kept],
+        "duplicates": duplicates,
+        "walk_forward_mape_before": baseline,
+        "walk_forward_mape_after": pruned_error,
+        "engineer_ms_before": full_times[0] * 1000,
+        "engineer_ms_after": pruned_times[0] * 1000,
+        "train_ms_before": full_times[1] * 1000,
+        "train_ms_after": pruned_times[1] * 1000,
+    }
+
+    print("\nBefore / after:")
+    print(f"  Features:          {len(features)} → {len(kept)}")
+    print(f"  Walk-forward MAPE: {baseline:.4f}% → {pruned_error:.4f}%")
+    print(f"  engineer_features: {report['engineer_ms_before']:.2f} → {report['engineer_ms_after']:.2f} ms/ticker")
+    print(f"  Model fit:         {report['train_ms_before']:.2f} → {report['train_ms_after']:.2f} ms/ticker")
+
+    return kept, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Feature redundancy analysis and pruning")
+    parser.add_argument("tickers", nargs="*", help="Tickers to analyze")
+    parser.add_argument("--all", action="store_true", help="Use the full dashboard universe")
+    parser.add_argument("--start-date", default=DEFAULT_START_DATE)
+    parser.add_argument("--vif-threshold", type=float, default=10.0)
+    parser.add_argument("--tolerance", type=float, default=0.005,
+                        help="Allowed relative increase of walk-forward error over the full set")
+    parser.add_argument("--output", default=FEATURE_SPEC_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not write the spec")
+    args = parser.parse_args(argv)
+
+    tickers = UNIVERSE if args.all else [t.upper() for t in args.tickers] or UNIVERSE[:10]
+    kept, report = analyze(tickers, args.start_date, args.vif_threshold, args.tolerance)
+
+    if not args.dry_run:
+        version = max(load_feature_spec(args.output)["version"], BASE_SPEC_VERSION) + 1
+        save_feature_spec(kept, version, report, args.output)
+        print(f"\nWrote feature spec v{version} to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Feature Spec
+Which engineered columns are built and fed to the model. Without a spec file
+every feature is used (version 1). `feature_analysis.py` writes a pruned spec
+to feature_spec.json; its version goes into every feature/model cache key.
+"""
+
+import os
+import json
+
+FEATURE_SPEC_PATH = os.getenv("FEATURE_SPEC_PATH", "feature_spec.json")
+
+# Version of the full, unpruned feature set
+BASE_SPEC_VERSION = 1
+
+# Every feature engineer_features can build, in build order
+ALL_FEATURES = [
+    "MA_5", "MA_10", "MA_20", "MA_50",
+    "EMA_12", "EMA_26", "MACD", "MACD_Signal",
+    "RSI",
+    "BB_Middle", "BB_Upper", "BB_Lower", "BB_Width",
+    "Daily_Return", "Price_Change", "Log_Return",
+    "Volume_MA_10", "Volume_Ratio",
+    "Volatility_10", "Volatility_30",
+    "Momentum_5", "Momentum_10", "Momentum_20",
+    "ROC_5", "ROC_10",
+    "HL_Range", "HL_Pct",
+]
+
+# Cross-sectional features from panel_features.py; used whenever they are present
+PANEL_FEATURES = ["Sector_Rel_Return", "Market_Beta_60", "Market_Corr_60", "Sector_Volume_Z"]
+
+# Built even when pruned from the model input (the trading guide reads RSI)
+ALWAYS_COMPUTED = ["RSI"]
+
+# Columns that are never fed to the model
+NON_FEATURE_COLS = ["Open", "High", "Low", "Close", "Volume", "Adj Close", "Target"]
+
+
+def load_feature_spec(path=FEATURE_SPEC_PATH):
+    """Return {"version": int, "features": list or None}; None means all features"""
+    if not os.path.exists(path):
+        return {"version": BASE_SPEC_VERSION, "features": None}
+
+    with open(path, "r") as f:
+        spec = json.load(f)
+
+    unknown = set(spec["features"]) - set(ALL_FEATURES) - set(PANEL_FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown features in {path}: {sorted(unknown)}")
+
+    return {"version": spec["version"], "features": list(spec["features"])}
+
+
+def model_feature_columns(df, features=None):
+    """Model input columns of an engineered frame, restricted to `features` when given"""
+    if features is not None:
+        extra = [c for c in PANEL_FEATURES if c in df.columns and c not in features]
+        return [c for c in features if c in df.columns] + extra
+    return [c for c in df.columns if c not in NON_FEATURE_COLS]
+
+
+def save_feature_spec(features, version, report=None, path=FEATURE_SPEC_PATH):
+    spec = {"version": version, "features": list(features)}
+    if report is not None:
+        spec["report"] = report
+    with open(path, "w") as f:
+        json.dump(spec, f, indent=2, default=float)
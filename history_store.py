@@ -0,0 +1,219 @@
+"""
+Memory-Mapped History Store
+Keeps raw OHLCV and engineered feature matrices on disk as contiguous .npy
+arrays, one directory per ticker. Reads return read-only memory maps, so long
+histories for a large universe cost page cache instead of resident memory,
+and DataFrames built on top of them share the mapped buffer.
+
+Layout:
+    <root>/<TICKER>/<kind>@<version>.npy        rows x columns, C-contiguous
+    <root>/<TICKER>/<kind>@<version>_index.npy  int64 nanosecond timestamps
+    <root>/<TICKER>/<kind>.json                 manifest: version, column names, dtype, row count
+
+Every save writes a new version under unique file names and then publishes
+it by atomically replacing the manifest, so a reader always gets values,
+index and columns of the same version, concurrent writers never share temp
+files, and files a reader has memory-mapped are never overwritten (which
+Windows refuses). Superseded versions are removed once they are a few
+minutes old; removal is retried on later saves if a file is still mapped.
+"""
+
+import os
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIR = os.getenv("HISTORY_STORE_DIR", ".history_store")
+
+# Superseded versions younger than this are kept (a writer that started earlier may still need them)
+SWEEP_AFTER_SECONDS = 300
+
+# Retries when a manifest or version disappears or is locked mid-operation (Windows, concurrent sweeps)
+IO_RETRIES = 5
+
+_save_locks = {}
+_save_locks_guard = threading.Lock()
+
+
+def _save_lock(key):
+    with _save_locks_guard:
+        return _save_locks.setdefault(key, threading.Lock())
+
+
+def _version_time(version):
+    """Nanosecond timestamp a version name starts with"""
+    return int(version.split("-", 1)[0])
+
+
+def feature_layout(columns, feature_cols):
+    """Column order that keeps the model features in one contiguous block"""
+    return list(feature_cols) + [c for c in columns if c not in feature_cols]
+
+
+class StoredFrame:
+    """Read-only view of a stored matrix with its dates and column names"""
+
+    def __init__(self, index, values, columns):
+        self.index = index
+        self.values = values
+        self.columns = list(columns)
+        self._positions = {c: i for i, c in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.index)
+
+    def column(self, name):
+        """Zero-copy (strided) view of one column"""
+        return self.values[:, self._positions[name]]
+
+    def block(self, names):
+        """
+        View of several columns. Stays zero-copy when the columns are stored
+        next to each other in the requested order, otherwise falls back to a copy.
+        """
+        positions = [self._positions[c] for c in names]
+        start = positions[0]
+        if positions == list(range(start, start + len(positions))):
+            return self.values[:, start:start + len(positions)]
+        return self.values[:, positions]
+
+    def slice(self, start=None, end=None):
+        """Row slice by date (inclusive), still backed by the memory map"""
+        lo = 0 if start is None else self.index.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(self.index) if end is None else self.index.searchsorted(pd.Timestamp(end), side="right")
+        return StoredFrame(self.index[lo:hi], self.values[lo:hi], self.columns)
+
+    def to_frame(self):
+        """DataFrame sharing the mapped buffer (no copy)"""
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns, copy=False)
+
+
+class HistoryStore:
+    """On-disk store of per-ticker matrices, read back as memory maps"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR, dtype=None):
+        # None stores each frame in its own (common) dtype, e.g. float32 features next to float64 prices
+        self.root = root
+        self.dtype = np.dtype(dtype) if dtype is not None else None
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker, name):
+        return os.path.join(self.root, ticker.upper(), name)
+
+    def has(self, ticker, kind):
+        return os.path.exists(self._path(ticker, f"{kind}.json"))
+
+    def tickers(self):
+        return sorted(d for d in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, d)))
+
+    def _read_manifest(self, ticker, kind):
+        with open(self._path(ticker, f"{kind}.json"), "r") as f:
+            return json.load(f)
+
+    def _files(self, ticker, kind, meta):
+        # Manifests without a version come from the earlier single-file layout
+        name = f"{kind}@{meta['version']}" if "version" in meta else kind
+        return self._path(ticker, f"{name}.npy"), self._path(ticker, f"{name}_index.npy")
+
+    def save(self, ticker, kind, df, columns=None, dtype=None):
+        """
+        Write `df[columns]` as one contiguous matrix of `dtype` (default: the
+        store's, else the columns' common dtype). Put the columns that are
+        read together (e.g. model features) next to each other so `block` can
+        hand them out without copying.
+        """
+        columns = list(columns) if columns is not None else list(df.columns)
+        if dtype is None:
+            dtype = self.dtype if self.dtype is not None else np.result_type(*df[columns].dtypes)
+        dtype = np.dtype(dtype)
+        os.makedirs(os.path.dirname(self._path(ticker, kind)), exist_ok=True)
+        version = f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+        meta = {"version": version, "columns": columns, "dtype": dtype.name, "rows": len(df)}
+        values_path, index_path = self._files(ticker, kind, meta)
+
+        # Unique names: nothing here is visible to readers until the manifest points at it
+        out = np.lib.format.open_memmap(values_path, mode="w+", dtype=dtype, shape=(len(df), len(columns)))
+        for j, col in enumerate(columns):
+            out[:, j] = df[col].to_numpy(dtype=dtype, copy=False)
+        out.flush()
+        del out
+
+        with open(index_path, "wb") as f:
+            np.save(f, pd.DatetimeIndex(df.index).as_unit("ns").asi8)
+
+        manifest_path = self._path(ticker, f"{kind}.json")
+        with open(f"{manifest_path}.{version}.tmp", "w") as f:
+            json.dump(meta, f)
+
+        with _save_lock((self.root, ticker.upper(), kind)):
+            # A newer version published meanwhile wins; this one is simply dropped
+            current = self._read_manifest(ticker, kind) if self.has(ticker, kind) else {}
+            if "version" in current and _version_time(current["version"]) > _version_time(version):
+                for path in (values_path, index_path, f"{manifest_path}.{version}.tmp"):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                return
+            for attempt in range(IO_RETRIES):
+                try:
+                    os.replace(f"{manifest_path}.{version}.tmp", manifest_path)
+                    break
+                except PermissionError:
+                    # Windows: a reader has the manifest open for a moment
+                    if attempt == IO_RETRIES - 1:
+                        raise
+                    time.sleep(0.05)
+        self._sweep(ticker, kind, version)
+
+    def _sweep(self, ticker, kind, current):
+        """Remove superseded versions of a kind (and files of the earlier layout)"""
+        directory = os.path.dirname(self._path(ticker, kind))
+        cutoff = min(_version_time(current), time.time_ns() - int(SWEEP_AFTER_SECONDS * 10**9))
+        for name in os.listdir(directory):
+            if name in (f"{kind}.npy", f"{kind}_index.npy"):
+                stale = True
+            elif name.startswith(f"{kind}@") and not name.startswith(f"{kind}@{current}"):
+                stale = _version_time(name[len(kind) + 1:]) < cutoff
+            else:
+                continue
+            if stale:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass  # still memory-mapped on Windows; a later save retries
+
+    def load(self, ticker, kind):
+        """Return a StoredFrame backed by a read-only memory map, or None"""
+        for attempt in range(IO_RETRIES):
+            if not self.has(ticker, kind):
+                return None
+            try:
+                meta = self._read_manifest(ticker, kind)
+                values_path, index_path = self._files(ticker, kind, meta)
+                values = np.load(values_path, mmap_mode="r")
+                index = np.load(index_path)
+                break
+            except (FileNotFoundError, PermissionError, json.JSONDecodeError):
+                # Version swept or manifest replaced between the reads: start over from the new manifest
+                if attempt == IO_RETRIES - 1:
+                    raise
+                time.sleep(0.01)
+
+        return StoredFrame(pd.DatetimeIndex(index.view("datetime64[ns]")), values, meta["columns"])
+
+    def delete(self, ticker, kind=None):
+        """Remove one kind (or every file) stored for a ticker; the manifest goes first"""
+        directory = os.path.dirname(self._path(ticker, "x"))
+        if not os.path.isdir(directory):
+            return
+        names = sorted(os.listdir(directory), key=lambda name: not name.endswith(".json"))
+        for name in names:
+            if kind is None or name.split(".")[0].split("@")[0] in (kind, f"{kind}_index"):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,321 @@
+"""
+Indicator Kernels
+Single-pass NumPy implementations of the indicators in engineer_features.
+They reproduce the pandas outputs (same warm-up NaNs, ddof=1 std, EMA with
+adjust=False, simple-mean RSI) without building intermediate Series.
+
+  - rolling_mean: cumulative-sum windows, several windows from one cumsum
+  - rolling_std:  Welford-style sliding variance for several windows at once
+                  (JIT-compiled when numba is installed, else a centered
+                  cumulative-sum form that avoids catastrophic cancellation)
+  - ema:          the adjust=False recursion, JIT-compiled or run through
+                  scipy.signal.lfilter (C loop)
+  - rsi:          14-day simple-mean RSI from one diff
+
+`compute_indicators` returns every feature as a dict of arrays (or writes
+them into caller-provided columns), `engineer_features_fast` the same frame
+as engineer_features, and `build_feature_frame` that frame as one
+preallocated matrix (optionally float32); see benchmark_indicators.py for the
+equivalence checks, timings and peak memory.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from feature_spec import ALL_FEATURES, ALWAYS_COMPUTED
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+# ==================================================================================
+# OPTIONAL JIT KERNELS
+# ==================================================================================
+if HAVE_NUMBA:
+    @njit(cache=True)
+    def _ema_jit(x, alpha):
+        out = np.empty_like(x)
+        out[0] = x[0]
+        for i in range(1, len(x)):
+            out[i] = alpha * x[i] + (1 - alpha) * out[i - 1]
+        return out
+
+    @njit(cache=True)
+    def _rolling_var_jit(x, window):
+        # Welford update with one value entering and one leaving per step
+        n = len(x)
+        out = np.full(n, np.nan)
+        mean = 0.0
+        m2 = 0.0
+        count = 0
+        for i in range(n):
+            v = x[i]
+            if not np.isnan(v):
+                count += 1
+                delta = v - mean
+                mean += delta / count
+                m2 += delta * (v - mean)
+            if i >= window:
+                old = x[i - window]
+                if not np.isnan(old):
+                    count -= 1
+                    if count == 0:
+                        mean = 0.0
+                        m2 = 0.0
+                    else:
+                        delta = old - mean
+                        mean -= delta / count
+                        m2 -= delta * (old - mean)
+            if count == window and i >= window - 1:
+                out[i] = max(m2, 0.0) / (window - 1)
+        return out
+
+
+# ==================================================================================
+# PRIMITIVES
+# ==================================================================================
+def rolling_mean(x, windows):
+    """
+    Trailing mean for one window (returns an array) or several windows
+    (returns {window: array}) from a single cumulative sum. NaN until the
+    window is full of valid values, like pandas `.rolling(w).mean()`.
+    """
+    x = np.asarray(x, dtype=float)
+    single = np.isscalar(windows)
+    valid = np.isfinite(x)
+    clean = np.where(valid, x, 0.0)
+    csum = np.concatenate(([0.0], np.cumsum(clean)))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+
+    out = {}
+    for w in ([windows] if single else windows):
+        result = np.full(len(x), np.nan)
+        if len(x) >= w:
+            sums = csum[w:] - csum[:-w]
+            counts = ccount[w:] - ccount[:-w]
+            result[w - 1:] = np.where(counts == w, sums / w, np.nan)
+        out[w] = result
+    return out[windows] if single else out
+
+
+def rolling_std(x, windows):
+    """
+    Trailing sample standard deviation (ddof=1) for one or several windows,
+    matching pandas `.rolling(w).std()`.
+    """
+    x = np.asarray(x, dtype=float)
+    single = np.isscalar(windows)
+    out = {}
+
+    if HAVE_NUMBA:
+        for w in ([windows] if single else windows):
+            out[w] = np.sqrt(_rolling_var_jit(x, w))
+        return out[windows] if single else out
+
+    # Center on the global mean first so the sum-of-squares form stays accurate
+    valid = np.isfinite(x)
+    centered = np.where(valid, x - np.nanmean(x), 0.0)
+    csum = np.concatenate(([0.0], np.cumsum(centered)))
+    csq = np.concatenate(([0.0], np.cumsum(centered * centered)))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+
+    for w in ([windows] if single else windows):
+        result = np.full(len(x), np.nan)
+        if len(x) >= w:
+            s = csum[w:] - csum[:-w]
+            sq = csq[w:] - csq[:-w]
+            counts = ccount[w:] - ccount[:-w]
+            var = np.maximum((sq - s * s / w) / (w - 1), 0.0)
+            result[w - 1:] = np.where(counts == w, np.sqrt(var), np.nan)
+        out[w] = result
+    return out[windows] if single else out
+
+
+def ema(x, span):
+    """Exponential moving average, pandas `.ewm(span=span, adjust=False).mean()`"""
+    x = np.asarray(x, dtype=float)
+    alpha = 2.0 / (span + 1.0)
+    if HAVE_NUMBA:
+        return _ema_jit(x, alpha)
+    out, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * x[0]])
+    return out
+
+
+def diff(x, periods=1):
+    out = np.full(len(x), np.nan)
+    out[periods:] = x[periods:] - x[:-periods]
+    return out
+
+
+def shift(x, periods):
+    out = np.full(len(x), np.nan)
+    if periods > 0:
+        out[periods:] = x[:-periods]
+    else:
+        out[:periods] = x[-periods:]
+    return out
+
+
+def rsi(close, window=14):
+    """Simple-mean RSI exactly as engineer_features computes it"""
+    delta = diff(close)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    gain_mean = rolling_mean(gain, window)
+    loss_mean = rolling_mean(loss, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = gain_mean / loss_mean
+        return 100 - (100 / (1 + rs))
+
+
+# ==================================================================================
+# FULL FEATURE SET
+# ==================================================================================
+def compute_indicators(close, high, low, volume, features=None, out=None):
+    """
+    Every engineer_features column (except Target) as {name: array}. With
+    `features` only those columns (and their inputs) are built. With `out`
+    ({name: 1-D destination array}) each result is written into its
+    destination as soon as it is computed instead of being returned.
+    """
+    close = np.asarray(close, dtype=float)
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    want = None if features is None else set(features)
+    f = {}
+
+    def need(*cols):
+        return want is None or not want.isdisjoint(cols)
+
+    def put(name, value):
+        if want is None or name in want:
+            if out is None:
+                f[name] = value
+            else:
+                out[name][:] = value
+        return value
+
+    if need("MA_5", "MA_10", "MA_20", "MA_50", "BB_Middle", "BB_Upper", "BB_Lower", "BB_Width"):
+        means = rolling_mean(close, (5, 10, 20, 50))
+        for w in (5, 10, 20, 50):
+            put(f"MA_{w}", means[w])
+
+    if need("EMA_12", "EMA_26", "MACD", "MACD_Signal"):
+        ema_12 = put("EMA_12", ema(close, 12))
+        ema_26 = put("EMA_26", ema(close, 26))
+        if need("MACD", "MACD_Signal"):
+            macd = put("MACD", ema_12 - ema_26)
+            put("MACD_Signal", ema(macd, 9))
+
+    if need("RSI"):
+        put("RSI", rsi(close, 14))
+
+    if need("BB_Middle", "BB_Upper", "BB_Lower", "BB_Width"):
+        bb_std = rolling_std(close, 20)
+        put("BB_Middle", means[20])
+        upper = put("BB_Upper", means[20] + 2 * bb_std)
+        lower = put("BB_Lower", means[20] - 2 * bb_std)
+        put("BB_Width", upper - lower)
+
+    prev = shift(close, 1)
+    if need("Daily_Return", "Volatility_10", "Volatility_30"):
+        daily_return = put("Daily_Return", close / prev - 1)
+    if need("Price_Change"):
+        put("Price_Change", close - prev)
+    if need("Log_Return"):
+        put("Log_Return", np.log(close / prev))
+
+    if need("Volume_MA_10", "Volume_Ratio"):
+        volume_ma = put("Volume_MA_10", rolling_mean(volume, 10))
+        put("Volume_Ratio", volume / volume_ma)
+
+    if need("Volatility_10", "Volatility_30"):
+        vol = rolling_std(daily_return, (10, 30))
+        put("Volatility_10", vol[10])
+        put("Volatility_30", vol[30])
+
+    for w in (5, 10, 20):
+        if need(f"Momentum_{w}"):
+            put(f"Momentum_{w}", close - shift(close, w))
+    for w in (5, 10):
+        if need(f"ROC_{w}"):
+            lagged = shift(close, w)
+            put(f"ROC_{w}", ((close - lagged) / lagged) * 100)
+
+    if need("HL_Range", "HL_Pct"):
+        hl_range = put("HL_Range", high - low)
+        put("HL_Pct", (hl_range / close) * 100)
+
+    return f
+
+
+def engineer_features_fast(df_raw):
+    """Kernel-based equivalent of prediction_pipeline.engineer_features(df_raw)"""
+    features = compute_indicators(df_raw["Close"], df_raw["High"], df_raw["Low"], df_raw["Volume"])
+    features["Target"] = shift(np.asarray(df_raw["Close"], dtype=float), -1)
+
+    df = pd.concat([df_raw, pd.DataFrame(features, index=df_raw.index)], axis=1)
+    values = df.to_numpy(dtype=float)
+    return df[np.isfinite(values).all(axis=1)]
+
+
+# ==================================================================================
+# PREALLOCATED FEATURE MATRIX
+# ==================================================================================
+def build_feature_frame(df_raw, features=None, dtype=np.float64):
+    """
+    Same frame as prediction_pipeline.engineer_features(df_raw, features),
+    built without intermediate frames: raw columns, features and Target are
+    written straight into one preallocated C-contiguous (rows x columns)
+    matrix, and the warm-up rows (plus the last row, which has no Target) are
+    trimmed by slicing. `dtype=np.float32` halves the matrix; indicators are
+    still computed in float64. The returned DataFrame shares the matrix, so
+    `column_block` can hand out the model inputs without copying.
+    """
+    want = None if features is None else set(features) | set(ALWAYS_COMPUTED)
+    raw_cols = list(df_raw.columns)
+    feature_cols = [c for c in ALL_FEATURES if (want is None or c in want) and c not in raw_cols]
+    columns = raw_cols + feature_cols + ["Target"]
+
+    values = np.empty((len(df_raw), len(columns)), dtype=dtype)
+    for j, col in enumerate(raw_cols):
+        values[:, j] = df_raw[col].to_numpy(dtype=float, copy=False)
+
+    position = {c: j for j, c in enumerate(columns)}
+    compute_indicators(df_raw["Close"], df_raw["High"], df_raw["Low"], df_raw["Volume"], want,
+                       out={c: values[:, position[c]] for c in feature_cols})
+    close = values[:, position["Close"]]
+    values[:-1, -1] = close[1:]
+    values[-1:, -1] = np.nan
+
+    # Rows where every column is finite (one column at a time, no rows x columns temporary)
+    valid = np.ones(len(values), dtype=bool)
+    for j in range(len(columns)):
+        valid &= np.isfinite(values[:, j])
+
+    rows = np.flatnonzero(valid)
+    if len(rows) == 0:
+        return pd.DataFrame(values[:0], index=df_raw.index[:0], columns=columns, copy=False)
+    lo, hi = rows[0], rows[-1] + 1
+    if hi - lo == len(rows):
+        # The usual case: NaNs only in the warm-up and the last row
+        return pd.DataFrame(values[lo:hi], index=df_raw.index[lo:hi], columns=columns, copy=False)
+    return pd.DataFrame(values[valid], index=df_raw.index[valid], columns=columns, copy=False)
+
+
+def column_block(df, columns):
+    """
+    Values of `columns` as a 2-D array: a view into a single-dtype frame's
+    matrix when the columns are adjacent and in order, otherwise a copy.
+    """
+    values = df.to_numpy(copy=False)
+    positions = df.columns.get_indexer(columns)
+    start = positions[0]
+    if (positions == np.arange(start, start + len(positions))).all():
+        return values[:, start:start + len(positions)]
+    return values[:, positions]
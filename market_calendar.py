@@ -0,0 +1,208 @@
+"""
+NYSE Trading Calendar
+Precomputed session calendar (regular holidays, special closures and 1 PM
+early closes) for the years the app can realistically touch. Everything is
+built once at import into flat arrays indexed by calendar-day ordinal, so
+"is this a session", "next session after X" and "n sessions ahead" are O(1)
+array lookups instead of date loops.
+"""
+
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# Daily bars on Yahoo usually settle a few minutes after the close
+SETTLEMENT_DELAY = timedelta(minutes=30)
+
+# How soon to ask again when a bar that is due has not shown up yet
+RECHECK_INTERVAL = timedelta(minutes=15)
+
+FIRST_YEAR = 1995
+LAST_YEAR = 2040
+
+# Unscheduled full-day closures
+SPECIAL_CLOSURES = {
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),
+    date(2004, 6, 11),   # President Reagan funeral
+    date(2007, 1, 2),    # President Ford funeral
+    date(2012, 10, 29), date(2012, 10, 30),  # Hurricane Sandy
+    date(2018, 12, 5),   # President G.H.W. Bush funeral
+    date(2025, 1, 9),    # President Carter funeral
+}
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th given weekday of a month (n=-1 for the last one)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    """Saturday holidays move to Friday, Sunday holidays to Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def _holidays(year):
+    holidays = {
+        _nth_weekday(year, 2, 0, 3),             # Washington's Birthday
+        _easter(year) - timedelta(days=2),       # Good Friday
+        _nth_weekday(year, 5, 0, -1),            # Memorial Day
+        _observed(date(year, 7, 4)),             # Independence Day
+        _nth_weekday(year, 9, 0, 1),             # Labor Day
+        _nth_weekday(year, 11, 3, 4),            # Thanksgiving
+        _observed(date(year, 12, 25)),           # Christmas
+    }
+    # New Year's Day falling on Saturday is not observed on the prior Friday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 1998:
+        holidays.add(_nth_weekday(year, 1, 0, 3))  # Martin Luther King Jr. Day
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def _early_closes(year, is_session):
+    candidates = [
+        date(year, 7, 3),                                   # Day before Independence Day
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),   # Day after Thanksgiving
+        date(year, 12, 24),                                 # Christmas Eve
+    ]
+    return {d for d in candidates if is_session(d)}
+
+
+class TradingCalendar:
+    """Precomputed NYSE sessions with O(1) lookups"""
+
+    def __init__(self, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+        self.start = date(first_year, 1, 1)
+        self.end = date(last_year, 12, 31)
+
+        closed = set(SPECIAL_CLOSURES)
+        for year in range(first_year, last_year + 1):
+            closed |= _holidays(year)
+
+        days = pd.date_range(self.start, self.end, freq="D")
+        weekday = days.weekday < 5
+        holiday = days.isin(pd.DatetimeIndex(sorted(closed)))
+        self._is_session = weekday & ~holiday
+
+        #: All session dates as datetime64[D]
+        self.sessions = days[self._is_session].values.astype("datetime64[D]")
+
+        # For each calendar day: index of the first session strictly after it,
+        # and of the last session on or before it
+        ordinals = np.arange(len(days))
+        session_ordinals = ordinals[self._is_session]
+        self._next_idx = np.searchsorted(session_ordinals, ordinals, side="right")
+        self._prev_idx = self._next_idx - 1
+
+        self.early_closes = set()
+        for year in range(first_year, last_year + 1):
+            self.early_closes |= _early_closes(year, self.is_session)
+
+    def _ordinal(self, day):
+        day = pd.Timestamp(day).date()
+        ordinal = (day - self.start).days
+        if not 0 <= ordinal < len(self._is_session):
+            raise ValueError(f"{day} is outside the trading calendar ({self.start} - {self.end})")
+        return ordinal
+
+    def _session(self, idx):
+        return pd.Timestamp(self.sessions[idx])
+
+    def is_session(self, day):
+        """True if the exchange is open on this calendar day"""
+        return bool(self._is_session[self._ordinal(day)])
+
+    def next_session(self, day, n=1):
+        """n-th session strictly after `day`"""
+        return self._session(self._next_idx[self._ordinal(day)] + n - 1)
+
+    def previous_session(self, day):
+        """Last session on or before `day`"""
+        return self._session(self._prev_idx[self._ordinal(day)])
+
+    def session_close(self, day):
+        """Exchange-local close time of a session as a tz-aware Timestamp"""
+        day = pd.Timestamp(day).date()
+        close = EARLY_CLOSE if day in self.early_closes else REGULAR_CLOSE
+        return pd.Timestamp(datetime.combine(day, close), tz=EXCHANGE_TZ)
+
+    def bar_due(self, day):
+        """When the daily bar of a session is expected to be available"""
+        return self.session_close(day) + SETTLEMENT_DELAY
+
+    def latest_completed_session(self, now=None):
+        """Most recent session whose daily bar should be available at `now`"""
+        now = pd.Timestamp.now(tz=EXCHANGE_TZ) if now is None else _as_exchange_time(now)
+        session = self.previous_session(now)
+        if now < self.bar_due(session):
+            session = self.previous_session(session - pd.Timedelta(days=1))
+        return session
+
+    def next_bar_due(self, last_bar):
+        """When the first bar newer than `last_bar` is expected"""
+        return self.bar_due(self.next_session(last_bar))
+
+    def new_bar_possible(self, last_bar, now=None):
+        """Whether a bar newer than `last_bar` can exist yet (if not, skip the fetch)"""
+        last_bar = pd.Timestamp(last_bar).normalize().tz_localize(None)
+        return self.latest_completed_session(now) > last_bar
+
+    def cache_expiry(self, last_bar, now=None):
+        """
+        How long data ending at `last_bar` stays current: until the next bar is
+        due, or until today's bar settles if `last_bar` is a still-open session.
+        Never earlier than RECHECK_INTERVAL from now, so a late data vendor
+        does not trigger a refetch on every rerun.
+        """
+        now = pd.Timestamp.now(tz=EXCHANGE_TZ) if now is None else _as_exchange_time(now)
+        last_bar = pd.Timestamp(last_bar).normalize().tz_localize(None)
+
+        if self.is_session(last_bar) and last_bar > self.latest_completed_session(now):
+            due = self.bar_due(last_bar)
+        else:
+            due = self.next_bar_due(last_bar)
+
+        return max(due, now + RECHECK_INTERVAL)
+
+
+def _as_exchange_time(ts):
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        return ts.tz_localize(EXCHANGE_TZ)
+    return ts.tz_convert(EXCHANGE_TZ)
+
+
+# Shared instance; building it takes a few milliseconds
+NYSE = TradingCalendar()
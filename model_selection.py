@@ -0,0 +1,239 @@
+"""
+Model Selection
+Picks the regressor for a ticker among a few fast candidates under a per-ticker
+CPU-time budget. Candidates are scored in order of cost on expanding-window
+(walk-forward) folds of the training split:
+
+    Ridge -> ElasticNet -> HistGradientBoosting
+
+The best mean absolute percentage error wins. If the budget runs out before
+the evaluation finishes, the ticker falls back to Ridge so the daily job's
+runtime stays bounded. The budget is CPU time of the calling thread
+(`time.thread_time`), so tickers trained side by side in a thread pool do
+not use up each other's budget; work a model hands to its own native
+threads (HistGradientBoosting's OpenMP pool) is not counted. The chosen model, the per-candidate scores and its
+train/predict latency are returned for the metrics.
+
+For date-range views of one history the selection is not repeated: the
+chosen family is refit on the window (`refit_model`), and Ridge is solved
+directly from cached sufficient statistics (`RidgeStatistics`), reading at
+most two partial blocks of rows.
+"""
+
+import os
+import time
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import ElasticNet, Ridge
+from sklearn.preprocessing import StandardScaler
+
+# CPU seconds of the training thread per ticker for scoring the candidates
+MODEL_CPU_BUDGET = float(os.getenv("MODEL_CPU_BUDGET", "2.0"))
+
+# Walk-forward folds inside the training split
+SELECTION_FOLDS = 3
+
+FALLBACK_MODEL = "Ridge"
+
+RIDGE_ALPHA = 1.0
+
+# Rows per block of the cached sufficient-statistics prefix sums
+STATS_BLOCK_ROWS = 64
+
+# Price-level features a tree model predicts the next close relative to, in order of preference
+ANCHOR_FEATURES = ["MA_5", "EMA_12", "MA_10", "BB_Middle", "MA_20", "EMA_26", "MA_50"]
+
+
+class AnchoredRegressor:
+    """
+    Fits `estimator` on the distance of the target from a price-level feature
+    (e.g. MA_5) and adds it back when predicting. Tree models cannot
+    extrapolate price levels outside the training range; the distance can.
+    Works on scaled inputs: the anchor is recovered with the scaler's
+    mean/scale for its column.
+    """
+
+    def __init__(self, estimator, column, mean, scale):
+        self.estimator = estimator
+        self.column = column
+        self.mean = mean
+        self.scale = scale
+
+    def _anchor(self, X):
+        return np.asarray(X)[:, self.column] * self.scale + self.mean
+
+    def fit(self, X, y):
+        self.estimator.fit(X, np.asarray(y) - self._anchor(X))
+        return self
+
+    def predict(self, X):
+        return self.estimator.predict(X) + self._anchor(X)
+
+
+def candidate_models(feature_cols, scaler):
+    """{name: factory} in order of cost; the tree model needs a price-level anchor feature"""
+    candidates = {
+        "Ridge": lambda: Ridge(alpha=RIDGE_ALPHA, random_state=42),
+        "ElasticNet": lambda: ElasticNet(alpha=0.01, l1_ratio=0.5, max_iter=5000, random_state=42),
+    }
+
+    anchor = next((c for c in ANCHOR_FEATURES if c in feature_cols), None)
+    if anchor is not None:
+        j = list(feature_cols).index(anchor)
+        candidates["HistGradientBoosting"] = lambda: AnchoredRegressor(
+            HistGradientBoostingRegressor(max_iter=100, learning_rate=0.1, random_state=42),
+            j, scaler.mean_[j], scaler.scale_[j]
+        )
+    return candidates
+
+
+def walk_forward_folds(n_rows, n_splits=SELECTION_FOLDS, min_train=0.5):
+    """(train, test) slices of expanding-window folds over the last half of the rows"""
+    start = int(n_rows * min_train)
+    fold = (n_rows - start) // n_splits
+    return [(slice(0, start + k * fold), slice(start + k * fold, start + (k + 1) * fold))
+            for k in range(n_splits)]
+
+
+def _mape(actual, predicted):
+    return float(np.mean(np.abs((actual - predicted) / actual)) * 100)
+
+
+def select_model(X_train, y_train, feature_cols, scaler, budget=MODEL_CPU_BUDGET):
+    """
+    Score the candidates on walk-forward folds of the (scaled) training split,
+    then fit the winner on all of it. Returns (model, selection) where
+    selection holds "model", "scores", "budget_exceeded", "selection_ms",
+    "train_ms" and "predict_ms".
+    """
+    X_train = np.asarray(X_train)
+    y_train = np.asarray(y_train)
+    candidates = candidate_models(feature_cols, scaler)
+    folds = walk_forward_folds(len(X_train))
+
+    started = time.thread_time()
+    scores = {}
+    exceeded = False
+    for name, make in candidates.items():
+        errors = []
+        for train, test in folds:
+            model = make().fit(X_train[train], y_train[train])
+            errors.append(_mape(y_train[test], model.predict(X_train[test])))
+            if time.thread_time() - started > budget:
+                exceeded = True
+                break
+        if exceeded:
+            break
+        scores[name] = float(np.mean(errors))
+    selection_seconds = time.thread_time() - started
+
+    chosen = FALLBACK_MODEL if exceeded or not scores else min(scores, key=scores.get)
+
+    started = time.thread_time()
+    model = candidates[chosen]().fit(X_train, y_train)
+    train_seconds = time.thread_time() - started
+
+    started = time.perf_counter()
+    model.predict(X_train[-1:])
+    predict_seconds = time.perf_counter() - started
+
+    return model, {
+        "model": chosen,
+        "scores": scores,
+        "budget_exceeded": exceeded,
+        "selection_ms": selection_seconds * 1000,
+        "train_ms": train_seconds * 1000,
+        "predict_ms": predict_seconds * 1000,
+    }
+
+
+def refit_model(name, X_train, y_train, feature_cols, scaler):
+    """Fit one already-selected candidate (no scoring)"""
+    return candidate_models(feature_cols, scaler)[name]().fit(np.asarray(X_train), np.asarray(y_train))
+
+
+class RidgeStatistics:
+    """
+    Sufficient statistics of a least-squares fit (row count, sums of x and y,
+    x'x and x'y) over an unscaled feature matrix, as prefix sums per block of
+    rows. Any row window costs two prefix lookups plus at most two partial
+    blocks, which are read from the caller's matrix (possibly memory-mapped)
+    on demand; no copy of it is kept. Columns are shifted by their overall
+    mean first so the sum-of-squares form stays accurate.
+    """
+
+    # Blocks summed per pass while building, bounding the float64 working copy
+    BUILD_BLOCKS = 64
+
+    def __init__(self, X, y, block=STATS_BLOCK_ROWS):
+        self.shift = np.asarray(X).mean(axis=0, dtype=np.float64)
+        self.block = block
+
+        n_blocks = len(X) // block
+        k = X.shape[1]
+        self._sx = np.zeros((n_blocks + 1, k))
+        self._sy = np.zeros(n_blocks + 1)
+        self._sxx = np.zeros((n_blocks + 1, k, k))
+        self._sxy = np.zeros((n_blocks + 1, k))
+        for first in range(0, n_blocks, self.BUILD_BLOCKS):
+            last = min(first + self.BUILD_BLOCKS, n_blocks)
+            Xb, yb = self._rows(X, y, first * block, last * block)
+            Xb = Xb.reshape(last - first, block, k)
+            yb = yb.reshape(last - first, block)
+            self._sx[first + 1:last + 1] = Xb.sum(axis=1)
+            self._sy[first + 1:last + 1] = yb.sum(axis=1)
+            self._sxx[first + 1:last + 1] = np.einsum("bij,bik->bjk", Xb, Xb)
+            self._sxy[first + 1:last + 1] = np.einsum("bij,bi->bj", Xb, yb)
+        for prefix in (self._sx, self._sy, self._sxx, self._sxy):
+            np.cumsum(prefix, axis=0, out=prefix)
+
+    def _rows(self, X, y, lo, hi):
+        # Rows [lo, hi) as float64 in shifted units
+        return np.asarray(X[lo:hi], dtype=np.float64) - self.shift, np.asarray(y[lo:hi], dtype=np.float64)
+
+    def _direct(self, X, y, lo, hi):
+        X, y = self._rows(X, y, lo, hi)
+        return np.array([hi - lo, X.sum(axis=0), y.sum(), X.T @ X, X.T @ y], dtype=object)
+
+    def window(self, X, y, lo, hi):
+        """(n, sum x, sum y, x'x, x'y) of rows [lo, hi) in shifted units (X, y as built on)"""
+        first, last = -(-lo // self.block), hi // self.block
+        if first >= last:
+            return self._direct(X, y, lo, hi)
+        stats = np.array([(last - first) * self.block, self._sx[last] - self._sx[first],
+                          self._sy[last] - self._sy[first], self._sxx[last] - self._sxx[first],
+                          self._sxy[last] - self._sxy[first]], dtype=object)
+        return stats + self._direct(X, y, lo, first * self.block) + self._direct(X, y, last * self.block, hi)
+
+    def fit_ridge(self, X, y, lo, hi, alpha=RIDGE_ALPHA):
+        """
+        StandardScaler and Ridge for rows [lo, hi) of `X`, `y` (the arrays
+        the statistics were built on), identical to fitting Ridge(alpha) on
+        scaler.fit_transform(X[lo:hi]) but in O(k^3).
+        Returns (model, scaler) ready for transform/predict.
+        """
+        n, sx, sy, sxx, sxy = self.window(X, y, lo, hi)
+        mean = sx / n
+        y_mean = sy / n
+        cov = sxx / n - np.outer(mean, mean)
+        var = np.maximum(np.diag(cov), 0.0)
+        scale = np.sqrt(var)
+        scale[scale < 10 * np.finfo(np.float64).eps * np.maximum(np.abs(mean + self.shift), 1.0)] = 1.0
+
+        gram = n * cov / np.outer(scale, scale)
+        xy = (sxy - n * mean * y_mean) / scale
+        coef = np.linalg.solve(gram + alpha * np.eye(len(scale)), xy)
+
+        scaler = StandardScaler()
+        scaler.mean_ = mean + self.shift
+        scaler.var_ = var
+        scaler.scale_ = scale
+        scaler.n_features_in_ = len(scale)
+        scaler.n_samples_seen_ = n
+
+        model = Ridge(alpha=alpha, random_state=42)
+        model.coef_ = coef
+        model.intercept_ = y_mean
+        model.n_features_in_ = len(scale)
+        return model, scaler
@@ -0,0 +1,154 @@
+"""
+Panel Features
+Cross-sectional features computed once for a whole date x ticker panel
+instead of ticker by ticker:
+
+  - Sector_Rel_Return: daily return minus the sector's mean return that day
+  - Market_Beta_60 / Market_Corr_60: rolling beta and correlation of daily
+    returns to the market proxy (equal-weight panel return if it is missing)
+  - Sector_Volume_Z: z-score of the sector's dollar volume against its own
+    trailing 20-day mean, shared by every member of the sector
+
+Every feature is a handful of 2D array operations over the panel; sectors are
+handled with one column-index map, so the cost grows with the number of
+sectors, not tickers. Only trailing windows are used, so a row never sees
+data after its own date.
+"""
+
+import numpy as np
+import pandas as pd
+
+from feature_spec import PANEL_FEATURES
+from stock_universe import SECTOR_OF
+
+BETA_WINDOW = 60
+VOLUME_Z_WINDOW = 20
+
+
+def build_panel(raw_frames, fields=("Close", "Volume")):
+    """{field: date x ticker frame} on the union of dates"""
+    tickers = list(raw_frames)
+    index = raw_frames[tickers[0]].index
+    for df in raw_frames.values():
+        if not df.index.equals(index):
+            index = index.union(df.index)
+
+    panel = {field: np.empty((len(index), len(tickers))) for field in fields}
+    for j, ticker in enumerate(tickers):
+        df = raw_frames[ticker]
+        if not df.index.equals(index):
+            df = df.reindex(index)
+        for field in fields:
+            panel[field][:, j] = df[field].to_numpy(dtype=float)
+    return {field: pd.DataFrame(values, index=index, columns=tickers) for field, values in panel.items()}
+
+
+def _rolling_moments(values, window):
+    """
+    Trailing mean and population variance of every column of a 2D array from
+    one cumulative sum (NaN until the window holds `window` valid values).
+    Columns are centered first so the sum-of-squares form stays accurate.
+    """
+    valid = np.isfinite(values)
+    centered = np.where(valid, values - np.nanmean(values, axis=0), 0.0)
+    zero = np.zeros((1, values.shape[1]))
+    csum = np.concatenate((zero, np.cumsum(centered, axis=0)))
+    csq = np.concatenate((zero, np.cumsum(centered * centered, axis=0)))
+    ccount = np.concatenate((zero, np.cumsum(valid, axis=0)))
+
+    mean = np.full(values.shape, np.nan)
+    var = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        full = (ccount[window:] - ccount[:-window]) == window
+        s = (csum[window:] - csum[:-window]) / window
+        sq = (csq[window:] - csq[:-window]) / window
+        offset = np.nanmean(values, axis=0)
+        mean[window - 1:] = np.where(full, s + offset, np.nan)
+        var[window - 1:] = np.where(full, np.maximum(sq - s * s, 0.0), np.nan)
+    return mean, var
+
+
+def _sector_index(tickers, sector_of):
+    """Sector names and, for every ticker column, the index of its sector"""
+    labels = [sector_of.get(t, t) for t in tickers]
+    names = list(dict.fromkeys(labels))
+    return names, np.array([names.index(label) for label in labels])
+
+
+def _group_sum(values, column_sector, n_sectors):
+    """Per-date sum over each sector's columns (NaN counts as missing)"""
+    membership = np.zeros((len(column_sector), n_sectors))
+    membership[np.arange(len(column_sector)), column_sector] = 1.0
+    valid = np.isfinite(values)
+    sums = np.where(valid, values, 0.0) @ membership
+    counts = valid.astype(float) @ membership
+    return sums, counts
+
+
+def compute_panel_features(close, volume, market_close=None, sector_of=SECTOR_OF,
+                           beta_window=BETA_WINDOW, volume_window=VOLUME_Z_WINDOW):
+    """
+    Panel features for every ticker column of `close`/`volume` (date x ticker).
+    Returns {feature name: date x ticker DataFrame}.
+    """
+    tickers = list(close.columns)
+    names, column_sector = _sector_index(tickers, sector_of)
+
+    C = close.to_numpy(dtype=float)
+    R = np.full(C.shape, np.nan)
+    R[1:] = C[1:] / C[:-1] - 1
+
+    # Sector-relative return
+    sums, counts = _group_sum(R, column_sector, len(names))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sector_mean = sums / counts
+    rel_return = R - sector_mean[:, column_sector]
+
+    # Rolling beta and correlation to the market: moments of [returns, market,
+    # returns * market] from one stacked cumulative sum
+    if market_close is not None:
+        M = market_close.reindex(close.index).to_numpy(dtype=float)
+        market = np.full(len(M), np.nan)
+        market[1:] = M[1:] / M[:-1] - 1
+    else:
+        with np.errstate(invalid="ignore"):
+            market = np.nanmean(R, axis=1)
+    n = R.shape[1]
+    mean, var = _rolling_moments(np.column_stack([R, market, R * market[:, None]]), beta_window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = mean[:, n + 1:] - mean[:, :n] * mean[:, n:n + 1]
+        beta = cov / var[:, n:n + 1]
+        corr = cov / np.sqrt(var[:, :n] * var[:, n:n + 1])
+
+    # Sector dollar-volume z-score (sample std, like pandas .rolling().std())
+    dollar_volume, _ = _group_sum(C * volume.to_numpy(dtype=float), column_sector, len(names))
+    volume_mean, volume_var = _rolling_moments(dollar_volume, volume_window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        volume_z = (dollar_volume - volume_mean) / np.sqrt(volume_var * volume_window / (volume_window - 1))
+
+    values = {
+        "Sector_Rel_Return": rel_return,
+        "Market_Beta_60": beta,
+        "Market_Corr_60": corr,
+        "Sector_Volume_Z": volume_z[:, column_sector],
+    }
+    return {name: pd.DataFrame(values[name], index=close.index, columns=tickers)
+            for name in PANEL_FEATURES}
+
+
+def universe_panel(raw_frames, market_raw=None, sector_of=SECTOR_OF):
+    """Panel features from {ticker: raw OHLCV frame} and the market proxy's raw frame"""
+    market_close = market_raw["Close"] if market_raw is not None and len(market_raw) else None
+    panel = build_panel(raw_frames)
+    return compute_panel_features(panel["Close"], panel["Volume"], market_close, sector_of)
+
+
+def ticker_panel(panel, ticker):
+    """One ticker's panel features as a date x feature frame"""
+    return pd.DataFrame({name: frame[ticker] for name, frame in panel.items()})
+
+
+def add_panel_features(df, ticker_features):
+    """Join a ticker's panel features onto its engineered frame and drop warm-up rows"""
+    df = df.join(ticker_features, how="left")
+    return df.replace([np.inf, -np.inf], np.nan).dropna()
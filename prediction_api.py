@@ -0,0 +1,236 @@
+"""
+Prediction HTTP API
+Small JSON service over the shared prediction pipeline, for programmatic
+clients that should not go through Streamlit reruns.
+
+Endpoints:
+    GET /predict/{ticker}              one prediction
+    GET /predict?tickers=AAPL,MSFT     several predictions
+    GET /screener?limit=10&sort=change_pct&order=desc
+    GET /health                        cache and request counters
+
+Results live in a process-wide ArtifactCache that expires when the next daily
+bar is due. Concurrent requests for the same ticker wait on one in-flight
+computation (single_flight.py), and the universe is pre-warmed in the
+background on startup.
+
+Usage:
+    python prediction_api.py serve --port 8000
+    python prediction_api.py bench --url http://127.0.0.1:8000 --requests 2000 --concurrency 16
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from artifact_cache import ArtifactCache
+from batch_predict import UNIVERSE
+from market_calendar import NYSE
+from prediction_log import shared_log
+from prediction_pipeline import DEFAULT_START_DATE, run_pipeline
+from single_flight import SINGLE_FLIGHT
+
+# Upper bound on tickers per /predict?tickers= request
+MAX_TICKERS_PER_REQUEST = 100
+
+
+class NoPrediction(Exception):
+    """Raised when a ticker has no data (unknown symbol or too short a history)"""
+
+
+class PredictionService:
+    """Cached, request-coalescing access to the prediction pipeline"""
+
+    def __init__(self, start_date=DEFAULT_START_DATE, workers=8):
+        self.start_date = start_date
+        self.cache = ArtifactCache(max_entries=4096)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def _compute(self, ticker):
+        result = run_pipeline(ticker, self.start_date)
+        if result is None:
+            raise NoPrediction(f"Insufficient data for {ticker}")
+        shared_log().record(result["prediction"], "api")
+        return result["prediction"], result["last_bar"]
+
+    def predict(self, ticker):
+        """Prediction for one ticker, from cache or a single shared computation"""
+        ticker = ticker.upper()
+        # Cached with the newest raw bar: the prediction's last_date is the
+        # last feature row, a session behind, which would expire at once
+        prediction, _ = self.cache.get_or_compute(("prediction", ticker), lambda: self._compute(ticker),
+                                                  lambda entry: NYSE.cache_expiry(entry[1]))
+        return prediction
+
+    def predict_many(self, tickers):
+        """Predictions for several tickers in parallel; failures are reported per ticker"""
+        futures = {t: self.pool.submit(self.predict, t) for t in tickers}
+        results, errors = [], {}
+        for ticker, future in futures.items():
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors[ticker.upper()] = str(e)
+        return results, errors
+
+    def screener(self, sort="change_pct", order="desc", limit=10):
+        results, errors = self.predict_many(UNIVERSE)
+        results = [r for r in results if sort in r]
+        results.sort(key=lambda r: r[sort], reverse=(order == "desc"))
+        return results[:limit], errors
+
+    def warm(self):
+        """Fill the cache for the whole universe in the background"""
+        def run():
+            started = time.perf_counter()
+            results, errors = self.predict_many(UNIVERSE)
+            print(f"Pre-warmed {len(results)} tickers in {time.perf_counter() - started:.1f}s "
+                  f"({len(errors)} errors)")
+        threading.Thread(target=run, daemon=True, name="cache-warmup").start()
+
+    def stats(self):
+        flights = SINGLE_FLIGHT.stats().get("prediction", {})
+        return dict(self.cache.stats(), inflight=SINGLE_FLIGHT.inflight(), coalesced=flights.get("coalesced", 0))
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            parts = [p for p in url.path.split("/") if p]
+
+            try:
+                if parts == ["health"]:
+                    return self._send(200, {"status": "ok", **service.stats()})
+
+                if len(parts) == 2 and parts[0] == "predict":
+                    return self._send(200, service.predict(parts[1]))
+
+                if parts == ["predict"]:
+                    tickers = [t for raw in params.get("tickers", []) for t in raw.split(",") if t]
+                    if not tickers:
+                        return self._send(400, {"error": "tickers query parameter is required"})
+                    if len(tickers) > MAX_TICKERS_PER_REQUEST:
+                        return self._send(400, {"error": f"at most {MAX_TICKERS_PER_REQUEST} tickers"})
+                    results, errors = service.predict_many(tickers)
+                    return self._send(200, {"predictions": results, "errors": errors})
+
+                if parts == ["screener"]:
+                    results, errors = service.screener(
+                        sort=params.get("sort", ["change_pct"])[0],
+                        order=params.get("order", ["desc"])[0],
+                        limit=int(params.get("limit", ["10"])[0]),
+                    )
+                    return self._send(200, {"results": results, "errors": errors})
+
+                return self._send(404, {"error": "not found"})
+
+            except NoPrediction as e:
+                return self._send(404, {"error": str(e)})
+            except ValueError as e:
+                return self._send(400, {"error": str(e)})
+            except Exception as e:
+                return self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class APIServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog deep enough for bursts of concurrent clients"""
+
+    request_queue_size = 128
+
+
+def serve(host="127.0.0.1", port=8000, warm=True, workers=8):
+    service = PredictionService(workers=workers)
+    if warm:
+        service.warm()
+    server = APIServer((host, port), make_handler(service))
+    print(f"Prediction API listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# ==================================================================================
+# LOAD GENERATOR
+# ==================================================================================
+def bench(url, requests=1000, concurrency=16, tickers=None):
+    """Hit /predict/{ticker} from `concurrency` threads and report latency percentiles"""
+    tickers = tickers or UNIVERSE[:10]
+    latencies = np.zeros(requests)
+    failures = 0
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f"{url}/predict/{tickers[i % len(tickers)]}", timeout=120) as r:
+                r.read()
+            ok = True
+        except Exception:
+            ok = False
+        latencies[i] = time.perf_counter() - started
+        return ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        failures = sum(not ok for ok in pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    p50, p99 = np.percentile(latencies * 1000, [50, 99])
+    print(f"{requests} requests, concurrency {concurrency}, {failures} failures")
+    print(f"Throughput: {requests / elapsed:.0f} req/s")
+    print(f"Latency: p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {latencies.max() * 1000:.2f} ms")
+    return {"p50_ms": p50, "p99_ms": p99, "rps": requests / elapsed, "failures": failures}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediction HTTP API")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = sub.add_parser("serve", help="Run the API server")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8000)
+    serve_cmd.add_argument("--workers", type=int, default=8)
+    serve_cmd.add_argument("--no-warm", action="store_true", help="Skip pre-warming the universe")
+
+    bench_cmd = sub.add_parser("bench", help="Measure latency of a running server")
+    bench_cmd.add_argument("--url", default="http://127.0.0.1:8000")
+    bench_cmd.add_argument("--requests", type=int, default=1000)
+    bench_cmd.add_argument("--concurrency", type=int, default=16)
+    bench_cmd.add_argument("--tickers", help="Comma-separated tickers to cycle through")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args.host, args.port, warm=not args.no_warm, workers=args.workers)
+    else:
+        bench(args.url, args.requests, args.concurrency,
+              args.tickers.split(",") if args.tickers else None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
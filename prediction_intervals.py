@@ -0,0 +1,70 @@
+"""
+Prediction Intervals
+Turns the out-of-sample residuals of the Ridge model into price ranges around
+the point forecast. Everything is a single NumPy array operation, so it works
+the same for one ticker (1-D residuals) or a whole panel (tickers x residuals).
+"""
+
+import numpy as np
+
+# Default coverage of the interval shown in the app and the email
+INTERVAL_LEVEL = 0.90
+
+# Number of resampled residuals used by the bootstrap method
+BOOTSTRAP_DRAWS = 5000
+
+
+def relative_residuals(actual, predicted):
+    """Out-of-sample residuals as a fraction of the prediction (scale free)"""
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    return (actual - predicted) / predicted
+
+
+def conformal_interval(residuals, predicted, level=INTERVAL_LEVEL):
+    """
+    Split-conformal interval.
+
+    Uses the finite-sample corrected quantile of the absolute relative residuals,
+    so the band is symmetric around the prediction. `residuals` is 1-D for one
+    ticker or 2-D (tickers x n) for a panel; `predicted` is a scalar or one value
+    per ticker. Returns (lower, upper) with the shape of `predicted`.
+    """
+    residuals = np.abs(np.asarray(residuals, dtype=float))
+    predicted = np.asarray(predicted, dtype=float)
+
+    n = residuals.shape[-1]
+    q_level = min(1.0, np.ceil((n + 1) * level) / n)
+    q = np.quantile(residuals, q_level, axis=-1, method="higher")
+
+    return predicted * (1 - q), predicted * (1 + q)
+
+
+def bootstrap_interval(residuals, predicted, level=INTERVAL_LEVEL,
+                       n_draws=BOOTSTRAP_DRAWS, seed=42):
+    """
+    Residual bootstrap interval.
+
+    Draws `n_draws` residuals with replacement in one call and takes the
+    empirical quantiles of the simulated prices. Unlike the conformal band this
+    keeps any skew in the residuals. Same shapes as `conformal_interval`.
+    """
+    residuals = np.asarray(residuals, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+
+    rng = np.random.default_rng(seed)
+    n = residuals.shape[-1]
+    idx = rng.integers(0, n, size=residuals.shape[:-1] + (n_draws,))
+    draws = np.take_along_axis(residuals, idx, axis=-1)
+
+    alpha = 1 - level
+    lo, hi = np.quantile(draws, [alpha / 2, 1 - alpha / 2], axis=-1)
+
+    return predicted * (1 + lo), predicted * (1 + hi)
+
+
+def prediction_interval(residuals, predicted, level=INTERVAL_LEVEL, method="conformal"):
+    """Dispatch to the requested interval method"""
+    if method == "bootstrap":
+        return bootstrap_interval(residuals, predicted, level)
+    return conformal_interval(residuals, predicted, level)
@@ -0,0 +1,361 @@
+"""
+Prediction Log
+Append-only record of every prediction the app, the API, the batch CLI and
+the email job produce, and of how each one turned out.
+
+Predictions are stored by column (compressed .npz, one file per append) in a
+directory per prediction date, so adding a day never rewrites older data and
+reading a date range only opens the partitions in it. Once the target
+session has closed, `settle` joins the new predictions with the realized
+close and adds them to per-ticker running sums (direction hits, absolute and
+squared error, closes inside the predicted range) kept in the HistoryStore,
+one row per target date. Rolling statistics over any window are differences
+of two rows of those sums, so charting months of accuracy reads one small
+matrix instead of the whole log.
+
+Layout:
+    <root>/predictions/<last date>/part-*.npz   ticker, prices, range, target date, source
+    <root>/settled.json                         parts whose predictions are all joined with their outcome
+    <root>/accuracy/<TICKER>/accuracy.*         cumulative outcome sums by target date
+
+Usage:
+    python prediction_log.py settle            # join every closed prediction with its outcome
+    python prediction_log.py report            # totals per ticker
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import itertools
+import threading
+
+import numpy as np
+import pandas as pd
+
+from history_store import HistoryStore
+from market_calendar import NYSE
+from prediction_pipeline import load_history
+
+PREDICTION_LOG_DIR = os.getenv("PREDICTION_LOG_DIR", "prediction_log")
+
+PRICE_COLUMNS = ("current_price", "predicted_price", "lower_bound", "upper_bound")
+
+# Running sums per ticker and target date
+ACCURACY_KIND = "accuracy"
+ACCURACY_COLUMNS = ["count", "hits", "abs_error_pct", "squared_error_pct", "with_range", "in_range"]
+
+# Settled predictions per rolling window in the app's chart (about a month of sessions)
+DEFAULT_ROLLING_WINDOW = 20
+
+# A prediction whose realized close is still missing this many days after its target is dropped
+SETTLE_GIVE_UP_DAYS = 10
+
+# Source tag of batch_predict --as-of rows; they are kept in the log but never settled into the track record
+BACKTEST_SOURCE = "backtest"
+
+# Buffered single predictions (app, API) are written once this many are pending or this old
+FLUSH_ROWS = 64
+FLUSH_SECONDS = 60
+
+_PART_SEQUENCE = itertools.count()
+
+
+def _columns(predictions, source):
+    """Column arrays for a list of prediction dicts"""
+    return {
+        "ticker": np.array([p["ticker"].upper() for p in predictions]),
+        # Predictions made without residuals have no range; it is stored as NaN
+        **{c: np.array([p.get(c, np.nan) for p in predictions], dtype=np.float64) for c in PRICE_COLUMNS},
+        "last_date": np.array([pd.Timestamp(p["last_date"]).date() for p in predictions], dtype="datetime64[D]"),
+        "target_date": np.array([pd.Timestamp(p["next_date"]).date() for p in predictions], dtype="datetime64[D]"),
+        "logged_at": np.full(len(predictions), np.datetime64(time.time_ns(), "ns")),
+        "source": np.full(len(predictions), source),
+    }
+
+
+def outcome_rows(frame, realized):
+    """
+    Per-prediction outcome values for `frame` (logged predictions) against
+    the realized closes aligned with it: direction hit, errors in % of the
+    realized close, and whether the close fell inside the predicted range
+    (for predictions that had one).
+    """
+    lower = frame["lower_bound"].to_numpy()
+    upper = frame["upper_bound"].to_numpy()
+    current = frame["current_price"].to_numpy()
+    predicted = frame["predicted_price"].to_numpy()
+    error_pct = (predicted - realized) / realized * 100
+    return pd.DataFrame({
+        "count": 1.0,
+        "hits": (np.sign(predicted - current) == np.sign(realized - current)).astype(np.float64),
+        "abs_error_pct": np.abs(error_pct),
+        "squared_error_pct": error_pct ** 2,
+        "with_range": (~np.isnan(lower) & ~np.isnan(upper)).astype(np.float64),
+        "in_range": ((lower <= realized) & (realized <= upper)).astype(np.float64),
+    }, index=pd.DatetimeIndex(frame["target_date"].to_numpy()))
+
+
+class PredictionLog:
+    """Date-partitioned prediction log with incrementally settled accuracy"""
+
+    def __init__(self, root=PREDICTION_LOG_DIR):
+        self.root = root
+        self.partitions_dir = os.path.join(root, "predictions")
+        self.state_path = os.path.join(root, "settled.json")
+        self.accuracy = HistoryStore(os.path.join(root, "accuracy"))
+        os.makedirs(self.partitions_dir, exist_ok=True)
+        self._buffer = []
+        self._buffered_at = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ writing
+    def append(self, predictions, source):
+        """Write predictions (dicts as returned by the pipeline) as new parts; returns the row count"""
+        predictions = [p for p in predictions if p is not None]
+        if not predictions:
+            return 0
+
+        columns = _columns(predictions, source)
+        for day in np.unique(columns["last_date"]):
+            rows = columns["last_date"] == day
+            directory = os.path.join(self.partitions_dir, str(day))
+            os.makedirs(directory, exist_ok=True)
+
+            # Unique name per process and call; written under a temp name so readers never see half a part
+            path = os.path.join(directory, f"part-{time.time_ns()}-{os.getpid()}-{next(_PART_SEQUENCE)}.npz")
+            with open(path + ".tmp", "wb") as f:
+                np.savez_compressed(f, **{name: values[rows] for name, values in columns.items()})
+            os.replace(path + ".tmp", path)
+        return len(predictions)
+
+    def record(self, prediction, source):
+        """Buffer one prediction; the buffer is written as one part when full, stale or at exit"""
+        with self._lock:
+            if not self._buffer:
+                self._buffered_at = time.monotonic()
+            self._buffer.append((prediction, source))
+            due = len(self._buffer) >= FLUSH_ROWS or time.monotonic() - self._buffered_at >= FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        for source in dict.fromkeys(s for _, s in pending):
+            self.append([p for p, s in pending if s == source], source)
+
+    # ------------------------------------------------------------------ reading
+    def partitions(self, start=None, end=None):
+        """Prediction dates with a partition, oldest first (optionally within [start, end])"""
+        days = sorted(d for d in os.listdir(self.partitions_dir)
+                      if os.path.isdir(os.path.join(self.partitions_dir, d)))
+        if start is not None:
+            days = [d for d in days if d >= str(pd.Timestamp(start).date())]
+        if end is not None:
+            days = [d for d in days if d <= str(pd.Timestamp(end).date())]
+        return days
+
+    def _parts(self, day):
+        directory = os.path.join(self.partitions_dir, day)
+        return sorted(name for name in os.listdir(directory) if name.endswith(".npz"))
+
+    def _read_parts(self, day, names):
+        frames = []
+        for name in names:
+            with np.load(os.path.join(self.partitions_dir, day, name)) as part:
+                frames.append(pd.DataFrame({key: part[key] for key in part.files}).assign(part=f"{day}/{name}"))
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    def read(self, start=None, end=None):
+        """Logged predictions made between `start` and `end` (by prediction date) as one DataFrame"""
+        frames = [self._read_parts(day, self._parts(day)) for day in self.partitions(start, end)]
+        frames = [f.drop(columns="part") for f in frames if f is not None]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    # ------------------------------------------------------------------ settling
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r") as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    def settle(self, closes, as_of=None):
+        """
+        Join every unsettled prediction whose target session has closed (by
+        `as_of`, default the latest completed session) with the realized
+        close from `closes(ticker, start, end)` (a Series by date, through
+        `end` inclusive), and extend the per-ticker running sums. Each
+        (ticker, target date) counts once: the first logged prediction.
+        Backtest rows are skipped.
+
+        A part is marked settled only once none of its predictions is left
+        waiting. A missing close holds back that ticker's later targets too
+        (the sums only grow at the end) and is retried on the next run, until
+        SETTLE_GIVE_UP_DAYS after its target, when it is dropped. Returns
+        counts of what was done.
+        """
+        self.flush()
+        latest = pd.Timestamp(as_of) if as_of is not None else NYSE.latest_completed_session()
+        give_up = (latest - pd.Timedelta(days=SETTLE_GIVE_UP_DAYS)).to_datetime64()
+        state = self._load_state()
+
+        # Only parts not settled yet (new or still waiting) are opened; a prediction made on `latest`
+        # targets a later session
+        pending = {}
+        for day in self.partitions(end=latest - pd.Timedelta(days=1)):
+            settled = set(state.get(day, []))
+            names = [n for n in self._parts(day) if n not in settled]
+            if names:
+                pending[day] = names
+        stats = {"parts": sum(map(len, pending.values())), "settled": 0, "late": 0, "missing": 0, "waiting": 0,
+                 "tickers": 0}
+        if not pending:
+            return stats
+
+        frame = pd.concat([self._read_parts(day, names) for day, names in pending.items()], ignore_index=True)
+        frame = frame[frame["source"] != BACKTEST_SOURCE]
+        due = frame["target_date"] <= latest.to_datetime64()
+        waiting = set(frame.loc[~due, "part"])
+        frame = frame[due].sort_values("logged_at", kind="stable").drop_duplicates(["ticker", "target_date"])
+
+        for ticker, rows in frame.groupby("ticker", sort=True):
+            stored = self.accuracy.load(ticker, ACCURACY_KIND)
+            if stored is not None:
+                # The running sums only grow at the end; a target already settled cannot be inserted
+                late = rows["target_date"] <= stored.index[-1].to_datetime64()
+                stats["late"] += int(late.sum())
+                rows = rows[~late]
+            if not len(rows):
+                continue
+            rows = rows.sort_values("target_date")
+
+            try:
+                close = closes(ticker, pd.Timestamp(rows["target_date"].iloc[0]), latest)
+                realized = close.reindex(pd.DatetimeIndex(rows["target_date"].to_numpy())).to_numpy(dtype=np.float64)
+            except Exception as e:
+                print(f"  ✗ {ticker}: no closes ({e})")
+                realized = np.full(len(rows), np.nan)
+            found = ~np.isnan(realized)
+
+            # Stop at the first missing close that may still arrive; it and everything after it wait
+            retry = np.flatnonzero(~found & (rows["target_date"].to_numpy() >= give_up))
+            if len(retry):
+                waiting.update(rows["part"].iloc[retry[0]:])
+                stats["waiting"] += int(len(rows) - retry[0])
+                rows, realized, found = rows.iloc[:retry[0]], realized[:retry[0]], found[:retry[0]]
+            stats["missing"] += int((~found).sum())
+            if not found.any():
+                continue
+
+            outcomes = outcome_rows(rows[found], realized[found])
+            sums = outcomes.cumsum()
+            if stored is not None:
+                previous = stored.to_frame()
+                sums = pd.concat([previous, sums + previous.iloc[-1].to_numpy()])
+            self.accuracy.save(ticker, ACCURACY_KIND, sums, ACCURACY_COLUMNS)
+            stats["settled"] += len(outcomes)
+            stats["tickers"] += 1
+
+        for day, names in pending.items():
+            done = [n for n in names if f"{day}/{n}" not in waiting]
+            if done:
+                state[day] = sorted(set(state.get(day, [])) | set(done))
+        self._save_state(state)
+        return stats
+
+    # ------------------------------------------------------------------ accuracy
+    def track_record(self, ticker, window=DEFAULT_ROLLING_WINDOW):
+        """
+        Rolling accuracy over the last `window` settled predictions, by target
+        date: hit rate, mean absolute and root mean squared error (% of the
+        close) and how often the close fell inside the predicted range. None
+        before anything was settled.
+        """
+        stored = self.accuracy.load(ticker, ACCURACY_KIND)
+        if stored is None:
+            return None
+        sums = stored.to_frame()
+        delta = sums - sums.shift(window).fillna(0.0)
+        count = delta["count"]
+        return pd.DataFrame({
+            "Hit Rate %": delta["hits"] / count * 100,
+            "MAE %": delta["abs_error_pct"] / count,
+            "RMSE %": np.sqrt(delta["squared_error_pct"] / count),
+            "In Range %": delta["in_range"] / delta["with_range"] * 100,
+            "Predictions": count,
+        })
+
+    def summary(self, tickers=None):
+        """Totals per ticker over everything settled (one row each, from the last row of the sums)"""
+        rows = {}
+        for ticker in tickers or self.accuracy.tickers():
+            stored = self.accuracy.load(ticker, ACCURACY_KIND)
+            if stored is None:
+                continue
+            last = dict(zip(stored.columns, stored.values[-1]))
+            n = last["count"]
+            rows[ticker] = {
+                "Predictions": int(n),
+                "Hit Rate %": last["hits"] / n * 100,
+                "MAE %": last["abs_error_pct"] / n,
+                "RMSE %": np.sqrt(last["squared_error_pct"] / n),
+                "In Range %": last["in_range"] / last["with_range"] * 100 if last["with_range"] else np.nan,
+                "Since": stored.index[0].strftime("%Y-%m-%d"),
+                "Through": stored.index[-1].strftime("%Y-%m-%d"),
+            }
+        return pd.DataFrame.from_dict(rows, orient="index").rename_axis("Ticker")
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_log(root=PREDICTION_LOG_DIR):
+    """One PredictionLog per root for the whole process, flushed at exit"""
+    with _shared_lock:
+        if root not in _shared:
+            _shared[root] = PredictionLog(root)
+            atexit.register(_shared[root].flush)
+        return _shared[root]
+
+
+def realized_closes(ticker, start, end):
+    """Closes from `start` through `end` (inclusive), via the prediction pipeline's data path"""
+    df = load_history(ticker, pd.Timestamp(start).strftime("%Y-%m-%d"), as_of=end)
+    return df["Close"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediction log: settle outcomes and report accuracy")
+    parser.add_argument("command", choices=["settle", "report"])
+    parser.add_argument("--root", default=PREDICTION_LOG_DIR)
+    parser.add_argument("--as-of", help="Settle targets up to this date (default: latest completed session)")
+    args = parser.parse_args(argv)
+
+    log = PredictionLog(args.root)
+    if args.command == "settle":
+        started = time.perf_counter()
+        stats = log.settle(realized_closes, args.as_of)
+        print(f"Settled {stats['settled']} predictions for {stats['tickers']} tickers from {stats['parts']} parts "
+              f"in {time.perf_counter() - started:.1f}s ({stats['late']} already settled, "
+              f"{stats['missing']} without a close, {stats['waiting']} waiting for a close)")
+        return 0
+
+    summary = log.summary()
+    if not len(summary):
+        print("Nothing settled yet")
+        return 1
+    print(summary.round(2).to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Prediction Pipeline
+Streamlit-free fetch -> features -> train -> predict path shared by the daily
+email job, the batch CLI and any other headless consumer.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import pandas as pd
+import numpy as np
+import yfinance as yf
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+import warnings
+
+from feature_spec import ALWAYS_COMPUTED, load_feature_spec, model_feature_columns
+from history_store import HistoryStore, feature_layout
+from indicator_kernels import build_feature_frame, column_block
+from market_calendar import NYSE
+from model_selection import select_model
+from panel_features import add_panel_features, universe_panel
+from prediction_intervals import prediction_interval, relative_residuals
+from price_history import PriceHistory
+from stock_universe import MARKET_PROXY
+
+warnings.filterwarnings("ignore")
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+DEFAULT_START_DATE = "2015-01-01"
+
+# Spill feature matrices to memory-mapped files when set (see history_store.py)
+HISTORY_STORE_DIR = os.getenv("HISTORY_STORE_DIR")
+history_store = HistoryStore(HISTORY_STORE_DIR) if HISTORY_STORE_DIR else None
+
+# Model input set (all features unless feature_spec.json holds a pruned spec)
+FEATURE_SPEC = load_feature_spec()
+
+# Element type of the feature matrix; float32 halves it (indicators are still computed in float64)
+FEATURE_DTYPE = np.dtype(os.getenv("FEATURE_DTYPE", "float64"))
+
+# ==================================================================================
+# DATA FETCH
+# ==================================================================================
+def fetch_history(ticker, start_date=DEFAULT_START_DATE, as_of=None):
+    """
+    Download daily bars from Yahoo Finance, up to and including `as_of`
+    (default: the latest completed session on the market clock, so today's
+    bar is included once it is due and an unfinished session never is).
+    """
+    if as_of is None:
+        as_of = NYSE.latest_completed_session()
+    end_date = (pd.Timestamp(as_of) + timedelta(days=1)).strftime("%Y-%m-%d")
+    
+    df_raw = yf.download(
+        ticker,
+        start=start_date,
+        end=end_date,
+        progress=False
+    )
+    
+    if isinstance(df_raw.columns, pd.MultiIndex):
+        df_raw.columns = df_raw.columns.get_level_values(0)
+    
+    return df_raw
+
+def _drop_stored_features(ticker, event):
+    # Every engineered value of the ticker changed with the re-adjusted prices
+    history_store.delete(ticker, "features")
+
+# Raw bars kept in the history store and refreshed incrementally (when enabled)
+price_history = (PriceHistory(history_store, fetch_history, DEFAULT_START_DATE, on_adjust=_drop_stored_features)
+                 if history_store is not None else None)
+
+def load_history(ticker, start_date=DEFAULT_START_DATE, as_of=None):
+    """Raw bars from the incremental store when enabled, otherwise a full download"""
+    if price_history is not None:
+        return price_history.get(ticker, start_date, as_of)
+    return fetch_history(ticker, start_date, as_of)
+
+def fetch_panel(tickers, start_date=DEFAULT_START_DATE, as_of=None, workers=8):
+    """
+    Fetch several tickers plus the market proxy and compute their panel
+    features in one pass. Returns ({ticker: raw frame}, panel).
+    """
+    symbols = list(dict.fromkeys([*tickers, MARKET_PROXY]))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = dict(zip(symbols, pool.map(lambda t: load_history(t, start_date, as_of), symbols)))
+    
+    market_raw = frames[MARKET_PROXY]
+    raw_frames = {t: frames[t] for t in tickers if len(frames[t])}
+    return raw_frames, universe_panel(raw_frames, market_raw)
+
+# ==================================================================================
+# FEATURE ENGINEERING
+# ==================================================================================
+def engineer_features(df_raw, features=None):
+    """
+    Engineer technical indicators. With `features` (a pruned spec) only those
+    columns, their inputs and ALWAYS_COMPUTED are built and kept.
+    """
+    df = df_raw.copy()
+    want = None if features is None else set(features) | set(ALWAYS_COMPUTED)
+    
+    def need(*cols):
+        return want is None or not want.isdisjoint(cols)
+    
+    # Moving Averages
+    for window in (5, 10, 20, 50):
+        if need(f"MA_{window}"):
+            df[f"MA_{window}"] = df["Close"].rolling(window).mean()
+    
+    # Exponential Moving Averages
+    if need("EMA_12", "EMA_26", "MACD", "MACD_Signal"):
+        df["EMA_12"] = df["Close"].ewm(span=12, adjust=False).mean()
+        df["EMA_26"] = df["Close"].ewm(span=26, adjust=False).mean()
+    
+    # MACD
+    if need("MACD", "MACD_Signal"):
+        df["MACD"] = df["EMA_12"] - df["EMA_26"]
+        df["MACD_Signal"] = df["MACD"].ewm(span=9, adjust=False).mean()
+    
+    # RSI
+    if need("RSI"):
+        delta = df["Close"].diff()
+        gain = delta.where(delta > 0, 0).rolling(14).mean()
+        loss = -delta.where(delta < 0, 0).rolling(14).mean()
+        rs = gain / loss
+        df["RSI"] = 100 - (100 / (1 + rs))
+    
+    # Bollinger Bands
+    if need("BB_Middle", "BB_Upper", "BB_Lower", "BB_Width"):
+        df["BB_Middle"] = df["Close"].rolling(20).mean()
+        bb_std = df["Close"].rolling(20).std()
+        df["BB_Upper"] = df["BB_Middle"] + (2 * bb_std)
+        df["BB_Lower"] = df["BB_Middle"] - (2 * bb_std)
+        df["BB_Width"] = df["BB_Upper"] - df["BB_Lower"]
+    
+    # Price Changes
+    if need("Daily_Return", "Volatility_10", "Volatility_30"):
+        df["Daily_Return"] = df["Close"].pct_change()
+    if need("Price_Change"):
+        df["Price_Change"] = df["Close"].diff()
+    if need("Log_Return"):
+        df["Log_Return"] = np.log(df["Close"] / df["Close"].shift(1))
+    
+    # Volume Metrics
+    if need("Volume_MA_10", "Volume_Ratio"):
+        df["Volume_MA_10"] = df["Volume"].rolling(10).mean()
+        df["Volume_Ratio"] = df["Volume"] / df["Volume_MA_10"]
+    
+    # Volatility
+    for window in (10, 30):
+        if need(f"Volatility_{window}"):
+            df[f"Volatility_{window}"] = df["Daily_Return"].rolling(window).std()
+    
+    # Momentum
+    for window in (5, 10, 20):
+        if need(f"Momentum_{window}"):
+            df[f"Momentum_{window}"] = df["Close"] - df["Close"].shift(window)
+    
+    # Rate of Change
+    for window in (5, 10):
+        if need(f"ROC_{window}"):
+            df[f"ROC_{window}"] = ((df["Close"] - df["Close"].shift(window)) / df["Close"].shift(window)) * 100
+    
+    # High-Low Range
+    if need("HL_Range", "HL_Pct"):
+        df["HL_Range"] = df["High"] - df["Low"]
+        df["HL_Pct"] = (df["HL_Range"] / df["Close"]) * 100
+    
+    # Drop intermediates that only fed other features
+    if want is not None:
+        df = df[[c for c in df.columns if c in df_raw.columns or c in want]]
+    
+    # Target
+    df["Target"] = df["Close"].shift(-1)
+    
+    # Clean
+    df = df.replace([np.inf, -np.inf], np.nan).dropna()
+    
+    return df
+
+# ==================================================================================
+# TRAIN AND PREDICT
+# ==================================================================================
+def run_pipeline(ticker, start_date=DEFAULT_START_DATE, as_of=None, df_raw=None, panel=None):
+    """
+    Fetch, engineer, train and predict one ticker.
+    `df_raw` skips the download when already fetched; `panel` is the ticker's
+    panel features (see fetch_panel / panel_features.ticker_panel).
+    Returns a dict with "prediction", "metrics", "features" (the latest
+    feature row as a Series) and "last_bar" (date of the newest raw bar),
+    or None when there is not enough history.
+    """
+    if df_raw is None:
+        df_raw = load_history(ticker, start_date, as_of)
+    
+    if len(df_raw) < 100:
+        return None
+    
+    # Engineer features straight into one preallocated matrix
+    df = build_feature_frame(df_raw, FEATURE_SPEC["features"], FEATURE_DTYPE)
+    if panel is not None:
+        df = add_panel_features(df, panel)
+    
+    # Prepare data
+    feature_cols = model_feature_columns(df, FEATURE_SPEC["features"])
+    
+    if history_store is not None:
+        # Train from zero-copy slices of the memory-mapped matrix
+        history_store.save(ticker, "features", df, feature_layout(df.columns, feature_cols), FEATURE_DTYPE)
+        stored = history_store.load(ticker, "features")
+        del df
+        X = stored.block(feature_cols)
+        y = stored.column("Target")
+        close = stored.column("Close")
+        rsi = stored.column("RSI")
+        dates = stored.index
+    else:
+        X = column_block(df, feature_cols)
+        y = df["Target"].to_numpy()
+        close = df["Close"].to_numpy()
+        rsi = df["RSI"].to_numpy()
+        dates = df.index
+    
+    # Train
+    split = int(len(X) * 0.8)
+    X_train, X_test = X[:split], X[split:]
+    y_train, y_test = y[:split], y[split:]
+    
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    
+    # Best of the fast candidates within the CPU budget (Ridge fallback)
+    model, selection = select_model(X_train_scaled, y_train, feature_cols, scaler)
+    
+    # Out-of-sample evaluation and residuals for the prediction interval
+    test_pred = model.predict(scaler.transform(X_test))
+    residuals = relative_residuals(y_test, test_pred)
+    metrics = {
+        "ticker": ticker,
+        "rmse": float(np.sqrt(mean_squared_error(y_test, test_pred))),
+        "mae": float(mean_absolute_error(y_test, test_pred)),
+        "r2": float(r2_score(y_test, test_pred)),
+        "train_rows": split,
+        "test_rows": len(X) - split,
+        "model": selection["model"],
+        "budget_exceeded": selection["budget_exceeded"],
+        "train_ms": selection["train_ms"],
+        "predict_ms": selection["predict_ms"]
+    }
+    
+    # Predict
+    latest = X[-1:]
+    latest_scaled = scaler.transform(latest)
+    next_day_prediction = float(model.predict(latest_scaled)[0])
+    lower, upper = prediction_interval(residuals, next_day_prediction)
+    
+    current_price = float(close[-1])
+    change = next_day_prediction - current_price
+    change_pct = (change / current_price) * 100
+    
+    last_date = dates[-1]
+    next_date = NYSE.next_session(last_date)
+    
+    prediction = {
+        "ticker": ticker,
+        "current_price": current_price,
+        "predicted_price": next_day_prediction,
+        "change": change,
+        "change_pct": change_pct,
+        "lower_bound": float(lower),
+        "upper_bound": float(upper),
+        "rsi": float(rsi[-1]),
+        "last_date": last_date.strftime("%Y-%m-%d"),
+        "next_date": next_date.strftime("%Y-%m-%d")
+    }
+    
+    features = pd.Series(np.asarray(latest[0], dtype=float), index=feature_cols, name=ticker)
+    
+    return {"prediction": prediction, "metrics": metrics, "features": features,
+            "last_bar": df_raw.index[-1]}
+
+def train_and_predict(ticker, start_date=DEFAULT_START_DATE, as_of=None):
+    """Train model and make prediction for a stock (None on failure)"""
+    try:
+        result = run_pipeline(ticker, start_date, as_of)
+        return result["prediction"] if result else None
+    
+    except Exception as e:
+        print(f"Error processing {ticker}: {e}")
+        return None
+
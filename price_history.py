@@ -0,0 +1,164 @@
+"""
+Incremental Price History
+Keeps every ticker's raw daily bars in the HistoryStore and only downloads
+what is new. Each refresh re-fetches a few overlap bars along with the new
+ones. Yahoo back-adjusts the whole series when a split or dividend goes ex,
+so if the overlap no longer matches what is stored, the older stored bars are
+rescaled locally (one multiplier per column, applied to the whole matrix in
+one operation) instead of downloading the history again from the start date.
+
+Only completed sessions are persisted; a still-open bar is returned but not
+stored, so an intraday price is never mistaken for an adjustment later.
+"""
+
+import numpy as np
+import pandas as pd
+
+from history_store import HistoryStore
+from market_calendar import NYSE
+
+# Stored bars re-downloaded on every refresh to detect re-adjusted history
+OVERLAP_BARS = 5
+
+# Relative price difference on the overlap that counts as a corporate action
+ADJUST_TOLERANCE = 1e-4
+
+PRICE_COLUMNS = ("Open", "High", "Low", "Close")
+ADJ_CLOSE_COLUMN = "Adj Close"
+VOLUME_COLUMN = "Volume"
+
+RAW_KIND = "raw"
+
+
+def adjustment_factors(stored, fresh):
+    """
+    Multipliers that bring stored bars in line with a fresh download,
+    measured on the oldest bar both share: {"price", "adj_close", "volume"},
+    all 1.0 when the overlap still matches; None when the two do not overlap.
+
+    Yahoo's unadjusted Close (auto_adjust=False) moves only on splits, and a
+    dividend shows up in Adj Close alone, so Adj Close gets its own factor;
+    with auto_adjust=True there is no Adj Close and Close carries both.
+    """
+    common = stored.index.intersection(fresh.index)
+    if len(common) == 0:
+        return None
+    first = common[0]
+
+    def ratio(column):
+        if column not in stored.columns or column not in fresh.columns or not stored.at[first, column]:
+            return 1.0
+        value = float(fresh.at[first, column]) / float(stored.at[first, column])
+        return 1.0 if abs(value - 1) <= ADJUST_TOLERANCE else value
+
+    factors = {"price": ratio("Close"), "adj_close": ratio(ADJ_CLOSE_COLUMN), "volume": 1.0}
+    if factors["price"] != 1.0 and VOLUME_COLUMN in stored.columns and stored.at[first, VOLUME_COLUMN] > 0:
+        factors["volume"] = float(fresh.at[first, VOLUME_COLUMN]) / float(stored.at[first, VOLUME_COLUMN])
+    return factors
+
+
+def describe_adjustment(factors):
+    """'split' when volume moved inversely to price, otherwise 'dividend'"""
+    price, volume = factors["price"], factors["volume"]
+    return "split" if price != 1.0 and abs(price * volume - 1) < 0.01 else "dividend"
+
+
+def column_multipliers(columns, factors):
+    """Per-column multipliers for the stored matrix"""
+    return np.array([factors["adj_close"] if c == ADJ_CLOSE_COLUMN else factors["price"] if c in PRICE_COLUMNS
+                     else factors["volume"] if c == VOLUME_COLUMN else 1.0 for c in columns])
+
+
+class PriceHistory:
+    """Raw bars per ticker from `start_date`, refreshed incrementally through `fetch(ticker, start)`"""
+
+    def __init__(self, store, fetch, start_date, overlap=OVERLAP_BARS, on_adjust=None):
+        self.store = store if store is not None else HistoryStore()
+        self.fetch = fetch
+        self.start_date = pd.Timestamp(start_date)
+        self.overlap = overlap
+        # Called as on_adjust(ticker, event) after stored history was rescaled
+        self.on_adjust = on_adjust
+        self.events = []
+        self.downloads = {"full": 0, "incremental": 0, "skipped": 0}
+
+    def _stored(self, ticker):
+        stored = self.store.load(ticker, RAW_KIND)
+        return None if stored is None or len(stored) == 0 else stored.to_frame()
+
+    def _save(self, ticker, df):
+        # Persist completed sessions only
+        settled = df.loc[:NYSE.latest_completed_session()]
+        if len(settled):
+            self.store.save(ticker, RAW_KIND, settled)
+
+    def refresh(self, ticker):
+        """Bring the stored history of a ticker up to date; returns the full frame"""
+        stored = self._stored(ticker)
+        if stored is None:
+            self.downloads["full"] += 1
+            df = self.fetch(ticker, self.start_date.strftime("%Y-%m-%d"))
+            if len(df):
+                self._save(ticker, df)
+            return df
+
+        if not NYSE.new_bar_possible(stored.index[-1]):
+            self.downloads["skipped"] += 1
+            return stored
+
+        self.downloads["incremental"] += 1
+        since = stored.index[max(len(stored) - self.overlap, 0)]
+        fresh = self.fetch(ticker, since.strftime("%Y-%m-%d"))
+        if len(fresh) == 0:
+            return stored
+
+        factors = adjustment_factors(stored, fresh)
+        if factors is None:
+            # Gap wider than the overlap (e.g. a delisted stretch): start over
+            self.downloads["full"] += 1
+            df = self.fetch(ticker, self.start_date.strftime("%Y-%m-%d"))
+            self._save(ticker, df)
+            return df
+
+        # Older bars are kept (rescaled if needed); the overlap and newer come from the fresh download
+        older = stored.loc[stored.index < fresh.index[0]]
+        columns = [c for c in stored.columns if c in fresh.columns]
+        values = older[columns].to_numpy(dtype=np.float64, copy=True)
+
+        adjusted = any(f != 1.0 for f in factors.values())
+        if adjusted:
+            values *= column_multipliers(columns, factors)
+            event = {"ticker": ticker.upper(), "date": fresh.index[0], "kind": describe_adjustment(factors),
+                     "price_factor": factors["price"], "adj_close_factor": factors["adj_close"],
+                     "volume_factor": factors["volume"]}
+            self.events.append(event)
+            print(f"{ticker}: {event['kind']} adjustment detected (x{factors['price']:.6g} prices, "
+                  f"x{factors['adj_close']:.6g} adj close, x{factors['volume']:.6g} volume), "
+                  f"rescaled {len(values)} stored bars")
+
+        older = pd.DataFrame(values, index=older.index, columns=columns)
+        df = pd.concat([older, fresh[columns].astype(np.float64)])
+        self._save(ticker, df)
+
+        if adjusted and self.on_adjust is not None:
+            self.on_adjust(ticker, event)
+        return df
+
+    def get(self, ticker, start_date=None, as_of=None):
+        """
+        Bars from `start_date` through `as_of` (inclusive, default: latest).
+        Starts before the store's own start date are fetched directly.
+        """
+        start = pd.Timestamp(start_date) if start_date is not None else self.start_date
+        if start < self.start_date:
+            return self.fetch(ticker, start.strftime("%Y-%m-%d"))
+
+        stored = self._stored(ticker) if as_of is not None else None
+        if stored is not None and stored.index[-1] >= pd.Timestamp(as_of):
+            df = stored
+        else:
+            df = self.refresh(ticker)
+        return df.loc[start:as_of]
+
+    def stats(self):
+        return dict(self.downloads, adjustments=len(self.events))
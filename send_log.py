@@ -0,0 +1,130 @@
+"""
+Send Log
+Durable record of one day's email run, so an interrupted job can be restarted
+at any point without resending or recomputing:
+
+    send_log/<report date>/predictions.json     predictions + render time, written once
+    send_log/<report date>/sends[-i-of-n].tsv   one line per delivery outcome (per shard)
+    send_log/<report date>/report[-i-of-n].json delivery report of a shard
+
+Entries are keyed by (report date, recipient): a recipient with a "sent" line
+in any shard's file is skipped on every later run for that date, however the
+subscribers are sharded. Lines are appended and flushed as each message is
+accepted by the server; a line cut off by a crash is ignored on reload.
+"""
+
+import os
+import glob
+import json
+import threading
+from datetime import datetime
+
+SEND_LOG_DIR = os.getenv("SEND_LOG_DIR", "send_log")
+
+SENT = "sent"
+FAILED = "failed"
+
+
+class SendLog:
+    """Per-report-date predictions snapshot and append-only delivery log"""
+
+    def __init__(self, report_date, root=SEND_LOG_DIR, shard_index=0, shard_count=1):
+        self.report_date = str(report_date)
+        self.directory = os.path.join(root, self.report_date)
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = "" if shard_count == 1 else f"-{shard_index}-of-{shard_count}"
+        self.predictions_path = os.path.join(self.directory, "predictions.json")
+        self.sends_path = os.path.join(self.directory, f"sends{suffix}.tsv")
+        self.report_path = os.path.join(self.directory, f"report{suffix}.json")
+        self._lock = threading.Lock()
+        self._file = None
+
+    # ------------------------------------------------------------------ predictions
+    def save_predictions(self, predictions, generated_at):
+        """Persist the prediction stage's output (atomic replace)"""
+        tmp = self.predictions_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"generated_at": generated_at.isoformat(), "predictions": predictions}, f, default=float)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.predictions_path)
+
+    def load_predictions(self):
+        """(predictions, generated_at) from an earlier run of this date, or None"""
+        if not os.path.exists(self.predictions_path):
+            return None
+        with open(self.predictions_path, "r") as f:
+            stored = json.load(f)
+        return stored["predictions"], datetime.fromisoformat(stored["generated_at"])
+
+    # ------------------------------------------------------------------ deliveries
+    def outcomes(self):
+        """{recipient: (last recorded status, detail)} across every shard's file"""
+        outcomes = {}
+        for path in sorted(glob.glob(os.path.join(self.directory, "sends*.tsv"))):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # torn final line from a crash
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) >= 4 and outcomes.get(fields[0], ("",))[0] != SENT:
+                        outcomes[fields[0]] = (fields[1], fields[3])
+        return outcomes
+
+    def delivered(self):
+        """Recipients that already got this date's report"""
+        return {r for r, (status, _) in self.outcomes().items() if status == SENT}
+
+    def _open_for_append(self):
+        """Open this shard's file for appending, first cutting off a torn final line left by a crash"""
+        if os.path.exists(self.sends_path):
+            with open(self.sends_path, "r+b") as f:
+                end = f.seek(0, os.SEEK_END)
+                pos = end
+                while pos > 0:
+                    # Scan back from the end for the last newline; the torn line was never confirmed
+                    step = min(4096, pos)
+                    f.seek(pos - step)
+                    chunk = f.read(step)
+                    if pos == end and chunk.endswith(b"\n"):
+                        break
+                    cut = chunk.rfind(b"\n")
+                    if cut >= 0:
+                        f.truncate(pos - step + cut + 1)
+                        break
+                    pos -= step
+                else:
+                    f.truncate(0)
+        return open(self.sends_path, "a", encoding="utf-8")
+
+    def record(self, recipient, status, detail=""):
+        detail = " ".join(str(detail).split())
+        line = f"{recipient}\t{status}\t{datetime.now().isoformat(timespec='seconds')}\t{detail}\n"
+        with self._lock:
+            if self._file is None:
+                self._file = self._open_for_append()
+            self._file.write(line)
+            self._file.flush()
+
+    # ------------------------------------------------------------------ reports
+    def write_report(self, report):
+        tmp = self.report_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp, self.report_path)
+
+    def reports(self):
+        """Every shard report written for this date"""
+        reports = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "report*.json"))):
+            with open(path, "r") as f:
+                reports.append(json.load(f))
+        return reports
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
@@ -0,0 +1,77 @@
+"""
+Single Flight
+Process-wide de-duplication of concurrent work. The first caller for a key
+runs the computation; everyone asking for the same key while it runs waits
+for that one result (or exception) instead of starting their own. Nothing
+is kept once the call finishes - pair it with a cache (ArtifactCache does
+this in get_or_compute) so later callers hit the stored value.
+
+Counters per kind (the first element of tuple keys, e.g. "raw", "features",
+"model") show how many computations ran and how many duplicates were avoided.
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys onto one computation"""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def do(self, key, compute, kind=None):
+        """
+        Return compute() for `key`, sharing a computation already in flight.
+        `kind` labels the counters (default: key[0] for tuple keys).
+        """
+        if kind is None:
+            kind = key[0] if isinstance(key, tuple) else key
+
+        with self._lock:
+            counts = self._counts.setdefault(kind, {"computed": 0, "coalesced": 0, "failed": 0})
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                counts["computed"] += 1
+            else:
+                counts["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                counts["failed"] += 1
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def inflight(self):
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self):
+        """{kind: {"computed", "coalesced", "failed"}}"""
+        with self._lock:
+            return {kind: dict(counts) for kind, counts in self._counts.items()}
+
+    def coalesced(self):
+        """Duplicate computations avoided so far, over all kinds"""
+        with self._lock:
+            return sum(counts["coalesced"] for counts in self._counts.values())
+
+
+# Shared by every cache in the process (Streamlit sessions, API threads, warmers)
+SINGLE_FLIGHT = SingleFlight()
@@ -0,0 +1,257 @@
+"""
+Local SMTP Sink
+Minimal SMTP server that accepts and discards mail, so the email job can be
+exercised without a real provider. It speaks EHLO/HELO, optional STARTTLS,
+AUTH PLAIN/LOGIN (any credentials), MAIL/RCPT/DATA/RSET/NOOP/QUIT, and can
+inject faults:
+
+  - latency:         seconds added before each DATA reply
+  - connect_latency: seconds added before the greeting
+  - failure_rate:    fraction of messages rejected with 451 (temporary)
+  - drop_rate:       fraction of messages where the connection is cut instead
+
+Usage:
+    python smtp_sink.py --port 1025
+    python smtp_sink.py --port 1025 --starttls --latency 0.005 --failure-rate 0.01
+
+Then point the job at it: SMTP_SERVER=127.0.0.1 SMTP_PORT=1025 (and
+SMTP_STARTTLS=0 when the sink runs without --starttls).
+"""
+
+import os
+import ssl
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import socketserver
+
+MAX_LINE = 64 * 1024
+
+
+def self_signed_cert(directory=None):
+    """Create a throwaway localhost certificate with the openssl CLI; returns (certfile, keyfile)"""
+    directory = directory or tempfile.mkdtemp(prefix="smtp-sink-")
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    try:
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-subj", "/CN=localhost", "-keyout", keyfile, "-out", certfile],
+            check=True, capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f"STARTTLS needs a certificate: pass --certfile/--keyfile or install openssl ({e})")
+    return certfile, keyfile
+
+
+class SinkHandler(socketserver.BaseRequestHandler):
+    """One SMTP session"""
+
+    def setup(self):
+        self.rfile = self.request.makefile("rb")
+        self.tls = False
+
+    def finish(self):
+        # The TLS socket replaces the accepted one, so close whatever is current
+        self.rfile.close()
+        self.request.close()
+
+    def reply(self, code, text):
+        self.request.sendall(f"{code} {text}\r\n".encode())
+
+    def readline(self):
+        return self.rfile.readline(MAX_LINE)
+
+    def handle(self):
+        sink = self.server
+        sink.count("connections")
+        if sink.connect_latency:
+            time.sleep(sink.connect_latency)
+        self.reply(220, "localhost smtp-sink ready")
+
+        recipients = 0
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            command, _, arg = line.decode("utf-8", "replace").strip().partition(" ")
+            command = command.upper()
+
+            if command in ("EHLO", "HELO"):
+                if command == "HELO":
+                    self.reply(250, "localhost")
+                    continue
+                extensions = ["localhost", "8BITMIME", "SMTPUTF8", "AUTH PLAIN LOGIN"]
+                if sink.ssl_context is not None and not self.tls:
+                    extensions.append("STARTTLS")
+                lines = [f"250-{e}" for e in extensions[:-1]] + [f"250 {extensions[-1]}"]
+                self.request.sendall(("\r\n".join(lines) + "\r\n").encode())
+
+            elif command == "STARTTLS" and sink.ssl_context is not None and not self.tls:
+                self.reply(220, "Ready to start TLS")
+                self.request = sink.ssl_context.wrap_socket(self.request, server_side=True)
+                self.rfile = self.request.makefile("rb")
+                self.tls = True
+                sink.count("tls_sessions")
+
+            elif command == "AUTH":
+                mechanism, _, initial = arg.partition(" ")
+                if mechanism.upper() == "LOGIN":
+                    if not initial:
+                        self.reply(334, "VXNlcm5hbWU6")
+                        self.readline()
+                    self.reply(334, "UGFzc3dvcmQ6")
+                    self.readline()
+                elif not initial:
+                    self.reply(334, "")
+                    self.readline()
+                self.reply(235, "2.7.0 Authentication successful")
+
+            elif command == "MAIL":
+                recipients = 0
+                self.reply(250, "2.1.0 OK")
+
+            elif command == "RCPT":
+                recipients += 1
+                self.reply(250, "2.1.5 OK")
+
+            elif command == "DATA":
+                self.reply(354, "End data with <CR><LF>.<CR><LF>")
+                size, bare_lf = 0, 0
+                while True:
+                    chunk = self.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    size += len(chunk)
+                    bare_lf += not chunk.endswith(b"\r\n")
+                if not chunk:
+                    return
+
+                if sink.latency:
+                    time.sleep(sink.latency)
+                fault = sink.draw_fault()
+                if fault == "drop":
+                    sink.count("dropped")
+                    return
+                if fault == "reject":
+                    sink.count("rejected")
+                    self.reply(451, "4.3.0 Injected temporary failure")
+                else:
+                    sink.count("messages")
+                    sink.count("recipients", recipients)
+                    sink.count("bytes", size)
+                    sink.count("bare_lf", bare_lf)
+                    self.reply(250, "2.0.0 OK queued")
+                recipients = 0
+
+            elif command == "RSET":
+                recipients = 0
+                self.reply(250, "2.0.0 OK")
+
+            elif command == "NOOP":
+                self.reply(250, "2.0.0 OK")
+
+            elif command == "QUIT":
+                self.reply(221, "2.0.0 Bye")
+                return
+
+            else:
+                self.reply(502, "5.5.2 Command not recognized")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Threaded SMTP sink with fault injection and counters"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, host="127.0.0.1", port=1025, starttls=False, certfile=None, keyfile=None,
+                 latency=0.0, connect_latency=0.0, failure_rate=0.0, drop_rate=0.0, seed=None):
+        super().__init__((host, port), SinkHandler)
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ["connections", "tls_sessions", "messages", "recipients", "bytes", "rejected", "dropped", "errors",
+             "bare_lf"], 0)
+
+        self.ssl_context = None
+        if starttls:
+            if certfile is None:
+                certfile, keyfile = self_signed_cert()
+            self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.ssl_context.load_cert_chain(certfile, keyfile)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def draw_fault(self):
+        """None, "reject" or "drop" for the message being accepted"""
+        with self._lock:
+            r = self._random.random()
+        if r < self.drop_rate:
+            return "drop"
+        if r < self.drop_rate + self.failure_rate:
+            return "reject"
+        return None
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-session are expected under load; count instead of printing tracebacks
+        self.count("errors")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def start(self):
+        """Serve on a background thread; returns self"""
+        threading.Thread(target=self.serve_forever, daemon=True, name="smtp-sink").start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local SMTP sink with fault injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--starttls", action="store_true", help="Offer STARTTLS (self-signed cert by default)")
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each DATA reply")
+    parser.add_argument("--connect-latency", type=float, default=0.0, help="Seconds before the greeting")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of messages rejected (451)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of messages cut off")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    sink = SMTPSink(args.host, args.port, args.starttls, args.certfile, args.keyfile,
+                    args.latency, args.connect_latency, args.failure_rate, args.drop_rate, args.seed)
+    print(f"SMTP sink listening on {args.host}:{sink.port}" + (" (STARTTLS)" if args.starttls else ""))
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.server_close()
+        print(sink.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+Stock Universe
+Tickers the dashboard offers, grouped by sector, plus the market proxy used
+for market-relative features. Shared by the app and the headless tools.
+"""
+
+POPULAR_STOCKS = {
+    "Technology": ["AAPL", "MSFT", "GOOGL", "META", "NVDA", "TSLA", "AMD", "INTC", "CRM", "ORCL"],
+    "Finance": ["JPM", "BAC", "WFC", "GS", "MS", "C", "BLK", "AXP", "SCHW", "USB"],
+    "Healthcare": ["JNJ", "UNH", "PFE", "ABBV", "TMO", "MRK", "ABT", "DHR", "LLY", "AMGN"],
+    "Consumer": ["AMZN", "WMT", "HD", "MCD", "NKE", "SBUX", "TGT", "LOW", "COST", "DG"],
+    "Energy": ["XOM", "CVX", "COP", "SLB", "EOG", "MPC", "PSX", "VLO", "OXY", "HAL"],
+    "Industrial": ["BA", "CAT", "GE", "HON", "UPS", "LMT", "MMM", "DE", "RTX", "EMR"],
+}
+
+ALL_STOCKS = []
+for category in POPULAR_STOCKS.values():
+    ALL_STOCKS.extend(category)
+
+SECTOR_OF = {ticker: sector for sector, tickers in POPULAR_STOCKS.items() for ticker in tickers}
+
+# Broad-market ETF used as the market return for beta/correlation features
+MARKET_PROXY = "SPY"